@@ -0,0 +1,143 @@
+"""Admission control for write endpoints.
+
+A pipeline stuck in a loop must not monopolize the single SQLite writer and
+stall every reader, so writes pass these checks before they touch the
+database:
+
+* API keys: VORDU_API_KEYS lists "name:secret" pairs, one per pipeline or
+  team (VORDU_API_KEY alone is the key "default"). Limits and metrics are
+  per key name, never the secret.
+* Rate: a token bucket per key refilled at VORDU_INGEST_RATE requests per
+  second up to VORDU_INGEST_BURST. An empty bucket answers 429 with the
+  Retry-After that refills it.
+* Size: request bodies above VORDU_MAX_BODY_BYTES (after gzip) and ingest
+  payloads with more than VORDU_MAX_INGEST_ITEMS items answer 413.
+* Backpressure: at most VORDU_MAX_CONCURRENT_WRITES writes run at once and
+  VORDU_WRITE_QUEUE more wait, for up to VORDU_WRITE_QUEUE_TIMEOUT_S. Beyond
+  that the API answers 429 right away instead of queueing without bound.
+
+State is per worker process: with N workers (and pods) a key's rate, burst
+and write slots are N times these, while the size limits hold per request. The limits are exported as vordu_admission_limit, rejections as
+vordu_admission_rejected_total.
+"""
+import asyncio
+import hmac
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+from . import metrics
+
+RATE = float(os.getenv("VORDU_INGEST_RATE", "10"))
+BURST = float(os.getenv("VORDU_INGEST_BURST", "60"))
+MAX_BODY_BYTES = int(os.getenv("VORDU_MAX_BODY_BYTES", str(32 * 1024 * 1024)))
+MAX_ITEMS = int(os.getenv("VORDU_MAX_INGEST_ITEMS", "50000"))
+MAX_CONCURRENT_WRITES = int(os.getenv("VORDU_MAX_CONCURRENT_WRITES", "2"))
+WRITE_QUEUE = int(os.getenv("VORDU_WRITE_QUEUE", "16"))
+WRITE_QUEUE_TIMEOUT_S = float(os.getenv("VORDU_WRITE_QUEUE_TIMEOUT_S", "10"))
+
+for name, value in (("ingest_rate_per_second", RATE), ("ingest_burst", BURST), ("max_body_bytes", MAX_BODY_BYTES),
+                    ("max_ingest_items", MAX_ITEMS), ("max_concurrent_writes", MAX_CONCURRENT_WRITES),
+                    ("write_queue", WRITE_QUEUE)):
+    metrics.ADMISSION_LIMIT.labels(name).set(value)
+
+def api_keys():
+    """{secret: name} of the accepted API keys."""
+    keys = {}
+    for n, entry in enumerate(os.getenv("VORDU_API_KEYS", "").split(",")):
+        name, _, secret = entry.strip().rpartition(":")
+        if secret:
+            keys[secret] = name or f"key{n}"
+    if not keys:
+        keys[os.getenv("VORDU_API_KEY", "dev-key")] = "default" # Default to dev-key if not set
+    return keys
+
+def key_name(secret):
+    """The name of the key secret, None if it is not accepted."""
+    if not secret:
+        return None
+    for candidate, name in api_keys().items():
+        if hmac.compare_digest(candidate.encode(), secret.encode()):
+            return name
+    return None
+
+def reject(route, key, reason, status_code, detail, retry_after=None):
+    metrics.ADMISSION_REJECTED.labels(route, key, reason).inc()
+    headers = {"Retry-After": str(max(1, math.ceil(retry_after)))} if retry_after is not None else None
+    raise HTTPException(status_code=status_code, detail=detail, headers=headers)
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Takes a token, or returns the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return None
+        return (1 - self.tokens) / self.rate
+
+class WriteGate:
+    """Bounded concurrency with a bounded wait queue, on the event loop so waiters hold no thread."""
+
+    def __init__(self, concurrency, queue, timeout):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.capacity = concurrency + queue
+        self.timeout = timeout
+        self.admitted = 0 # Running or waiting
+
+    def full(self):
+        return self.admitted >= self.capacity
+
+    async def acquire(self):
+        self.admitted += 1
+        metrics.WRITES_ADMITTED.inc()
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.timeout)
+        except BaseException:
+            self.release(acquired=False)
+            raise
+
+    def release(self, acquired=True):
+        if acquired:
+            self.semaphore.release()
+        self.admitted -= 1
+        metrics.WRITES_ADMITTED.dec()
+
+buckets = {}
+gate = WriteGate(MAX_CONCURRENT_WRITES, WRITE_QUEUE, WRITE_QUEUE_TIMEOUT_S)
+
+@asynccontextmanager
+async def admit(route, key):
+    """One write by key: rate limit, then a slot in the write gate for its duration."""
+    wait = buckets.setdefault(key, TokenBucket(RATE, BURST)).take()
+    if wait is not None:
+        reject(route, key, "rate", 429, "Rate limit exceeded for this API key", retry_after=wait)
+    if gate.full():
+        reject(route, key, "busy", 429, "Too many writes in progress, retry later", retry_after=1)
+    try:
+        await gate.acquire()
+    except asyncio.TimeoutError:
+        reject(route, key, "busy", 429, "Too many writes in progress, retry later", retry_after=1)
+    try:
+        yield
+    finally:
+        gate.release()
+
+def check_items(route, key, count):
+    if count > MAX_ITEMS:
+        reject(route, key, "items", 413, f"{count} items exceed the limit of {MAX_ITEMS} per request, send smaller chunks")
+
+def check_body_size(route, key, size):
+    """key is None when the body is read before the API key is validated."""
+    if size > MAX_BODY_BYTES:
+        reject(route, key or "unknown", "size", 413, f"Request body exceeds {MAX_BODY_BYTES} bytes")
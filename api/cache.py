@@ -0,0 +1,75 @@
+"""Snapshot cache for read endpoints, consistent across workers and replicas.
+
+Every commit that wrote something bumps the single row in data_version from
+the same transaction. Readers check that counter (a primary key lookup) and
+reuse the serialized response built for the same version, so every worker
+process, and every replica sharing a PostgreSQL database, serves the matrix
+as of the latest commit without any in-process invalidation.
+"""
+import threading
+
+from sqlalchemy import event, select, update
+
+from . import metrics
+from .models import DataVersion
+
+WRITES_KEY = "vordu_writes"
+
+def track_writes(session_factory):
+    """Bumps data_version in every committed transaction of session_factory that wrote data."""
+
+    def mark(session):
+        session.info[WRITES_KEY] = True
+
+    @event.listens_for(session_factory, "after_flush")
+    def after_flush(session, flush_context):
+        mark(session)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def after_bulk_statement(orm_execute_state):
+        # Bulk insert(Model) / update() / query().delete() bypass the unit of work
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            mark(orm_execute_state.session)
+
+    @event.listens_for(session_factory, "before_commit")
+    def bump_version(session):
+        # Pending ORM changes are only flushed after before_commit
+        pending = session.new or session.dirty or session.deleted
+        if session.info.pop(WRITES_KEY, False) or pending:
+            session.execute(
+                update(DataVersion.__table__).where(DataVersion.id == 1).values(version=DataVersion.version + 1)
+            )
+            # The bump itself is a write, it must not mark the next transaction
+            session.info.pop(WRITES_KEY, None)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def after_rollback(session):
+        session.info.pop(WRITES_KEY, None)
+
+def current_version(db):
+    return db.execute(select(DataVersion.version).where(DataVersion.id == 1)).scalar()
+
+class SnapshotCache:
+    """Holds one serialized response together with the data version it was built from."""
+
+    def __init__(self, name):
+        self.name = name
+        self.version = None
+        self.body = None
+        self.lock = threading.Lock()
+
+    def get(self, db, build):
+        """Returns the cached body for the current data version, calling build(db) on a miss."""
+        version = current_version(db)
+        with self.lock:
+            if self.body is not None and self.version == version:
+                metrics.CACHE_REQUESTS.labels(self.name, "hit").inc()
+                return self.body
+        metrics.CACHE_REQUESTS.labels(self.name, "miss").inc()
+        # Built in the same transaction as the version read, so the body is at
+        # least as new as the version it is stored under
+        body = build(db)
+        with self.lock:
+            if self.version is None or version >= self.version:
+                self.version, self.body = version, body
+        return body
@@ -0,0 +1,79 @@
+"""Backstage catalog entities to system configs.
+
+Mirrors CatalogIndex in the ingest script, so /config/ingest can take the raw
+catalog documents ({"documents": [entity, ...]}) of many systems in one
+request instead of one pre-built config per system:
+
+* every System entity is a system, its vordu.io/* annotations carry the row
+  label and granularity;
+* a Component joins the System its spec.partOf (or metadata.system) names,
+  wherever in the documents that System is declared. One naming neither joins
+  the only System of the documents, if there is exactly one.
+
+Components of a System missing from the documents are skipped and reported.
+"""
+
+def system_config(entity):
+    meta = entity.get("metadata") or {}
+    annotations = meta.get("annotations") or {}
+    spec = entity.get("spec") or {}
+    name = meta["name"]
+    row_label = annotations.get("vordu.io/row-label")
+    return {
+        "name": name,
+        "label": name.capitalize(), # Header uses Name (e.g. Mimir)
+        "row_label": row_label or name, # Specific label for the Section Row
+        "description": meta.get("description"),
+        "domain": spec.get("domain"),
+        "granularity": annotations.get("vordu.io/granularity", "component"),
+    }
+
+def component_config(entity):
+    meta = entity.get("metadata") or {}
+    annotations = meta.get("annotations") or {}
+    spec = entity.get("spec") or {}
+    return {
+        "name": meta["name"],
+        "label": annotations.get("vordu.io/row-label") or meta["name"],
+        "system": meta.get("system") or spec.get("partOf"),
+        "parent": annotations.get("vordu.io/parent-component"),
+    }
+
+def index(documents):
+    """({system name: {"system", "components"}}, names of skipped components) of catalog entities.
+
+    Raises ValueError for an entity without metadata.name.
+    """
+    entities = [
+        doc for doc in documents
+        if isinstance(doc, dict) and "kind" in doc and isinstance(doc.get("metadata"), dict)
+    ]
+    for entity in entities:
+        if not entity["metadata"].get("name"):
+            raise ValueError(f"{entity['kind']} entity without metadata.name")
+    systems = {}
+    for entity in entities:
+        if entity["kind"] == "System":
+            config = system_config(entity)
+            systems.setdefault(config["name"], {"system": config, "components": []})
+    only = next(iter(systems)) if len(systems) == 1 else None
+    skipped = []
+    for entity in entities:
+        if entity["kind"] != "Component":
+            continue
+        component = component_config(entity)
+        component["system"] = component["system"] or only
+        if component["system"] in systems:
+            systems[component["system"]]["components"].append(component)
+        else:
+            skipped.append(component["name"])
+    return systems, skipped
+
+def config_payload(indexed):
+    """/config/ingest payload of one indexed system, matching build_config_payload in the ingest script."""
+    system = indexed["system"]
+    components = indexed["components"]
+    if system["granularity"] == "system":
+        # Synthesize the System Row
+        components = [{"name": system["name"], "label": system["row_label"], "system": system["name"], "parent": None}]
+    return {"system": system, "components": components}
@@ -0,0 +1,105 @@
+"""Read-through cache of per-cell details.
+
+/matrix ships cells without their details, the UI fetches one cell's
+details when it is opened (GET /matrix/{project}/{row}/{phase}/details).
+Wallboards open the same few cells over and over, so each worker keeps the
+serialized details of recently read cells in an LRU bounded by bytes, not
+entries: one cell's details can be megabytes. VORDU_DETAILS_CACHE_BYTES
+(default 16 MiB) is the budget per worker, bodies larger than a quarter of it
+are served but not kept, so one huge cell cannot flush every other.
+
+Every write of a cell gives it a new random revision (MatrixCell.revision).
+A lookup reads the live cell's id and revision from a covering index, and
+serves the cached body only if it was built for that revision, so a cell
+written by any worker or replica is reloaded on its next read, and cells of
+a newly published generation are new entries altogether. Cells written
+before revisions existed have none and are read from the database every time.
+
+Lookups, by result, and evictions, by reason ("size" for the budget, "stale"
+for a replaced revision), are counted in vordu_cache_requests_total and
+vordu_cache_evictions_total, the bytes held in vordu_cache_bytes.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from . import generations, metrics
+from .models import MatrixCell
+
+DETAILS_CACHE_BYTES = int(os.getenv("VORDU_DETAILS_CACHE_BYTES", str(16 * 1024 * 1024)))
+# Rough cost of an entry besides its body: key, tuple and the OrderedDict link
+ENTRY_OVERHEAD = 200
+
+class DetailsCache:
+    """Serialized details by cell id, each with the revision it was built for, least recently used first."""
+
+    def __init__(self, name, max_bytes):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, cell_id, revision):
+        with self.lock:
+            entry = self.entries.get(cell_id)
+            if entry is None:
+                return None
+            if entry[0] != revision:
+                self.drop(cell_id, "stale")
+                return None
+            self.entries.move_to_end(cell_id)
+            return entry[1]
+
+    def put(self, cell_id, revision, body):
+        cost = len(body) + ENTRY_OVERHEAD
+        if cost > self.max_bytes // 4:
+            return
+        with self.lock:
+            if cell_id in self.entries:
+                self.drop(cell_id, "stale")
+            self.entries[cell_id] = (revision, body)
+            self.size += cost
+            while self.size > self.max_bytes:
+                self.drop(next(iter(self.entries)), "size")
+            metrics.CACHE_BYTES.labels(self.name).set(self.size)
+
+    def drop(self, cell_id, reason):
+        # Called with the lock held
+        _, body = self.entries.pop(cell_id)
+        self.size -= len(body) + ENTRY_OVERHEAD
+        metrics.CACHE_EVICTIONS.labels(self.name, reason).inc()
+        metrics.CACHE_BYTES.labels(self.name).set(self.size)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            metrics.CACHE_BYTES.labels(self.name).set(0)
+
+details_cache = DetailsCache("details", DETAILS_CACHE_BYTES)
+
+def read(db, project, row, phase):
+    """JSON body of the live cell's details, None if there is no such cell."""
+    found = db.execute(
+        select(MatrixCell.id, MatrixCell.revision)
+        .where(MatrixCell.project_name == project, MatrixCell.row_id == row, MatrixCell.phase_id == phase,
+               generations.current())
+    ).first()
+    if found is None:
+        return None
+    cell_id, revision = found
+    if revision is not None:
+        body = details_cache.get(cell_id, revision)
+        if body is not None:
+            metrics.CACHE_REQUESTS.labels(details_cache.name, "hit").inc()
+            return body
+    metrics.CACHE_REQUESTS.labels(details_cache.name, "miss").inc()
+    details = db.execute(select(MatrixCell.details).where(MatrixCell.id == cell_id)).scalar()
+    body = json.dumps(details or []).encode("utf-8")
+    if revision is not None:
+        details_cache.put(cell_id, revision, body)
+    return body
@@ -0,0 +1,246 @@
+"""Scenario durations and slow-test analytics.
+
+Reports carry a duration per step. The ingest script sums them per scenario
+and sends both as duration_ms in the scenario details. The API takes them out
+of the details before storing cells, since timings differ on every run and
+would otherwise rewrite the search index and history details each time. It
+keeps them in two tables instead:
+
+* scenario_timings: one row per scenario per run, behind the slowest
+  scenario and feature rankings. Kept VORDU_RETAIN_TIMINGS_DAYS (default 30).
+* run_durations: per run and phase, the scenario count, sum, max and a
+  histogram over logarithmic buckets. Histograms of chunks, runs or phases
+  merge by adding counts, so percentiles and trends never rescan timings.
+  Kept VORDU_RETAIN_DURATION_DAYS (default 365).
+
+Both are expired by the history compaction pass, see api/history.py.
+"""
+import math
+import os
+import time
+from datetime import timedelta
+
+from sqlalchemy import delete, distinct, func, insert, select, update
+
+from . import history, metrics
+from .models import RunDuration, ScenarioTiming
+
+RETAIN_TIMINGS_DAYS = int(os.getenv("VORDU_RETAIN_TIMINGS_DAYS", "30"))
+RETAIN_DURATION_DAYS = int(os.getenv("VORDU_RETAIN_DURATION_DAYS", "365"))
+# Default window of the slowest and percentile endpoints
+WINDOW_DAYS = 7
+
+# Buckets per doubling, percentiles are exact to within 2 ** (1 / 8), about 9%
+BUCKETS_PER_OCTAVE = 8
+PERCENTILES = (50, 90, 95, 99)
+
+def bucket(ms):
+    return math.ceil(math.log2(max(ms, 0.001)) * BUCKETS_PER_OCTAVE)
+
+def bucket_ms(key):
+    """Upper bound of a bucket in milliseconds."""
+    return 2 ** (int(key) / BUCKETS_PER_OCTAVE)
+
+def merge(target, histogram):
+    for key, count in histogram.items():
+        target[str(key)] = target.get(str(key), 0) + count
+    return target
+
+def percentile(histogram, p):
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = math.ceil(total * p / 100)
+    seen = 0
+    for key in sorted(histogram, key=int):
+        seen += histogram[key]
+        if seen >= rank:
+            return round(bucket_ms(key), 1)
+    return None
+
+def take(details):
+    """Splits durations out of scenario details: (details without them, [(detail, duration_ms, steps)]).
+
+    Details without any duration come back as they are.
+    """
+    if not details or not any(
+        "duration_ms" in d or any("duration_ms" in s for s in d.get("steps") or ()) for d in details
+    ):
+        return details, []
+    stripped, timings = [], []
+    for d in details:
+        steps = d.get("steps") or []
+        step_timings = [
+            # Cucumber keywords end in a space ("Given "), pytest-bdd's do not
+            {"step": f"{s.get('keyword', '').strip()} {s.get('name', '')}".strip(), "duration_ms": s["duration_ms"]}
+            for s in steps if s.get("duration_ms") is not None
+        ]
+        duration = d.get("duration_ms")
+        if duration is None and step_timings:
+            duration = sum(s["duration_ms"] for s in step_timings)
+        clean = {k: v for k, v in d.items() if k != "duration_ms"}
+        if steps:
+            clean["steps"] = [{k: v for k, v in s.items() if k != "duration_ms"} for s in steps]
+        stripped.append(clean)
+        if duration is not None:
+            timings.append((clean, duration, step_timings or None))
+    return stripped, timings
+
+def record(db, project, run_id, timings):
+    """Stores timings [{"row_id", "phase_id", "feature", "scenario", "duration_ms", "steps"}] of a run.
+
+    Called once per request, a run posted in chunks adds to the same aggregates.
+    """
+    if not timings:
+        return
+    recorded_at = history.utcnow()
+    db.execute(insert(ScenarioTiming), [
+        {"project_name": project, "run_id": run_id, "recorded_at": recorded_at, **timing} for timing in timings
+    ])
+    by_phase = {}
+    for timing in timings:
+        phase = by_phase.setdefault(timing["phase_id"], {"scenarios": 0, "total_ms": 0.0, "max_ms": 0.0, "histogram": {}})
+        ms = timing["duration_ms"]
+        phase["scenarios"] += 1
+        phase["total_ms"] += ms
+        phase["max_ms"] = max(phase["max_ms"], ms)
+        merge(phase["histogram"], {bucket(ms): 1})
+    existing = {
+        r.phase_id: r for r in db.execute(
+            select(RunDuration.id, RunDuration.phase_id, RunDuration.scenarios, RunDuration.total_ms,
+                   RunDuration.max_ms, RunDuration.histogram)
+            .where(RunDuration.project_name == project, RunDuration.run_id == run_id)
+        )
+    }
+    new, changed = [], []
+    for phase_id, totals in by_phase.items():
+        current = existing.get(phase_id)
+        if current is None:
+            new.append({"project_name": project, "run_id": run_id, "phase_id": phase_id,
+                        "recorded_at": recorded_at, **totals})
+        else:
+            changed.append({
+                "id": current.id, "scenarios": current.scenarios + totals["scenarios"],
+                "total_ms": current.total_ms + totals["total_ms"], "max_ms": max(current.max_ms, totals["max_ms"]),
+                "histogram": merge(dict(current.histogram or {}), totals["histogram"]),
+            })
+    if new:
+        db.execute(insert(RunDuration), new)
+    if changed:
+        db.execute(update(RunDuration), changed)
+
+def from_items(items):
+    """Takes durations out of the details of status items (IngestItem), returns {system: timings}."""
+    timings = {}
+    for item in items:
+        item.details, taken = take(item.details)
+        timings.setdefault(item.project_name, []).extend(
+            {"row_id": item.row_id, "phase_id": item.phase_id, "feature": detail.get("feature"),
+             "scenario": detail.get("scenario"), "duration_ms": duration, "steps": steps}
+            for detail, duration, steps in taken
+        )
+    return {project: found for project, found in timings.items() if found}
+
+def clear(db):
+    db.query(ScenarioTiming).delete()
+    db.query(RunDuration).delete()
+
+def expire(bind, now, deadline, stats):
+    """Deletes timings and run aggregates past retention, in batches. Returns False if the deadline passed first."""
+    for model, days in ((ScenarioTiming, RETAIN_TIMINGS_DAYS), (RunDuration, RETAIN_DURATION_DAYS)):
+        cutoff = now - timedelta(days=days)
+        while True:
+            if time.monotonic() >= deadline:
+                return False
+            with bind.begin() as conn:
+                ids = conn.execute(
+                    select(model.id).where(model.recorded_at < cutoff).limit(history.ID_BATCH)
+                ).scalars().all()
+                if not ids:
+                    break
+                conn.execute(delete(model).where(model.id.in_(ids)))
+            stats["durations_deleted"] += len(ids)
+            metrics.HISTORY_COMPACTED.labels("durations_deleted").inc(len(ids))
+    return True
+
+def window(since):
+    return history.naive_utc(since) or history.utcnow() - timedelta(days=WINDOW_DAYS)
+
+def slowest(db, project, by="scenario", phase=None, since=None, limit=20):
+    """Scenarios or features by mean duration per run since since (default the last week), slowest first."""
+    criteria = [ScenarioTiming.project_name == project, ScenarioTiming.recorded_at >= window(since)]
+    if phase is not None:
+        criteria.append(ScenarioTiming.phase_id == phase)
+    runs = func.count(distinct(ScenarioTiming.run_id))
+    if by == "feature":
+        mean = func.sum(ScenarioTiming.duration_ms) / runs
+        stmt = (
+            select(ScenarioTiming.feature, mean.label("mean_ms"), func.max(ScenarioTiming.duration_ms),
+                   func.count(distinct(ScenarioTiming.scenario)), runs)
+            .where(*criteria).group_by(ScenarioTiming.feature)
+            .order_by(mean.desc()).limit(limit)
+        )
+        return [
+            {"feature": feature, "mean_ms": round(mean_ms, 1), "max_scenario_ms": round(max_ms, 1),
+             "scenarios": scenarios, "runs": run_count}
+            for feature, mean_ms, max_ms, scenarios, run_count in db.execute(stmt)
+        ]
+    mean = func.avg(ScenarioTiming.duration_ms)
+    stmt = (
+        select(ScenarioTiming.feature, ScenarioTiming.scenario, ScenarioTiming.row_id, ScenarioTiming.phase_id,
+               mean.label("mean_ms"), func.max(ScenarioTiming.duration_ms), runs)
+        .where(*criteria)
+        .group_by(ScenarioTiming.feature, ScenarioTiming.scenario, ScenarioTiming.row_id, ScenarioTiming.phase_id)
+        .order_by(mean.desc()).limit(limit)
+    )
+    return [
+        {"feature": feature, "scenario": scenario, "row": row, "phase": phase_id, "mean_ms": round(mean_ms, 1),
+         "max_ms": round(max_ms, 1), "runs": run_count}
+        for feature, scenario, row, phase_id, mean_ms, max_ms, run_count in db.execute(stmt)
+    ]
+
+def summarize(rows):
+    """Merged totals and percentiles of run_durations rows."""
+    histogram, scenarios, total_ms, max_ms = {}, 0, 0.0, 0.0
+    for row in rows:
+        merge(histogram, row.histogram or {})
+        scenarios += row.scenarios
+        total_ms += row.total_ms
+        max_ms = max(max_ms, row.max_ms)
+    return {
+        "scenarios": scenarios, "total_ms": round(total_ms, 1),
+        "mean_ms": round(total_ms / scenarios, 1) if scenarios else None, "max_ms": round(max_ms, 1),
+        **{f"p{p}_ms": percentile(histogram, p) for p in PERCENTILES},
+    }
+
+def percentiles(db, project, since=None):
+    """Scenario duration percentiles per phase over the runs since since (default the last week)."""
+    rows = db.execute(
+        select(RunDuration)
+        .where(RunDuration.project_name == project, RunDuration.recorded_at >= window(since))
+    ).scalars()
+    phases = {}
+    for row in rows:
+        phases.setdefault(row.phase_id, []).append(row)
+    return [
+        {"phase": phase_id, "runs": len({r.run_id for r in phase_rows}), **summarize(phase_rows)}
+        for phase_id, phase_rows in sorted(phases.items())
+    ]
+
+def trend(db, project, phase=None, limit=30):
+    """Totals and percentiles of the last limit runs, oldest first."""
+    criteria = [RunDuration.project_name == project]
+    if phase is not None:
+        criteria.append(RunDuration.phase_id == phase)
+    latest = (
+        select(RunDuration.run_id).where(*criteria)
+        .group_by(RunDuration.run_id).order_by(func.min(RunDuration.recorded_at).desc()).limit(limit)
+    )
+    runs = {}
+    for row in db.execute(select(RunDuration).where(*criteria, RunDuration.run_id.in_(latest))).scalars():
+        runs.setdefault(row.run_id, []).append(row)
+    ordered = sorted(runs.items(), key=lambda run: min(r.recorded_at for r in run[1]))
+    return [
+        {"run_id": run_id, "recorded_at": min(r.recorded_at for r in rows).isoformat() + "Z", **summarize(rows)}
+        for run_id, rows in ordered
+    ]
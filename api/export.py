@@ -0,0 +1,182 @@
+"""Streaming bulk export of matrix cells and cell history.
+
+Rows are read with yield_per, a server-side cursor where the driver has one
+(psycopg, and SQLite's cursor is incremental anyway), and encoded one chunk
+at a time, so memory stays bounded by CHUNK_ROWS however many rows match.
+NDJSON and CSV are always available; Arrow IPC streams and Parquet need
+pyarrow, which is optional.
+"""
+import csv
+import io
+import json
+import os
+
+from sqlalchemy import select
+
+from . import generations
+from .models import CellHistory, MatrixCell
+
+CHUNK_ROWS = int(os.getenv("VORDU_EXPORT_CHUNK_ROWS", "1000"))
+
+# Exported columns per dataset, as (name, column)
+DATASETS = {
+    "matrix": [
+        ("project", MatrixCell.project_name), ("row", MatrixCell.row_id), ("phase", MatrixCell.phase_id),
+        ("status", MatrixCell.status), ("completion", MatrixCell.completion),
+        ("scenarios_total", MatrixCell.scenarios_total), ("scenarios_passed", MatrixCell.scenarios_passed),
+        ("steps_total", MatrixCell.steps_total), ("steps_passed", MatrixCell.steps_passed),
+        ("details", MatrixCell.details),
+    ],
+    "history": [
+        ("project", CellHistory.project_name), ("row", CellHistory.row_id), ("phase", CellHistory.phase_id),
+        ("recorded_at", CellHistory.recorded_at), ("resolution", CellHistory.resolution),
+        ("status", CellHistory.status), ("completion", CellHistory.completion),
+        ("scenarios_total", CellHistory.scenarios_total), ("scenarios_passed", CellHistory.scenarios_passed),
+        ("steps_total", CellHistory.steps_total), ("steps_passed", CellHistory.steps_passed),
+        ("details", CellHistory.details),
+    ],
+}
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+def has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def formats():
+    return [f for f in MEDIA_TYPES if f in ("ndjson", "csv") or has_pyarrow()]
+
+def query(dataset, system=None, since=None, until=None, details=False):
+    """The select for a dataset, in a stable order so exports can be compared."""
+    columns = [(name, column) for name, column in DATASETS[dataset] if details or name != "details"]
+    model = MatrixCell if dataset == "matrix" else CellHistory
+    stmt = select(*(column.label(name) for name, column in columns))
+    if system is not None:
+        stmt = stmt.where(model.project_name == system)
+    if dataset == "history":
+        if since is not None:
+            stmt = stmt.where(CellHistory.recorded_at >= since)
+        if until is not None:
+            stmt = stmt.where(CellHistory.recorded_at < until)
+        stmt = stmt.order_by(CellHistory.recorded_at, CellHistory.id)
+    else:
+        stmt = stmt.where(generations.current())
+        stmt = stmt.order_by(MatrixCell.project_name, MatrixCell.row_id, MatrixCell.phase_id)
+    return [name for name, _ in columns], stmt
+
+def chunks(session_factory, stmt):
+    """Lists of row dicts, CHUNK_ROWS at a time, read on a session of its own.
+
+    The session lives as long as the response streams, request-scoped
+    dependencies are already closed by then.
+    """
+    with session_factory() as db:
+        result = db.execute(stmt.execution_options(yield_per=CHUNK_ROWS))
+        for partition in result.mappings().partitions():
+            yield partition
+
+def plain(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat() + "Z"
+    return value
+
+def ndjson(names, rows):
+    for chunk in rows:
+        yield "".join(
+            json.dumps({name: plain(row[name]) for name in names}, separators=(",", ":")) + "\n" for row in chunk
+        ).encode()
+
+def csv_rows(names, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for chunk in rows:
+        for row in chunk:
+            writer.writerow([
+                json.dumps(row[name]) if name == "details" else plain(row[name]) for name in names
+            ])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+class Drain:
+    """Write-only file object handing out what pyarrow wrote since the last take()."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+def arrow_schema(names):
+    import pyarrow as pa
+
+    types = {"phase": pa.int32(), "recorded_at": pa.timestamp("us", tz="UTC"), "details": pa.string()}
+    types.update({name: pa.int64() for name in (
+        "completion", "scenarios_total", "scenarios_passed", "steps_total", "steps_passed"
+    )})
+    return pa.schema([(name, types.get(name, pa.string())) for name in names])
+
+def arrow_batch(schema, chunk):
+    import pyarrow as pa
+
+    return pa.RecordBatch.from_pydict({
+        name: [json.dumps(row[name]) if name == "details" else row[name] for row in chunk]
+        for name in schema.names
+    }, schema=schema)
+
+def arrow(names, rows, file_format):
+    """Arrow IPC stream or Parquet, a record batch (Parquet row group) per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(names)
+    sink = Drain()
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    else:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    for chunk in rows:
+        writer.write_batch(arrow_batch(schema, chunk))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+def stream(session_factory, dataset, file_format, **filters):
+    """Byte chunks of a dataset export in file_format."""
+    names, stmt = query(dataset, **filters)
+    rows = chunks(session_factory, stmt)
+    if file_format == "ndjson":
+        return ndjson(names, rows)
+    if file_format == "csv":
+        return csv_rows(names, rows)
+    return arrow(names, rows, file_format)
@@ -0,0 +1,162 @@
+"""Atomic per-system snapshots of matrix cells.
+
+In-place status ingest updates a system's cells inside one long write
+transaction. An atomic ingest instead writes the system's complete new set of
+cells as a staging generation, in as many short transactions as it takes,
+then publishes it: the per-system pointer in system_generations moves to the
+new generation and the system's phase summaries are replaced, one small
+transaction however many cells there are. Readers only see cells of each
+system's live generation (see current()), so they get either the old or the
+new matrix of a system, never a mix.
+
+The previous generation, and staging generations abandoned for longer than
+VORDU_STAGING_TTL_S (default 3600), are deleted in batches by collect(),
+which runs in the background after every publish.
+"""
+import os
+from datetime import timedelta
+
+from sqlalchemy import delete, func, insert, select, tuple_, update
+
+from . import summary
+from .history import utcnow
+from .models import MatrixCell, MatrixGeneration, SystemGeneration
+
+STAGING_TTL_S = float(os.getenv("VORDU_STAGING_TTL_S", "3600"))
+GC_BATCH = 1000
+
+COLUMNS = ("row_id", "phase_id", "status", "completion", "scenarios_total", "scenarios_passed",
+           "steps_total", "steps_passed", "details")
+
+class GenerationError(Exception):
+    """The generation does not exist, belongs to another system or is no longer staging."""
+
+def current():
+    """Criterion matching cells of their system's live generation."""
+    live = (
+        select(SystemGeneration.generation)
+        .where(SystemGeneration.project_name == MatrixCell.project_name)
+        .scalar_subquery()
+    )
+    return MatrixCell.generation == func.coalesce(live, 0)
+
+def live(db, projects):
+    """{project: live generation} for projects, 0 for those never published atomically."""
+    pointers = dict(db.execute(
+        select(SystemGeneration.project_name, SystemGeneration.generation)
+        .where(SystemGeneration.project_name.in_(projects))
+    ).all())
+    return {project: pointers.get(project, 0) for project in projects}
+
+def begin(db, project):
+    """Allocates a staging generation for project."""
+    generation = MatrixGeneration(project_name=project, state="staging", created_at=utcnow())
+    db.add(generation)
+    db.flush()
+    return generation.id
+
+def staging(db, project, generation):
+    found = db.get(MatrixGeneration, generation)
+    if found is None or found.project_name != project or found.state != "staging":
+        raise GenerationError(f"No staging generation {generation} for system {project}")
+    return found
+
+def stage(db, project, generation, items):
+    """Writes items (objects with MatrixCell's attributes) into a staging generation.
+
+    Chunks may repeat a cell, the last one written wins.
+    """
+    staging(db, project, generation)
+    cells = {(item.row_id, item.phase_id): item for item in items}
+    if not cells:
+        return 0
+    db.execute(
+        delete(MatrixCell)
+        .where(MatrixCell.project_name == project, MatrixCell.generation == generation,
+               tuple_(MatrixCell.row_id, MatrixCell.phase_id).in_(list(cells)))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(insert(MatrixCell), [
+        {"project_name": project, "generation": generation, **{c: getattr(item, c) for c in COLUMNS}}
+        for item in cells.values()
+    ])
+    return len(cells)
+
+def details_of(db, project, generation):
+    return {
+        (project, row, phase): details
+        for row, phase, details in db.execute(
+            select(MatrixCell.row_id, MatrixCell.phase_id, MatrixCell.details)
+            .where(MatrixCell.project_name == project, MatrixCell.generation == generation)
+        )
+    }
+
+def publish(db, project, generation):
+    """Makes a staged generation the system's live one. Leaves committing to the caller.
+
+    Returns (cells, reindex, new): the published cells, plus what the search
+    index needs to follow, {key: details} of cells whose details changed
+    (None for cells that are gone) and the keys that did not exist before.
+    """
+    staged = staging(db, project, generation)
+    previous = live(db, [project])[project]
+
+    # Reads first, the write lock is only taken by the statements below
+    totals = db.execute(summary.cell_totals_query(MatrixCell.generation == generation)).all()
+    before = details_of(db, project, previous)
+    # Plain rows, they outlive the commit without being reloaded
+    cells = db.execute(
+        select(MatrixCell.project_name, *(getattr(MatrixCell, c) for c in COLUMNS))
+        .where(MatrixCell.generation == generation)
+    ).all()
+
+    updated = db.execute(
+        update(SystemGeneration).where(SystemGeneration.project_name == project).values(generation=generation)
+    ).rowcount
+    if not updated:
+        db.add(SystemGeneration(project_name=project, generation=generation))
+    db.execute(
+        update(MatrixGeneration)
+        .where(MatrixGeneration.project_name == project, MatrixGeneration.state == "live")
+        .values(state="retired")
+    )
+    staged.state = "live"
+    summary.replace(db, project, totals)
+
+    after = {(c.project_name, c.row_id, c.phase_id): c.details for c in cells}
+    reindex = {key: details for key, details in after.items() if before.get(key) != details}
+    reindex.update((key, None) for key in before.keys() - after.keys())
+    return cells, reindex, after.keys() - before.keys()
+
+def collect(bind):
+    """Deletes cells of retired and abandoned generations, in short transactions.
+
+    Runs on a plain connection: nothing visible changes, so the data_version
+    bump (and cache invalidation) of an ORM session commit is not wanted.
+    """
+    expired = utcnow() - timedelta(seconds=STAGING_TTL_S)
+    with bind.begin() as conn:
+        conn.execute(
+            update(MatrixGeneration)
+            .where(MatrixGeneration.state == "staging", MatrixGeneration.created_at < expired)
+            .values(state="retired")
+        )
+    # Anything not staged or live, including generation 0 of systems published atomically since
+    active = select(MatrixGeneration.id).where(MatrixGeneration.state.in_(("staging", "live")))
+    garbage = (
+        ((MatrixCell.generation != 0) & MatrixCell.generation.not_in(active))
+        | ((MatrixCell.generation == 0) & MatrixCell.project_name.in_(select(SystemGeneration.project_name)))
+    )
+    deleted = 0
+    while True:
+        with bind.begin() as conn:
+            ids = conn.execute(select(MatrixCell.id).where(garbage).limit(GC_BATCH)).scalars().all()
+            if not ids:
+                conn.execute(delete(MatrixGeneration).where(MatrixGeneration.state == "retired"))
+                return deleted
+            conn.execute(delete(MatrixCell).where(MatrixCell.id.in_(ids)))
+        deleted += len(ids)
+
+def clear(db):
+    db.query(SystemGeneration).delete()
+    db.query(MatrixGeneration).delete()
@@ -0,0 +1,107 @@
+"""Row hierarchy as a closure table, for subtree rollups in one query.
+
+Rows nest through parent_row (vordu.io/parent-component). row_closure holds
+every (ancestor, descendant, depth) pair of a system's tree, rebuilt by
+sync_rows whenever the system's rows or their parents change. A subtree
+rollup then joins row_closure to matrix_cells on the indexed
+(system_name, ancestor) and (project_name, row_id) instead of walking the
+tree.
+"""
+from sqlalchemy import and_, case, delete, func, insert, select
+
+from . import generations
+from .models import MatrixCell, Row, RowClosure
+from .summary import FIELDS
+
+def closure(parents):
+    """(ancestor, descendant, depth) of every pair in the tree {key: parent key}.
+
+    A parent that is not a row of the system makes its child a root, and a
+    cycle is cut where it closes.
+    """
+    pairs = []
+    for key in parents:
+        seen = {key}
+        pairs.append((key, key, 0))
+        parent = parents.get(key)
+        depth = 1
+        while parent in parents and parent not in seen:
+            seen.add(parent)
+            pairs.append((parent, key, depth))
+            parent = parents[parent]
+            depth += 1
+    return pairs
+
+def rebuild(db, system_name, parents, existing=True):
+    """Replaces a system's closure rows with those of {key: parent key}."""
+    if existing:
+        db.execute(delete(RowClosure).where(RowClosure.system_name == system_name))
+    pairs = closure(parents)
+    if pairs:
+        db.execute(insert(RowClosure), [
+            {"system_name": system_name, "ancestor": ancestor, "descendant": descendant, "depth": depth}
+            for ancestor, descendant, depth in pairs
+        ])
+
+def clear(db):
+    db.query(RowClosure).delete()
+
+def backfill(session_factory):
+    """Builds the closure once for a database whose rows predate row_closure."""
+    with session_factory() as db:
+        if db.query(RowClosure.id).first() is None and db.query(Row.id).first() is not None:
+            systems = {}
+            for system_name, key, parent in db.execute(select(Row.system_name, Row.key, Row.parent_row)):
+                systems.setdefault(system_name, {})[key] = parent
+            for system_name, parents in systems.items():
+                rebuild(db, system_name, parents, existing=False)
+            db.commit()
+
+def rollup_query(system_name, row=None):
+    """Per (ancestor row, phase) totals of the cells in its subtree, in FIELDS order plus mean completion.
+
+    Rows without any cell yet come back once with a None phase.
+    """
+    cells = and_(
+        MatrixCell.project_name == RowClosure.system_name,
+        MatrixCell.row_id == RowClosure.descendant,
+        generations.current(),
+    )
+    stmt = (
+        select(
+            RowClosure.ancestor, MatrixCell.phase_id, func.count(MatrixCell.id),
+            func.sum(case((MatrixCell.status == "pass", 1), else_=0)),
+            func.sum(MatrixCell.scenarios_total), func.sum(MatrixCell.scenarios_passed),
+            func.sum(MatrixCell.steps_total), func.sum(MatrixCell.steps_passed),
+            func.avg(MatrixCell.completion),
+        )
+        .select_from(RowClosure)
+        .outerjoin(MatrixCell, cells)
+        .where(RowClosure.system_name == system_name)
+        .group_by(RowClosure.ancestor, MatrixCell.phase_id)
+        .order_by(RowClosure.ancestor, MatrixCell.phase_id)
+    )
+    if row is not None:
+        stmt = stmt.where(RowClosure.ancestor == row)
+    return stmt
+
+def rollups(db, system_name, row=None):
+    """Subtree totals per row of a system (or only row), overall and per phase."""
+    result = {}
+    for ancestor, phase_id, *values in db.execute(rollup_query(system_name, row)):
+        totals = result.setdefault(ancestor, {
+            "row": ancestor, **dict.fromkeys(FIELDS, 0), "completion": 0, "phases": [],
+        })
+        if phase_id is None:
+            continue
+        *counts, completion = values
+        phase = {"phase": phase_id, **{f: int(v or 0) for f, v in zip(FIELDS, counts)},
+                 "completion": round(completion or 0)}
+        totals["phases"].append(phase)
+        for field in FIELDS:
+            totals[field] += phase[field]
+        # Mean over every cell of the subtree, weighted by the phase's cell count
+        totals["completion"] += (completion or 0) * phase["cells"]
+    for totals in result.values():
+        totals["completion"] = round(totals["completion"] / totals["cells"]) if totals["cells"] else 0
+    return list(result.values())
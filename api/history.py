@@ -0,0 +1,255 @@
+"""Cell history, its retention policy and background compaction.
+
+Every cell write is also appended to cell_history. Without pruning that table
+grows with every CI run, so a compaction pass, run in the background every
+VORDU_COMPACTION_INTERVAL_S seconds (default 3600, 0 disables) and by
+POST /admin/compact:
+
+* keeps every sample for VORDU_RETAIN_RUNS_DAYS (default 14),
+* then only the last sample of each cell per day, for VORDU_RETAIN_DAILY_DAYS (default 365),
+* then the last per ISO week, dropped after VORDU_RETAIN_WEEKLY_DAYS (default 0, kept forever).
+
+The same pass expires scenario timings and run durations (api/durations.py).
+
+Downsampled samples lose their details. A pass stops after
+VORDU_COMPACTION_BUDGET_S seconds (default 5) and picks up where it left off
+next time; every batch is its own short transaction so ingest is never
+blocked for long. It then returns free pages to the file system
+(PRAGMA incremental_vacuum on SQLite) and refreshes planner statistics
+(ANALYZE), so the file size and query plans stay stable as history ages.
+
+A SQLite file created before incremental auto_vacuum reuses its free pages
+but never shrinks. Converting it takes a full VACUUM, which locks the
+database for its whole duration and needs about twice its size in free disk,
+so it only runs on request (POST /admin/compact?vacuum=true).
+
+Every worker schedules the background pass, a lease in the database lets
+one of them run it.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import timedelta, timezone
+
+from sqlalchemy import delete, select, text, tuple_, update
+
+from . import durations, metrics
+from .models import CellHistory, acquire_lease, utcnow
+
+RETAIN_RUNS_DAYS = int(os.getenv("VORDU_RETAIN_RUNS_DAYS", "14"))
+RETAIN_DAILY_DAYS = int(os.getenv("VORDU_RETAIN_DAILY_DAYS", "365"))
+RETAIN_WEEKLY_DAYS = int(os.getenv("VORDU_RETAIN_WEEKLY_DAYS", "0"))
+COMPACTION_INTERVAL_S = float(os.getenv("VORDU_COMPACTION_INTERVAL_S", "3600"))
+COMPACTION_BUDGET_S = float(os.getenv("VORDU_COMPACTION_BUDGET_S", "5"))
+
+# Cells downsampled per transaction, and ids per IN list
+CELL_BATCH = 200
+ID_BATCH = 500
+# Free pages handed back per incremental_vacuum step
+VACUUM_PAGES = 1000
+# The background pass is run by the worker holding this lease
+LEASE_NAME = "history_compaction"
+WORKER_ID = uuid.uuid4().hex
+
+logger = logging.getLogger("vordu.history")
+
+def naive_utc(ts):
+    """ts as naive UTC for comparisons with stored timestamps; naive input is taken as UTC."""
+    if ts is not None and ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+def record(db, cells, changed_details=()):
+    """Appends a sample per written cell, objects with MatrixCell's attributes (e.g. IngestItem).
+
+    Details are stored only for keys in changed_details, a sample without
+    details means they were unchanged by that write.
+    """
+    recorded_at = utcnow()
+    samples = [
+        {
+            "project_name": c.project_name, "row_id": c.row_id, "phase_id": c.phase_id,
+            "recorded_at": recorded_at, "resolution": "run",
+            "status": c.status, "completion": c.completion,
+            "scenarios_total": c.scenarios_total, "scenarios_passed": c.scenarios_passed,
+            "steps_total": c.steps_total, "steps_passed": c.steps_passed,
+            "details": c.details if (c.project_name, c.row_id, c.phase_id) in changed_details else None,
+        }
+        for c in cells
+    ]
+    if samples:
+        db.execute(CellHistory.__table__.insert(), samples)
+
+def clear(db):
+    db.query(CellHistory).delete()
+
+def read(db, project, row=None, phase=None, since=None, limit=1000):
+    """Samples of a project's cells, oldest first."""
+    query = select(
+        CellHistory.row_id, CellHistory.phase_id, CellHistory.recorded_at, CellHistory.resolution,
+        CellHistory.status, CellHistory.completion, CellHistory.scenarios_total, CellHistory.scenarios_passed,
+        CellHistory.steps_total, CellHistory.steps_passed,
+    ).where(CellHistory.project_name == project)
+    if row is not None:
+        query = query.where(CellHistory.row_id == row)
+    if phase is not None:
+        query = query.where(CellHistory.phase_id == phase)
+    if since is not None:
+        query = query.where(CellHistory.recorded_at >= since)
+    query = query.order_by(CellHistory.recorded_at, CellHistory.id).limit(limit)
+    return [
+        {
+            "row": r.row_id, "phase": r.phase_id, "recorded_at": r.recorded_at.isoformat() + "Z",
+            "resolution": r.resolution, "status": r.status, "completion": r.completion,
+            "scenarios_total": r.scenarios_total, "scenarios_passed": r.scenarios_passed,
+            "steps_total": r.steps_total, "steps_passed": r.steps_passed,
+        }
+        for r in db.execute(query)
+    ]
+
+def day_start(ts):
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def week_start(ts):
+    return day_start(ts) - timedelta(days=ts.weekday())
+
+def chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), ID_BATCH):
+        yield ids[start:start + ID_BATCH]
+
+def downsample(bind, source, target, bucket, cutoff, deadline, stats):
+    """Keeps the last source sample of each cell per bucket older than cutoff, as a target sample.
+
+    cutoff is a bucket boundary, so every bucket is complete when it is
+    downsampled and later passes never see it again. Returns False if the
+    deadline passed first.
+    """
+    old = (CellHistory.resolution == source, CellHistory.recorded_at < cutoff)
+    cell = tuple_(CellHistory.project_name, CellHistory.row_id, CellHistory.phase_id)
+    while time.monotonic() < deadline:
+        with bind.begin() as conn:
+            cells = conn.execute(
+                select(CellHistory.project_name, CellHistory.row_id, CellHistory.phase_id)
+                .where(*old).distinct().limit(CELL_BATCH)
+            ).all()
+            if not cells:
+                return True
+            last = {}
+            samples = conn.execute(
+                select(CellHistory.id, CellHistory.project_name, CellHistory.row_id, CellHistory.phase_id,
+                       CellHistory.recorded_at)
+                .where(*old, cell.in_([tuple(c) for c in cells]))
+                .order_by(CellHistory.recorded_at, CellHistory.id)
+            ).all()
+            for s in samples:
+                last[(s.project_name, s.row_id, s.phase_id, bucket(s.recorded_at))] = s.id
+            keep = set(last.values())
+            drop = [s.id for s in samples if s.id not in keep]
+            for ids in chunks(keep):
+                conn.execute(update(CellHistory).where(CellHistory.id.in_(ids)).values(resolution=target, details=None))
+            for ids in chunks(drop):
+                conn.execute(delete(CellHistory).where(CellHistory.id.in_(ids)))
+        stats["downsampled"] += len(keep)
+        stats["deleted"] += len(drop)
+        metrics.HISTORY_COMPACTED.labels("downsampled").inc(len(keep))
+        metrics.HISTORY_COMPACTED.labels("deleted").inc(len(drop))
+    return False
+
+def expire(bind, cutoff, deadline, stats):
+    """Deletes weekly samples older than cutoff, in batches. Returns False if the deadline passed first."""
+    while time.monotonic() < deadline:
+        with bind.begin() as conn:
+            ids = conn.execute(
+                select(CellHistory.id)
+                .where(CellHistory.resolution == "week", CellHistory.recorded_at < cutoff)
+                .limit(ID_BATCH)
+            ).scalars().all()
+            if not ids:
+                return True
+            conn.execute(delete(CellHistory).where(CellHistory.id.in_(ids)))
+        stats["deleted"] += len(ids)
+        metrics.HISTORY_COMPACTED.labels("deleted").inc(len(ids))
+    return False
+
+def reclaim(bind, deadline, stats, vacuum=False):
+    """Returns free pages to the file system and refreshes planner statistics.
+
+    With vacuum a SQLite file created before incremental auto_vacuum is
+    converted first, with one full VACUUM regardless of the deadline.
+    """
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if bind.dialect.name == "sqlite":
+            incremental = conn.execute(text("PRAGMA auto_vacuum")).scalar() == 2
+            if not incremental and vacuum:
+                logger.info("Converting the database to incremental auto_vacuum")
+                conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+                conn.execute(text("VACUUM"))
+                incremental = True
+            elif not incremental:
+                stats["needs_vacuum"] = True
+            # incremental_vacuum does nothing without it
+            while incremental and time.monotonic() < deadline:
+                free = conn.execute(text("PRAGMA freelist_count")).scalar()
+                if not free:
+                    break
+                conn.execute(text(f"PRAGMA incremental_vacuum({VACUUM_PAGES})"))
+                stats["vacuumed_pages"] += min(free, VACUUM_PAGES)
+            # Bounded sampling keeps ANALYZE fast on large tables
+            conn.execute(text("PRAGMA analysis_limit=1000"))
+            conn.execute(text("ANALYZE"))
+            size = (conn.execute(text("PRAGMA page_count")).scalar()
+                    * conn.execute(text("PRAGMA page_size")).scalar())
+        elif bind.dialect.name == "postgresql":
+            # Autovacuum reuses the space, refresh statistics for the churned table
+            conn.execute(text("ANALYZE cell_history"))
+            size = conn.execute(text("SELECT pg_database_size(current_database())")).scalar()
+        else:
+            return
+    metrics.DB_SIZE.set(size)
+    stats["database_bytes"] = size
+
+def compact(bind, budget=None, now=None, vacuum=False):
+    """One compaction pass within budget seconds. Returns what it did.
+
+    vacuum allows the full VACUUM converting an old SQLite file, see reclaim.
+    """
+    started = time.monotonic()
+    deadline = started + (COMPACTION_BUDGET_S if budget is None else budget)
+    now = now or utcnow()
+    stats = {"downsampled": 0, "deleted": 0, "durations_deleted": 0, "vacuumed_pages": 0, "complete": False}
+
+    complete = (
+        downsample(bind, "run", "day", day_start, day_start(now - timedelta(days=RETAIN_RUNS_DAYS)), deadline, stats)
+        and downsample(bind, "day", "week", week_start, week_start(now - timedelta(days=RETAIN_DAILY_DAYS)),
+                       deadline, stats)
+        and (not RETAIN_WEEKLY_DAYS or expire(bind, now - timedelta(days=RETAIN_WEEKLY_DAYS), deadline, stats))
+        and durations.expire(bind, now, deadline, stats)
+    )
+    reclaim(bind, deadline, stats, vacuum)
+    stats["complete"] = complete
+    stats["seconds"] = round(time.monotonic() - started, 3)
+    metrics.COMPACTION_SECONDS.observe(stats["seconds"])
+    return stats
+
+async def compaction_loop(bind, interval=COMPACTION_INTERVAL_S):
+    """Runs compact every interval seconds, off the event loop, if this worker holds the lease."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # Renewed every pass, another worker takes over two missed passes later
+            if not await asyncio.to_thread(acquire_lease, bind, LEASE_NAME, WORKER_ID, 2 * interval):
+                continue
+            stats = await asyncio.to_thread(compact, bind)
+            logger.info("History compaction: %s", stats)
+        except Exception:
+            # Typically the database was busy, the next pass retries
+            logger.exception("History compaction failed")
+
+def start_compaction(bind):
+    """Schedules the background compaction task, None if disabled."""
+    if COMPACTION_INTERVAL_S <= 0:
+        return None
+    return asyncio.get_running_loop().create_task(compaction_loop(bind))
@@ -0,0 +1,47 @@
+"""Loads spooled ingest payloads straight into the database.
+
+Usage: python -m api.importer spool/*.ndjson.gz
+
+Each file is a (gzip-compressed) NDJSON spool written by vordu_ingest.py
+--spool-dir. Every file given is imported in one transaction, so a failed
+record leaves the database untouched.
+"""
+import argparse
+import gzip
+import sys
+
+from .main import import_records
+from .models import SessionLocal
+
+def read_lines(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        yield from f
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import spooled Vörðu payloads into the database")
+    parser.add_argument("files", nargs="+", help="Spool files (.ndjson or .ndjson.gz)")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        totals = {}
+        for path in args.files:
+            try:
+                counts = import_records(db, read_lines(path))
+            except ValueError as e:
+                db.rollback()
+                print(f"{path}: {e}")
+                return 1
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+            print(f"{path}: {counts['records']} records")
+        db.commit()
+        print(f"Imported {totals['records']} records ({totals['configs']} configs, {totals['cells']} cells, "
+              f"{totals['scenarios']} scenarios)")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
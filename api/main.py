@@ -1,21 +1,110 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException, Depends, Request
+from fastapi.routing import APIRoute
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from .models import Base, engine, MatrixCell, get_db
-from pydantic import BaseModel
-from typing import List
+from .models import engine, async_engine, SessionLocal, AsyncSessionLocal, MatrixCell, get_db, get_async_db, init_db, startup_lock, utcnow
+from . import admission, cache, catalog, details, durations, export, generations, hierarchy, history, metrics, purge, rollup, search, summary
+from pydantic import BaseModel, TypeAdapter
+from typing import Dict, List
+from contextlib import asynccontextmanager
+from datetime import datetime
 
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.security import APIKeyHeader
 from fastapi import Security
 
 import os
+import inspect
+import json
+import uuid
+import zlib
 
 # Create tables
-Base.metadata.create_all(bind=engine)
+init_db(engine)
+search.create_index(engine)
+# Once for all workers, a second worker finds the tables already filled
+with startup_lock(engine) as backfill_session:
+    summary.backfill(backfill_session)
+    search.backfill(backfill_session)
+    hierarchy.backfill(backfill_session)
+    purge.backfill(backfill_session)
+metrics.instrument_engine(engine)
+if async_engine is not None:
+    metrics.instrument_engine(async_engine.sync_engine)
+cache.track_writes(SessionLocal)
 
-app = FastAPI(title="Vörðu API", description="The Living Roadmap Aggregator")
+def gunzip(data: bytes, limit: int) -> bytes:
+    """Inflates every member of a gzip stream, stopping once more than limit bytes came out.
+
+    Concatenated gzip files (the ingest script replays several spool files in
+    one request) are one stream of several members, each needs its own
+    decompressobj. Raises zlib.error for a truncated member or trailing garbage.
+    """
+    parts, size = [], 0
+    while True:
+        inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # Bounded, so a small gzip bomb cannot inflate past the limit
+        part = inflate.decompress(data, limit + 1 - size)
+        parts.append(part)
+        size += len(part)
+        if size > limit:
+            break
+        if not inflate.eof:
+            raise zlib.error("truncated gzip member")
+        data = inflate.unused_data
+        if not data:
+            break
+    return b"".join(parts)
+
+class GzipRequest(Request):
+    """Request that transparently inflates `Content-Encoding: gzip` bodies."""
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            route = metrics.route_template(self.scope)
+            # Dependencies run after the body is read, label rejections with the key if it is valid
+            key = admission.key_name(self.headers.get("X-API-Key"))
+            # Stop reading at the size limit rather than buffering whatever a client sends
+            if int(self.headers.get("Content-Length") or 0) > admission.MAX_BODY_BYTES:
+                admission.check_body_size(route, key, int(self.headers["Content-Length"]))
+            parts, size = [], 0
+            async for chunk in self.stream():
+                size += len(chunk)
+                admission.check_body_size(route, key, size)
+                parts.append(chunk)
+            body = b"".join(parts)
+            if "gzip" in self.headers.getlist("Content-Encoding"):
+                try:
+                    body = gunzip(body, admission.MAX_BODY_BYTES)
+                except zlib.error:
+                    raise HTTPException(status_code=400, detail="Invalid gzip request body")
+                admission.check_body_size(route, key, len(body))
+            self._body = body
+        return self._body
+
+class GzipRoute(APIRoute):
+    """Route class so ingest clients can send compressed payloads."""
+    def get_route_handler(self):
+        original_route_handler = super().get_route_handler()
+
+        async def custom_route_handler(request: Request):
+            request = GzipRequest(request.scope, request.receive)
+            return await original_route_handler(request)
+
+        return custom_route_handler
+
+@asynccontextmanager
+async def lifespan(app):
+    compaction = history.start_compaction(engine)
+    yield
+    if compaction is not None:
+        compaction.cancel()
+
+app = FastAPI(title="Vörðu API", description="The Living Roadmap Aggregator", lifespan=lifespan)
+app.router.route_class = GzipRoute
 
 # Mount static files (after building UI)
 # Ensure the directory exists to avoid errors during dev if not built
@@ -29,6 +118,49 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so latency includes CORS handling and every response is counted
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(OperationalError)
+async def database_error_handler(request: Request, exc: OperationalError):
+    # SQLite reports writer contention as "database is locked", ask clients to come back
+    if "locked" in str(exc.orig).lower() or "busy" in str(exc.orig).lower():
+        metrics.DB_BUSY.labels(metrics.route_template(request.scope)).inc()
+        return JSONResponse(status_code=503, content={"detail": "Database is locked, retry later"},
+                            headers={"Retry-After": "1"})
+    return JSONResponse(status_code=500, content={"detail": "Database error"})
+
+def read_route(path: str, **kwargs):
+    """Registers fn(db, **params) as a read-only GET endpoint.
+
+    With an async driver (aiosqlite, psycopg) the handler is async and runs fn
+    on an AsyncSession through run_sync, so a request waiting on the database
+    holds no threadpool thread. With VORDU_ASYNC_DB=0 or no driver installed fn
+    runs in the threadpool like every other handler. Parameters other than db
+    are declared on fn as usual.
+    """
+    def register(fn):
+        signature = inspect.signature(fn)
+        if AsyncSessionLocal is None:
+            db_param = {"annotation": Session, "default": Depends(get_db)}
+
+            def handler(**params):
+                return fn(**params)
+        else:
+            db_param = {"annotation": AsyncSession, "default": Depends(get_async_db)}
+
+            async def handler(**params):
+                db = params.pop("db")
+                return await db.run_sync(lambda session: fn(session, **params))
+        handler.__name__, handler.__doc__ = fn.__name__, fn.__doc__
+        # Keyword-only, so db (now with a Depends default) may precede required parameters
+        handler.__signature__ = signature.replace(parameters=[
+            p.replace(kind=inspect.Parameter.KEYWORD_ONLY, **(db_param if name == "db" else {}))
+            for name, p in signature.parameters.items()
+        ])
+        app.get(path, **kwargs)(handler)
+        return fn
+    return register
 
 # Pydantic Models
 class IngestItem(BaseModel):
@@ -53,34 +185,90 @@ class MatrixResponse(BaseModel):
     scenarios_passed: int
     steps_total: int
     steps_passed: int
+
+class MatrixDetailsResponse(MatrixResponse):
     details: List[dict] = []
 
+class MatrixColumns(BaseModel):
+    # project, row and status are indexes into ColumnarMatrixResponse.dictionaries
+    project: List[int]
+    row: List[int]
+    phase: List[int]
+    status: List[int]
+    completion: List[int]
+    scenarios_total: List[int]
+    scenarios_passed: List[int]
+    steps_total: List[int]
+    steps_passed: List[int]
+
+class ColumnarMatrixResponse(BaseModel):
+    count: int
+    dictionaries: Dict[str, List[str]] # project, row and status values, by index
+    columns: MatrixColumns
+
 
 
 @app.get("/health")
 def health_check():
     return {"message": "Vörðu API is running. The Cairn stands tall."}
 
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 async def get_api_key(api_key_header: str = Security(api_key_header)):
-    expected_key = os.getenv("VORDU_API_KEY", "dev-key") # Default to dev-key if not set
-    
-    if api_key_header == expected_key:
-        return api_key_header
-    raise HTTPException(status_code=403, detail="Could not validate credentials")
+    """The name of the caller's API key, see api/admission.py."""
+    name = admission.key_name(api_key_header)
+    if name is None:
+        raise HTTPException(status_code=403, detail="Could not validate credentials")
+    return name
+
+async def admit_write(request: Request, api_key: str = Depends(get_api_key)):
+    """get_api_key plus the per-key rate limit and a write slot, held until the handler returns."""
+    async with admission.admit(metrics.route_template(request.scope), api_key):
+        yield api_key
 
 @app.delete("/admin/db")
-def reset_database(db: Session = Depends(get_db), api_key: str = Depends(get_api_key)):
-    """Wipes the database for testing purposes."""
-    # Delete all rows in dependency order
-    db.query(MatrixCell).delete()
-    from .models import Row, System
-    db.query(Row).delete()
-    db.query(System).delete()
-    db.commit()
+def reset_database(api_key: str = Depends(get_api_key)):
+    """Wipes the database for testing purposes, by dropping and recreating the tables, see api/purge.py."""
+    purge.reset(engine)
     return {"status": "database_reset"}
 
+@app.delete("/admin/systems/{name}")
+def purge_system(name: str, api_key: str = Depends(admit_write)):
+    """Deletes everything stored for one system, in batches."""
+    deleted = purge.purge_system(SessionLocal, name)
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"No system {name}")
+    return {"status": "purged", "systems": [name], "deleted": deleted}
+
+@app.delete("/admin/domains/{domain}")
+def purge_domain(domain: str, api_key: str = Depends(admit_write)):
+    """Deletes every system of a domain, in batches."""
+    names, deleted = purge.purge_domain(SessionLocal, domain)
+    if not names:
+        raise HTTPException(status_code=404, detail=f"No system in domain {domain}")
+    return {"status": "purged", "systems": names, "deleted": deleted}
+
+@app.delete("/admin/cells")
+def purge_cells(older_than: datetime, system: str | None = None, api_key: str = Depends(admit_write)):
+    """Deletes the matrix cells (of one system, or all) not written since older_than, in batches."""
+    deleted = purge.purge_cells(SessionLocal, history.naive_utc(older_than), system)
+    return {"status": "purged", "deleted": deleted}
+
+@app.post("/admin/compact")
+def compact_history(vacuum: bool = False, api_key: str = Depends(get_api_key)):
+    """Runs a history compaction pass now (it also runs in the background), see api/history.py.
+
+    vacuum converts a SQLite file created before incremental auto_vacuum with a
+    full VACUUM, which locks the database while it runs.
+    """
+    return history.compact(engine, vacuum=vacuum)
+
 class ComponentItem(BaseModel):
     name: str # The ID
     label: str
@@ -92,6 +280,8 @@ class SystemConfig(BaseModel):
     label: str
     description: str | None = None
     domain: str | None = None
+    granularity: str | None = None # domain, system, component (default) or subcomponent
+    row_label: str | None = None
 
 class IngestPayload(BaseModel):
     system: SystemConfig
@@ -102,75 +292,124 @@ class IngestPayload(BaseModel):
     # User asked for "Data coming from catalog files". 
     # Let's add a NEW endpoint /config/ingest that takes the same payload structure as the script generates.
 
-@app.post("/config/ingest")
-def ingest_config(payload: IngestPayload, db: Session = Depends(get_db), api_key: str = Depends(get_api_key)):
-    from .models import System, Row
-    
-    # Upsert System
-    system = db.query(System).filter(System.name == payload.system.name).first()
+def upsert_system(db: Session, config: SystemConfig):
+    """Upserts a System. Returns (system, granularity_changed)."""
+    from .models import System
+
+    system = db.query(System).filter(System.name == config.name).first()
     if not system:
-        system = System(
-            name=payload.system.name,
-            label=payload.system.label,
-            description=payload.system.description,
-            domain=payload.system.domain
-        )
+        system = System(name=config.name)
         db.add(system)
-    else:
-        system.label = payload.system.label
-        system.description = payload.system.description
-        system.domain = payload.system.domain
-    
+    previous = system.granularity or rollup.DEFAULT_GRANULARITY
+    system.label = config.label
+    system.description = config.description
+    system.domain = config.domain
+    # Older clients do not send these, keep what we know then
+    if config.granularity:
+        system.granularity = config.granularity
+    if config.row_label:
+        system.row_label = config.row_label
     db.flush() # Get ID if needed, though we use name relation
-    
-    # Upsert Rows (Components)
-    for comp in payload.components:
-        row = db.query(Row).filter(Row.system_name == payload.system.name, Row.key == comp.name).first()
+    return system, previous != (system.granularity or rollup.DEFAULT_GRANULARITY)
+
+def sync_rows(db: Session, system_name: str, rows: List[dict], prune: bool = False):
+    """Upserts display rows ({"key", "label", "parent_row"}), optionally deleting the others."""
+    from .models import Row
+
+    # Existing rows are loaded in one query
+    existing_rows = {
+        row.key: row for row in db.query(Row).filter(Row.system_name == system_name)
+    }
+    parents_before = {key: row.parent_row for key, row in existing_rows.items()}
+    parents = {} if prune else dict(parents_before)
+    new_rows = {}
+    for item in rows:
+        parents[item["key"]] = item["parent_row"]
+        row = existing_rows.get(item["key"])
         if not row:
-            row = Row(
-                system_name=payload.system.name,
-                key=comp.name,
-                label=comp.label,
-                parent_row=comp.parent
-            )
-            db.add(row)
+            new_rows[item["key"]] = {"system_name": system_name, **item}
         else:
-            row.label = comp.label
-            row.parent_row = comp.parent
-            
-    db.commit()
-    return {"status": "config_updated", "system": payload.system.name}
+            row.label = item["label"]
+            row.parent_row = item["parent_row"]
+    if new_rows:
+        # Bulk insert (one executemany) rather than an INSERT ... RETURNING per row
+        db.execute(insert(Row), list(new_rows.values()))
+    if prune:
+        # Ghost rows left behind by a granularity or catalog change
+        keys = {item["key"] for item in rows}
+        ghosts = [row.id for key, row in existing_rows.items() if key not in keys]
+        if ghosts:
+            db.query(Row).filter(Row.id.in_(ghosts)).delete(synchronize_session=False)
+    if parents != parents_before:
+        # Only a changed tree rewrites the closure, a repeated config costs nothing
+        hierarchy.rebuild(db, system_name, parents, existing=bool(existing_rows))
 
-# Combined Ingest Route (Optional, if we want one endpoint to rule them all)
-# But strictly following separation of concerns is better.
-# We'll need to update the script to call this too.
+    # Autoflush is off, later lookups in the same transaction must see these rows
+    db.flush()
 
-@app.post("/ingest")
-def ingest_status(items: List[IngestItem], db: Session = Depends(get_db), api_key: str = Depends(get_api_key)):
-    # Bulk upsert logic
+def apply_config(db: Session, payload: IngestPayload) -> bool:
+    """Upserts a system and its rows. Flushes but leaves committing to the caller.
+
+    Returns True when the system's granularity changed.
+    """
+    system, granularity_changed = upsert_system(db, payload.system)
+    sync_rows(db, system.name, [
+        {"key": comp.name, "label": comp.label, "parent_row": comp.parent} for comp in payload.components
+    ])
+    return granularity_changed
+
+def apply_status(db: Session, items: List[IngestItem], run_id: str | None = None) -> int:
+    """Upserts matrix cells. Flushes but leaves committing to the caller.
+
+    Scenario durations in the details are stored as timings of run_id (one
+    run per call if None) instead, see api/durations.py.
+    """
+    timings = durations.from_items(items)
+    # Bulk upsert logic, existing cells of every project in the payload are loaded in one query
+    projects = {item.project_name for item in items}
+    existing_cells = {}
+    if projects:
+        existing_cells = {
+            (c.project_name, c.row_id, c.phase_id): c
+            for c in db.query(MatrixCell).filter(MatrixCell.project_name.in_(projects), generations.current())
+        }
+        # New cells join the live generation of systems that were published atomically,
+        # which their existing cells already carry
+        live = {c.project_name: c.generation for c in existing_cells.values()}
+        if projects - live.keys():
+            live.update(generations.live(db, projects - live.keys()))
+
+    new_cells = {}
+    previous = {} # Totals of updated cells before this write, for the summary delta
+    reindex = {} # Cells whose details (and so search documents) changed
+    written = {} # Last item per cell, for its history sample
     updated_count = 0
     for item in items:
-        cell = db.query(MatrixCell).filter(
-            MatrixCell.project_name == item.project_name,
-            MatrixCell.row_id == item.row_id,
-            MatrixCell.phase_id == item.phase_id
-        ).first()
+        key = (item.project_name, item.row_id, item.phase_id)
+        written[key] = item
+        cell = existing_cells.get(key)
 
         if not cell:
-            cell = MatrixCell(
-                project_name=item.project_name,
-                row_id=item.row_id,
-                phase_id=item.phase_id,
-                status=item.status,
-                completion=item.completion,
-                scenarios_total=item.scenarios_total,
-                scenarios_passed=item.scenarios_passed,
-                steps_total=item.steps_total,
-                steps_passed=item.steps_passed,
-                details=item.details
-            )
-            db.add(cell)
+            new_cells[key] = {
+                "project_name": item.project_name,
+                "row_id": item.row_id,
+                "phase_id": item.phase_id,
+                "status": item.status,
+                "completion": item.completion,
+                "scenarios_total": item.scenarios_total,
+                "scenarios_passed": item.scenarios_passed,
+                "steps_total": item.steps_total,
+                "steps_passed": item.steps_passed,
+                "details": item.details,
+                "generation": live[item.project_name],
+            }
         else:
+            if key not in previous:
+                previous[key] = summary.cell_totals(
+                    cell.status, cell.scenarios_total, cell.scenarios_passed, cell.steps_total, cell.steps_passed
+                )
+            if key in reindex or cell.details != item.details:
+                reindex[key] = item.details
             cell.status = item.status
             cell.completion = item.completion
             cell.scenarios_total = item.scenarios_total
@@ -179,14 +418,413 @@ def ingest_status(items: List[IngestItem], db: Session = Depends(get_db), api_ke
             cell.steps_passed = item.steps_passed
             cell.details = item.details
         updated_count += 1
-    
+    # Every write dates the cell, changed or not. Unchanged cells are not flushed,
+    # one statement for all of them keeps their revision
+    now = utcnow()
+    unchanged = []
+    for key in written.keys() & existing_cells.keys():
+        cell = existing_cells[key]
+        if db.is_modified(cell):
+            cell.updated_at = now
+        else:
+            unchanged.append(cell.id)
+    for start in range(0, len(unchanged), history.ID_BATCH):
+        db.execute(
+            update(MatrixCell).where(MatrixCell.id.in_(unchanged[start:start + history.ID_BATCH]))
+            .values(updated_at=now, revision=MatrixCell.revision),
+            execution_options={"synchronize_session": False},
+        )
+    if new_cells:
+        # Bulk insert (one executemany) rather than an INSERT ... RETURNING per cell
+        db.execute(insert(MatrixCell), list(new_cells.values()))
+
+    # Autoflush is off, later lookups in the same transaction must see these cells
+    db.flush()
+
+    delta = summary.SummaryDelta()
+    for key, totals in previous.items():
+        cell = existing_cells[key]
+        delta.remove(cell.project_name, cell.phase_id, totals)
+        delta.add(cell.project_name, cell.phase_id, summary.cell_totals(
+            cell.status, cell.scenarios_total, cell.scenarios_passed, cell.steps_total, cell.steps_passed
+        ))
+    for cell in new_cells.values():
+        delta.add(cell["project_name"], cell["phase_id"], summary.cell_totals(
+            cell["status"], cell["scenarios_total"], cell["scenarios_passed"], cell["steps_total"], cell["steps_passed"]
+        ))
+    delta.apply(db)
+
+    reindex.update((key, cell["details"]) for key, cell in new_cells.items())
+    search.index_cells(db, reindex, new=new_cells)
+    history.record(db, written.values(), changed_details=reindex)
+    for project, project_timings in timings.items():
+        durations.record(db, project, run_id or uuid.uuid4().hex, project_timings)
+    return updated_count
+
+class CatalogDocuments(BaseModel):
+    documents: List[dict] # Raw catalog entities of any number of systems, see api/catalog.py
+
+def ingest_catalog(db: Session, api_key: str, payload: CatalogDocuments):
+    try:
+        systems, skipped = catalog.index(payload.documents)
+        configs = [ConfigPayloadAdapter.validate_python(catalog.config_payload(s)) for s in systems.values()]
+    except ValueError as e: # ValidationError is a ValueError
+        raise HTTPException(status_code=422, detail=f"Invalid catalog documents: {e}")
+    components = sum(len(config.components) for config in configs)
+    metrics.INGEST_ITEMS.labels("/config/ingest").observe(components)
+    admission.check_items("/config/ingest", api_key, components)
+    for config in configs:
+        if apply_config(db, config):
+            reaggregate(db, config.system.name)
+    db.commit()
+    return {"status": "config_updated", "systems": [config.system.name for config in configs], "skipped": skipped}
+
+@app.post("/config/ingest")
+def ingest_config(payload: IngestPayload | CatalogDocuments, db: Session = Depends(get_db),
+                  api_key: str = Depends(admit_write)):
+    """Upserts one system's config, or those of every System in raw catalog documents."""
+    if isinstance(payload, CatalogDocuments):
+        return ingest_catalog(db, api_key, payload)
+    metrics.INGEST_ITEMS.labels("/config/ingest").observe(len(payload.components))
+    admission.check_items("/config/ingest", api_key, len(payload.components))
+    if apply_config(db, payload):
+        # Systems ingested at scenario level re-aggregate from stored results
+        reaggregate(db, payload.system.name)
+    db.commit()
+    return {"status": "config_updated", "system": payload.system.name}
+
+# Combined Ingest Route (Optional, if we want one endpoint to rule them all)
+# But strictly following separation of concerns is better.
+# We'll need to update the script to call this too.
+
+@app.post("/ingest")
+def ingest_status(items: List[IngestItem], background_tasks: BackgroundTasks, atomic: bool = False,
+                  run_id: str | None = None, db: Session = Depends(get_db), api_key: str = Depends(admit_write)):
+    metrics.INGEST_ITEMS.labels("/ingest").observe(len(items))
+    admission.check_items("/ingest", api_key, len(items))
+    if atomic:
+        # Each system in the payload is replaced by its cells here as one snapshot
+        by_system = {}
+        for item in items:
+            by_system.setdefault(item.project_name, []).append(item)
+        timings = durations.from_items(items)
+        published = {}
+        for name, system_items in by_system.items():
+            generation = generations.begin(db, name)
+            generations.stage(db, name, generation, system_items)
+            if name in timings:
+                durations.record(db, name, run_id or f"generation-{generation}", timings[name])
+            db.commit()
+            published[name] = publish_snapshot(db, name, generation, background_tasks)["generation"]
+        return {"status": "published", "count": len(items), "generations": published}
+    updated_count = apply_status(db, items, run_id)
     db.commit()
     return {"status": "updated", "count": updated_count}
 
-@app.get("/matrix", response_model=List[MatrixResponse])
-def get_matrix(db: Session = Depends(get_db)):
-    cells = db.query(MatrixCell).all()
-    return [
+# Atomic Snapshots
+# A system's complete set of cells is staged as a new generation, over as many
+# requests as the client needs, then published in one small transaction.
+# Readers see the old or the new cells of the system, never a mix.
+# See api/generations.py.
+
+@app.exception_handler(generations.GenerationError)
+async def generation_error_handler(request: Request, exc: generations.GenerationError):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+def publish_snapshot(db: Session, name: str, generation: int, background_tasks: BackgroundTasks):
+    cells, reindex, new = generations.publish(db, name, generation)
+    db.commit()
+    # Search documents and history samples follow in their own transaction, after the flip
+    search.index_cells(db, reindex, new=new)
+    history.record(db, cells, changed_details=reindex)
+    db.commit()
+    background_tasks.add_task(generations.collect, engine)
+    return {"status": "published", "system": name, "generation": generation, "count": len(cells)}
+
+@app.post("/systems/{name}/generations")
+def begin_generation(name: str, db: Session = Depends(get_db), api_key: str = Depends(admit_write)):
+    """Starts a staging generation for the system."""
+    generation = generations.begin(db, name)
+    db.commit()
+    return {"system": name, "generation": generation}
+
+@app.post("/systems/{name}/generations/{generation}/cells")
+def stage_cells(name: str, generation: int, items: List[IngestItem], run_id: str | None = None,
+                db: Session = Depends(get_db), api_key: str = Depends(admit_write)):
+    """Adds cells to a staging generation, invisible until it is published."""
+    metrics.INGEST_ITEMS.labels("/systems/{name}/generations/{generation}/cells").observe(len(items))
+    admission.check_items("/systems/{name}/generations/{generation}/cells", api_key, len(items))
+    if any(item.project_name != name for item in items):
+        raise HTTPException(status_code=422, detail=f"Every cell must belong to system {name}")
+    timings = durations.from_items(items)
+    count = generations.stage(db, name, generation, items)
+    if name in timings:
+        # A generation is one run unless the client says otherwise
+        durations.record(db, name, run_id or f"generation-{generation}", timings[name])
+    db.commit()
+    return {"status": "staged", "count": count}
+
+@app.post("/systems/{name}/generations/{generation}/publish")
+def publish_generation(name: str, generation: int, background_tasks: BackgroundTasks,
+                       db: Session = Depends(get_db), api_key: str = Depends(admit_write)):
+    """Makes a staging generation the system's live cells, the previous ones are collected in the background."""
+    return publish_snapshot(db, name, generation, background_tasks)
+
+# Scenario-Level Ingest (Server-Side Rollups)
+# The client sends every scenario with its component and phase instead of
+# pre-aggregated cells. Rollups per granularity are computed here and only the
+# rows whose scenarios changed are recomputed.
+
+class ScenarioItem(BaseModel):
+    component: str
+    phase: int
+    feature: str
+    scenario: str
+    status: str | None = None
+    passed_steps: int = 0
+    total_steps: int = 0
+    tag: str = ""
+    steps: List[dict] = []
+    duration_ms: float | None = None # Also per step, in steps
+
+class ScenarioIngestPayload(BaseModel):
+    system: SystemConfig
+    components: List[ComponentItem] # As declared in the catalog, not synthesized
+    scenarios: List[ScenarioItem]
+    # Chunked uploads share a run_id and set complete only on the last chunk,
+    # which prunes scenarios the run did not report.
+    run_id: str | None = None
+    complete: bool = True
+
+class GranularityUpdate(BaseModel):
+    granularity: str
+
+GRANULARITIES = {"domain", "system", "component", "subcomponent"}
+
+def write_rollup(db: Session, system, touched_components=None, components=None) -> int:
+    """Recomputes cells for touched components (None: all) and drops ghost cells."""
+    cells, live_rows = rollup.recompute(db, system, touched_components, components)
+    if cells:
+        apply_status(db, [IngestItem.model_construct(**cell) for cell in cells])
+    if touched_components is None:
+        ghosts = (MatrixCell.project_name == system.name, MatrixCell.row_id.not_in(live_rows), generations.current())
+        if summary.remove_cells(db, *ghosts):
+            db.query(MatrixCell).filter(*ghosts).delete(synchronize_session=False)
+            search.remove_ghosts(db, system.name, live_rows)
+    return len(cells)
+
+def reaggregate(db: Session, system_name: str) -> int | None:
+    """Re-aggregates a system from stored scenarios, None if it has none."""
+    from .models import System, CatalogComponent
+
+    system = db.query(System).filter(System.name == system_name).first()
+    if not system or not db.query(CatalogComponent.id).filter(CatalogComponent.system_name == system_name).first():
+        return None
+    return write_rollup(db, system)
+
+def apply_scenarios(db: Session, payload: ScenarioIngestPayload) -> dict:
+    """Stores scenario results and incrementally recomputes the affected cells."""
+    from .models import CatalogComponent, ScenarioResult
+
+    system, granularity_changed = upsert_system(db, payload.system)
+    name = system.name
+    run_id = payload.run_id or uuid.uuid4().hex
+
+    # Catalog components, replaced wholesale when the structure changes
+    existing_components = (
+        db.query(CatalogComponent).filter(CatalogComponent.system_name == name).order_by(CatalogComponent.id).all()
+    )
+    declared = [(c.name, c.parent) for c in payload.components]
+    structure_changed = declared != [(c.name, c.parent) for c in existing_components]
+    if structure_changed:
+        if existing_components:
+            db.query(CatalogComponent).filter(CatalogComponent.system_name == name).delete(synchronize_session=False)
+        if payload.components:
+            db.execute(insert(CatalogComponent), [
+                {"system_name": name, "name": c.name, "label": c.label, "parent": c.parent} for c in payload.components
+            ])
+    else:
+        for comp, item in zip(existing_components, payload.components):
+            comp.label = item.label
+
+    # Upsert scenarios, remembering which components saw a change. A scenario is
+    # identified within its component, the same name can be reported by several
+    existing = {
+        (s.component, s.feature, s.scenario): s
+        for s in db.query(ScenarioResult).filter(ScenarioResult.project_name == name)
+    }
+    touched = set()
+    new_scenarios = {}
+    changed = {}
+    unchanged = set()
+    # Durations are stored as timings of the run, not with the scenario, see api/durations.py
+    parents = {c.name: c.parent for c in payload.components}
+    granularity = system.granularity or rollup.DEFAULT_GRANULARITY
+    timings = []
+    for item in payload.scenarios:
+        detail = {"feature": item.feature, "scenario": item.scenario, "steps": item.steps}
+        if item.duration_ms is not None:
+            detail["duration_ms"] = item.duration_ms
+        (detail,), taken = durations.take([detail])
+        timings.extend(
+            {"row_id": rollup.target_row(granularity, name, system.domain or "unknown-domain", item.component,
+                                         parents.get(item.component)),
+             "phase_id": item.phase, "feature": item.feature, "scenario": item.scenario,
+             "duration_ms": duration, "steps": step_timings}
+            for _, duration, step_timings in taken
+        )
+        values = {
+            "component": item.component,
+            "phase_id": item.phase,
+            "status": item.status,
+            "passed_steps": item.passed_steps,
+            "total_steps": item.total_steps,
+            "tag": item.tag,
+            "steps": detail["steps"],
+        }
+        key = (item.component, item.feature, item.scenario)
+        current = existing.get(key)
+        if current is None:
+            new_scenarios[key] = {
+                "project_name": name, "feature": item.feature, "scenario": item.scenario, "run_id": run_id, **values
+            }
+            touched.add(item.component)
+            continue
+        if any(getattr(current, field) != value for field, value in values.items()):
+            touched.add(item.component)
+            changed[current.id] = {"id": current.id, "run_id": run_id, **values}
+        else:
+            unchanged.add(current.id)
+    # One executemany for changed scenarios and one UPDATE for the rest, instead
+    # of an UPDATE per scenario from the unit of work
+    if changed:
+        db.execute(update(ScenarioResult), list(changed.values()))
+    unchanged -= changed.keys()
+    if unchanged:
+        db.execute(
+            update(ScenarioResult).where(ScenarioResult.id.in_(unchanged)).values(run_id=run_id),
+            execution_options={"synchronize_session": False},
+        )
+    if new_scenarios:
+        db.execute(insert(ScenarioResult), list(new_scenarios.values()))
+
+    pruned = 0
+    if payload.complete:
+        seen = changed.keys() | unchanged
+        stale = [s for s in existing.values() if s.id not in seen and s.run_id != run_id]
+        if stale:
+            touched.update(s.component for s in stale)
+            pruned = db.query(ScenarioResult).filter(
+                ScenarioResult.id.in_([s.id for s in stale])
+            ).delete(synchronize_session=False)
+
+    # Display rows follow the granularity, ghost rows are removed
+    if granularity_changed or structure_changed:
+        sync_rows(db, name, rollup.config_rows(system, payload.components, system.row_label), prune=True)
+        cells = write_rollup(db, system, components=payload.components)
+    else:
+        cells = write_rollup(db, system, touched, payload.components) if touched else 0
+
+    durations.record(db, name, run_id, timings)
+    return {"scenarios": len(payload.scenarios), "pruned": pruned, "cells": cells}
+
+@app.post("/ingest/scenarios")
+def ingest_scenarios(payload: ScenarioIngestPayload, db: Session = Depends(get_db), api_key: str = Depends(admit_write)):
+    metrics.INGEST_ITEMS.labels("/ingest/scenarios").observe(len(payload.scenarios))
+    admission.check_items("/ingest/scenarios", api_key, len(payload.scenarios))
+    counts = apply_scenarios(db, payload)
+    db.commit()
+    return {"status": "updated", "system": payload.system.name, **counts}
+
+@app.put("/systems/{name}/granularity")
+def set_granularity(name: str, update: GranularityUpdate, db: Session = Depends(get_db), api_key: str = Depends(admit_write)):
+    """Switches a system's rollup and re-aggregates it from stored scenarios, no re-ingest needed."""
+    from .models import System, CatalogComponent
+
+    if update.granularity not in GRANULARITIES:
+        raise HTTPException(status_code=422, detail=f"granularity must be one of {sorted(GRANULARITIES)}")
+    system = db.query(System).filter(System.name == name).first()
+    if not system:
+        raise HTTPException(status_code=404, detail="System not found")
+    system.granularity = update.granularity
+    components = (
+        db.query(CatalogComponent).filter(CatalogComponent.system_name == name).order_by(CatalogComponent.id).all()
+    )
+    if not components:
+        raise HTTPException(status_code=409, detail="System has no scenario-level data to re-aggregate")
+    sync_rows(db, name, rollup.config_rows(system, components, system.row_label), prune=True)
+    cells = write_rollup(db, system)
+    db.commit()
+    return {"status": "reaggregated", "system": name, "granularity": update.granularity, "cells": cells}
+
+# Bulk Import (Spooled Payloads)
+# The ingest script spools payloads it could not deliver as NDJSON records of
+# {"endpoint": "/config/ingest" | "/ingest" | "/ingest/scenarios", "payload": ...}. Replaying them here
+# loads a whole outage worth of builds in one request and one transaction.
+
+ConfigPayloadAdapter = TypeAdapter(IngestPayload)
+StatusPayloadAdapter = TypeAdapter(List[IngestItem])
+ScenarioPayloadAdapter = TypeAdapter(ScenarioIngestPayload)
+
+def import_records(db: Session, lines) -> dict:
+    """Applies spooled NDJSON records in order. Raises ValueError naming the bad line."""
+    counts = {"records": 0, "configs": 0, "cells": 0, "scenarios": 0}
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            endpoint = record["endpoint"]
+            if endpoint == "/config/ingest":
+                payload = ConfigPayloadAdapter.validate_python(record["payload"])
+                if apply_config(db, payload):
+                    reaggregate(db, payload.system.name)
+                counts["configs"] += 1
+            elif endpoint == "/ingest":
+                counts["cells"] += apply_status(db, StatusPayloadAdapter.validate_python(record["payload"]))
+            elif endpoint == "/ingest/scenarios":
+                applied = apply_scenarios(db, ScenarioPayloadAdapter.validate_python(record["payload"]))
+                counts["scenarios"] += applied["scenarios"]
+                counts["cells"] += applied["cells"]
+            else:
+                raise ValueError(f"unknown endpoint {endpoint!r}")
+        except (ValueError, KeyError, TypeError) as e: # ValidationError is a ValueError
+            raise ValueError(f"line {line_no}: {e}") from e
+        counts["records"] += 1
+    return counts
+
+async def read_body(request: Request) -> bytes:
+    return await request.body()
+
+@app.post("/admin/import")
+def bulk_import(body: bytes = Depends(read_body), db: Session = Depends(get_db), api_key: str = Depends(admit_write)):
+    """Imports spooled NDJSON payloads (optionally gzip-encoded) in a single transaction."""
+    try:
+        counts = import_records(db, body.decode("utf-8").splitlines())
+    except (ValueError, UnicodeDecodeError) as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=f"Invalid spool record: {e}")
+    db.commit()
+    metrics.INGEST_ITEMS.labels("/admin/import").observe(counts["records"])
+    return {"status": "imported", **counts}
+
+MatrixAdapter = TypeAdapter(List[MatrixResponse])
+MatrixDetailsAdapter = TypeAdapter(List[MatrixDetailsResponse])
+matrix_cache = cache.SnapshotCache("matrix")
+matrix_details_cache = cache.SnapshotCache("matrix_details")
+ColumnarMatrixAdapter = TypeAdapter(ColumnarMatrixResponse)
+matrix_columnar_cache = cache.SnapshotCache("matrix_columnar")
+COLUMNAR_MEDIA_TYPE = "application/vnd.vordu.matrix.columnar+json"
+
+MATRIX_COLUMNS = (
+    MatrixCell.project_name, MatrixCell.row_id, MatrixCell.phase_id, MatrixCell.status, MatrixCell.completion,
+    MatrixCell.scenarios_total, MatrixCell.scenarios_passed, MatrixCell.steps_total, MatrixCell.steps_passed,
+)
+
+def build_matrix(db: Session) -> bytes:
+    # Details stay in the database, the UI fetches them per cell, see api/details.py
+    cells = db.execute(select(*MATRIX_COLUMNS).where(generations.current())).all()
+    return MatrixAdapter.dump_json([
         MatrixResponse(
             project=c.project_name,
             row=c.row_id,
@@ -197,9 +835,147 @@ def get_matrix(db: Session = Depends(get_db)):
             scenarios_passed=c.scenarios_passed,
             steps_total=c.steps_total,
             steps_passed=c.steps_passed,
-            details=c.details
         ) for c in cells
-    ]
+    ])
+
+def build_matrix_details(db: Session) -> bytes:
+    cells = db.execute(select(*MATRIX_COLUMNS, MatrixCell.details).where(generations.current())).all()
+    return MatrixDetailsAdapter.dump_json([
+        MatrixDetailsResponse(
+            project=c.project_name,
+            row=c.row_id,
+            phase=c.phase_id,
+            status=c.status,
+            completion=c.completion,
+            scenarios_total=c.scenarios_total,
+            scenarios_passed=c.scenarios_passed,
+            steps_total=c.steps_total,
+            steps_passed=c.steps_passed,
+            details=c.details or []
+        ) for c in cells
+    ])
+
+def build_matrix_columnar(db: Session) -> bytes:
+    """The matrix as one array per field, in the order of build_matrix.
+
+    Key names are sent once instead of once per cell, and the repetitive
+    strings (project, row, status) as indexes into per-field dictionaries, so
+    every column is a plain integer array the UI loads into typed arrays.
+    """
+    cells = db.execute(select(*MATRIX_COLUMNS).where(generations.current())).all()
+    dictionaries = {"project": {}, "row": {}, "status": {}}
+    projects, rows, statuses = (dictionaries[name] for name in ("project", "row", "status"))
+    columns = {name: [] for name in MatrixColumns.model_fields}
+    for c in cells:
+        columns["project"].append(projects.setdefault(c.project_name, len(projects)))
+        columns["row"].append(rows.setdefault(c.row_id, len(rows)))
+        columns["phase"].append(c.phase_id)
+        columns["status"].append(statuses.setdefault(c.status, len(statuses)))
+        columns["completion"].append(c.completion)
+        columns["scenarios_total"].append(c.scenarios_total)
+        columns["scenarios_passed"].append(c.scenarios_passed)
+        columns["steps_total"].append(c.steps_total)
+        columns["steps_passed"].append(c.steps_passed)
+    return ColumnarMatrixAdapter.dump_json(ColumnarMatrixResponse(
+        count=len(cells),
+        # Dicts keep insertion order, which is index order
+        dictionaries={name: list(values) for name, values in dictionaries.items()},
+        columns=MatrixColumns(**columns),
+    ))
+
+@read_route("/matrix", response_model=List[MatrixResponse])
+def get_matrix(db: Session, details: bool = False, format: str = "rows", accept: str = Header("")):
+    """Every live cell, without its details unless details=true.
+
+    format=columnar, or Accept: application/vnd.vordu.matrix.columnar+json,
+    returns one array per field instead, see build_matrix_columnar().
+    """
+    if format not in ("rows", "columnar"):
+        raise HTTPException(status_code=400, detail="Unsupported format, one of ['columnar', 'rows']")
+    headers = {"Vary": "Accept"}
+    if format == "columnar" or COLUMNAR_MEDIA_TYPE in accept:
+        if details:
+            raise HTTPException(status_code=400, detail="The columnar format has no details, fetch them per cell")
+        return Response(content=matrix_columnar_cache.get(db, build_matrix_columnar), media_type=COLUMNAR_MEDIA_TYPE,
+                        headers=headers)
+    if details:
+        return Response(content=matrix_details_cache.get(db, build_matrix_details), media_type="application/json",
+                        headers=headers)
+    return Response(content=matrix_cache.get(db, build_matrix), media_type="application/json", headers=headers)
+
+@read_route("/matrix/{project}/{row}/{phase}/details", response_model=List[dict])
+def get_cell_details(db: Session, project: str, row: str, phase: int):
+    """Scenarios of one cell, served from the per-worker details cache while the cell is unchanged."""
+    body = details.read(db, project, row, phase)
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"No cell {project}/{row}/{phase}")
+    return Response(content=body, media_type="application/json")
+
+@read_route("/summary")
+def get_summary(db: Session):
+    """Per-system, per-domain and per-phase scenario and step totals, read from phase_summaries."""
+    return summary.read(db)
+
+@read_route("/systems/{name}/rollups")
+def get_rollups(db: Session, name: str):
+    """Totals and mean completion of every row's subtree (the row and its nested components), per phase."""
+    return hierarchy.rollups(db, name)
+
+@read_route("/systems/{name}/rows/{row}/rollup")
+def get_row_rollup(db: Session, name: str, row: str):
+    """Totals and mean completion of one row's subtree, per phase."""
+    found = hierarchy.rollups(db, name, row)
+    if not found:
+        raise HTTPException(status_code=404, detail=f"No row {row} in system {name}")
+    return found[0]
+
+@read_route("/systems/{name}/durations/slowest")
+def get_slowest(db: Session, name: str, by: str = "scenario", phase: int | None = None,
+                since: datetime | None = None, limit: int = 20):
+    """Scenarios (or features, by=feature) with the longest mean duration per run, by default over the last week."""
+    if by not in ("scenario", "feature"):
+        raise HTTPException(status_code=422, detail="by must be scenario or feature")
+    return durations.slowest(db, name, by=by, phase=phase, since=since, limit=max(1, min(limit, 500)))
+
+@read_route("/systems/{name}/durations/percentiles")
+def get_duration_percentiles(db: Session, name: str, since: datetime | None = None):
+    """Scenario duration percentiles per phase, by default over the last week's runs."""
+    return durations.percentiles(db, name, since=since)
+
+@read_route("/systems/{name}/durations/trend")
+def get_duration_trend(db: Session, name: str, phase: int | None = None, limit: int = 30):
+    """Duration totals and percentiles per run for the last runs, oldest first."""
+    return durations.trend(db, name, phase=phase, limit=max(1, min(limit, 1000)))
+
+@read_route("/search")
+def search_scenarios(db: Session, q: str, project: str | None = None, phase: int | None = None, limit: int = 20):
+    """Ranked scenarios whose feature, name, tags or steps match q, with their matrix coordinates."""
+    return {"query": q, "hits": search.search(db, q, project=project, phase=phase, limit=limit)}
+
+@read_route("/history")
+def get_history(db: Session, project: str, row: str | None = None, phase: int | None = None,
+                since: datetime | None = None, limit: int = 1000):
+    """Samples of a system's cells over time: every run while recent, then daily and weekly."""
+    return history.read(db, project, row=row, phase=phase, since=history.naive_utc(since),
+                        limit=max(1, min(limit, 10000)))
+
+@app.get("/export/{dataset}")
+def export_data(dataset: str, format: str = "ndjson", system: str | None = None,
+                since: datetime | None = None, until: datetime | None = None, details: bool = False):
+    """Streams every matrix cell or history sample as NDJSON, CSV, Arrow or Parquet, in bounded memory."""
+    if dataset not in export.DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset, one of {sorted(export.DATASETS)}")
+    if format not in export.formats():
+        raise HTTPException(status_code=400, detail=f"Unsupported format, one of {export.formats()}"
+                            " (arrow and parquet need pyarrow installed)")
+    if dataset == "matrix" and (since or until):
+        raise HTTPException(status_code=400, detail="Matrix cells have no time range, export history instead")
+    body = export.stream(SessionLocal, dataset, format, system=system, details=details,
+                         since=history.naive_utc(since), until=history.naive_utc(until))
+    extension = {"ndjson": "ndjson", "csv": "csv", "arrow": "arrows", "parquet": "parquet"}[format]
+    return StreamingResponse(body, media_type=export.MEDIA_TYPES[format], headers={
+        "Content-Disposition": f'attachment; filename="vordu-{dataset}.{extension}"'
+    })
 
 class RowConfig(BaseModel):
     id: str
@@ -211,15 +987,22 @@ class ProjectResponse(BaseModel):
     name: str # The Label or Name
     rows: List[RowConfig]
 
-@app.get("/config", response_model=List[ProjectResponse])
-def get_config(db: Session = Depends(get_db)):
+ConfigAdapter = TypeAdapter(List[ProjectResponse])
+config_cache = cache.SnapshotCache("config")
+
+def build_config(db: Session) -> bytes:
     from .models import System, Row
     
     systems = db.query(System).all()
     response = []
+
+    # All rows in one query instead of one per system
+    rows_by_system = {}
+    for r in db.query(Row).order_by(Row.id):
+        rows_by_system.setdefault(r.system_name, []).append(r)
     
     for sys in systems:
-        rows = db.query(Row).filter(Row.system_name == sys.name).all()
+        rows = rows_by_system.get(sys.name, [])
         row_list = [
             RowConfig(id=r.key, label=r.label, parent=r.parent_row) 
             for r in rows
@@ -230,7 +1013,11 @@ def get_config(db: Session = Depends(get_db)):
             rows=row_list
         ))
         
-    return response
+    return ConfigAdapter.dump_json(response)
+
+@read_route("/config", response_model=List[ProjectResponse])
+def get_config(db: Session):
+    return Response(content=config_cache.get(db, build_config), media_type="application/json")
 
 # Serve React App (SPA)
 @app.get("/{full_path:path}")
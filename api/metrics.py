@@ -0,0 +1,167 @@
+"""Prometheus metrics for the API and its database hot paths.
+
+Request latency and sizes are recorded by MetricsMiddleware. Database
+statements are counted and timed through SQLAlchemy cursor events and
+attributed to the request that ran them via a context variable, which
+survives FastAPI running sync handlers in its threadpool. Statements slower
+than VORDU_SLOW_QUERY_MS (default 100) are logged with their parameters.
+
+With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR to an empty
+directory before the workers start, /metrics then aggregates every worker.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+from sqlalchemy import event
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+REQUEST_LATENCY = Histogram(
+    "vordu_http_request_duration_seconds", "Request latency", ["method", "route", "status"]
+)
+REQUEST_SIZE = Histogram(
+    "vordu_http_request_size_bytes", "Request body size as received (compressed if gzip)", ["route"],
+    buckets=SIZE_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    "vordu_http_response_size_bytes", "Response body size", ["route"], buckets=SIZE_BUCKETS
+)
+INGEST_ITEMS = Histogram(
+    "vordu_ingest_items", "Items (cells, components or records) per ingest request", ["endpoint"],
+    buckets=COUNT_BUCKETS
+)
+DB_QUERIES = Histogram(
+    "vordu_db_queries_per_request", "SQL statements executed per request", ["route"], buckets=COUNT_BUCKETS
+)
+DB_TIME = Histogram(
+    "vordu_db_query_seconds_per_request", "Time spent in SQL statements per request", ["route"]
+)
+DB_BUSY = Counter(
+    "vordu_db_busy_total", "Requests that failed because the database was locked/busy", ["route"]
+)
+CACHE_REQUESTS = Counter(
+    "vordu_cache_requests_total", "Lookups in in-process caches", ["cache", "result"]
+)
+CACHE_EVICTIONS = Counter(
+    "vordu_cache_evictions_total", "Entries dropped from in-process caches", ["cache", "reason"]
+)
+CACHE_BYTES = Gauge(
+    "vordu_cache_bytes", "Bytes held by in-process caches", ["cache"], multiprocess_mode="livesum"
+)
+HISTORY_COMPACTED = Counter(
+    "vordu_history_compacted_samples_total", "Cell history samples downsampled or deleted by compaction", ["action"]
+)
+PURGED_ROWS = Counter(
+    "vordu_purged_rows_total", "Rows deleted by the scoped purge endpoints", ["table"]
+)
+COMPACTION_SECONDS = Histogram(
+    "vordu_history_compaction_seconds", "Duration of history compaction passes"
+)
+DB_SIZE = Gauge(
+    "vordu_db_size_bytes", "Database size after the last history compaction", multiprocess_mode="max"
+)
+ADMISSION_LIMIT = Gauge(
+    "vordu_admission_limit", "Configured write admission limits, per worker", ["limit"], multiprocess_mode="max"
+)
+ADMISSION_REJECTED = Counter(
+    "vordu_admission_rejected_total", "Write requests rejected by admission control", ["route", "key", "reason"]
+)
+WRITES_ADMITTED = Gauge(
+    "vordu_writes_admitted", "Write requests running or waiting for a write slot", multiprocess_mode="livesum"
+)
+
+SLOW_QUERY_SECONDS = float(os.getenv("VORDU_SLOW_QUERY_MS", "100")) / 1000
+# Parameters can carry whole details blobs, keep log lines readable
+MAX_LOGGED_PARAMS = 500
+
+logger = logging.getLogger("vordu.sql")
+
+@dataclass
+class RequestStats:
+    scope: dict | None = None
+    queries: int = 0
+    db_seconds: float = 0.0
+
+current_request: ContextVar[RequestStats | None] = ContextVar("vordu_request_stats", default=None)
+
+def route_template(scope) -> str:
+    """The matched route path (e.g. "/ingest"), keeping label cardinality bounded."""
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+def instrument_engine(engine):
+    """Counts and times every statement against the request running it."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("vordu_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["vordu_query_start"].pop()
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+        if elapsed >= SLOW_QUERY_SECONDS:
+            params = repr(parameters)
+            if len(params) > MAX_LOGGED_PARAMS:
+                params = params[:MAX_LOGGED_PARAMS] + "..."
+            route = route_template(stats.scope) if stats is not None else "-"
+            logger.warning("Slow query %.1f ms on %s%s: %s params=%s", elapsed * 1000, route,
+                           " (executemany)" if executemany else "", " ".join(statement.split()), params)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, body sizes and DB usage per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope=scope)
+        token = current_request.set(stats)
+        sizes = {"request": 0, "response": 0}
+        status = {"code": 500}
+        start = time.perf_counter()
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            route = route_template(scope)
+            REQUEST_LATENCY.labels(scope["method"], route, str(status["code"])).observe(time.perf_counter() - start)
+            REQUEST_SIZE.labels(route).observe(sizes["request"])
+            RESPONSE_SIZE.labels(route).observe(sizes["response"])
+            DB_QUERIES.labels(route).observe(stats.queries)
+            DB_TIME.labels(route).observe(stats.db_seconds)
+            current_request.reset(token)
+
+def render():
+    """Current metrics in the Prometheus text exposition format."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Each worker only sees its own samples, merge the files all of them write
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
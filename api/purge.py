@@ -0,0 +1,164 @@
+"""Scoped purges and the full reset.
+
+Purges delete by system, by domain (every system of it) or the cells not
+written since a timestamp, by their updated_at. They select at most PURGE_BATCH ids and delete
+them by primary key, one short transaction per batch, so other writers get
+the write lock between batches, and pause VORDU_PURGE_PAUSE_S (default
+0.01) before the next batch so waiting writers actually take it.
+
+A purged system disappears from reads in its first transaction: its
+generation pointer moves to PURGED_GENERATION, which no cell carries, see
+api/generations.py. Its summaries, rows and config go in the same
+transaction, the bulky tables (cells, history, search documents, scenarios,
+timings) are then emptied in batches.
+
+reset() drops and recreates every table in one transaction instead of
+deleting row by row, data_version is kept and bumped so caches of every
+worker move on.
+"""
+import os
+import time
+
+from sqlalchemy import DDL, delete, exists, func, select, tuple_, update
+
+from . import generations, metrics, search, summary
+from .models import (
+    Base, CatalogComponent, CellHistory, DataVersion, MatrixCell, MatrixGeneration, PhaseSummary, Row,
+    RowClosure, RunDuration, ScenarioResult, ScenarioTiming, SearchDoc, System, SystemGeneration, utcnow,
+)
+
+PURGE_BATCH = int(os.getenv("VORDU_PURGE_BATCH", "1000"))
+PURGE_PAUSE_S = float(os.getenv("VORDU_PURGE_PAUSE_S", "0.01"))
+PURGED_GENERATION = -1
+
+# Deleted with the system's first transaction, a row or a few per component or phase
+SMALL_TABLES = (
+    (PhaseSummary, PhaseSummary.project_name), (RowClosure, RowClosure.system_name),
+    (Row, Row.system_name), (CatalogComponent, CatalogComponent.system_name), (System, System.name),
+)
+# Deleted in batches afterwards, the pointer last
+BULK_TABLES = (
+    (SearchDoc, SearchDoc.project_name), (MatrixCell, MatrixCell.project_name),
+    (CellHistory, CellHistory.project_name), (ScenarioResult, ScenarioResult.project_name),
+    (ScenarioTiming, ScenarioTiming.project_name), (RunDuration, RunDuration.project_name),
+    (MatrixGeneration, MatrixGeneration.project_name), (SystemGeneration, SystemGeneration.project_name),
+)
+
+def count(deleted, table, n):
+    if n:
+        deleted[table] = deleted.get(table, 0) + n
+        metrics.PURGED_ROWS.labels(table).inc(n)
+
+def batches(session_factory, select_ids, delete_batch):
+    """Runs delete_batch(db, ids) on batches of select_ids(db).limit(PURGE_BATCH) until none are left."""
+    total = 0
+    while True:
+        with session_factory() as db:
+            ids = db.execute(select_ids.limit(PURGE_BATCH)).scalars().all()
+            if not ids:
+                return total
+            delete_batch(db, ids)
+            db.commit()
+        total += len(ids)
+        if len(ids) == PURGE_BATCH and PURGE_PAUSE_S:
+            time.sleep(PURGE_PAUSE_S)
+
+def delete_ids(model):
+    def run(db, ids):
+        db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+    return run
+
+def hide(db, name):
+    """Makes the system's cells invisible to readers, see current()."""
+    updated = db.execute(
+        update(SystemGeneration).where(SystemGeneration.project_name == name).values(generation=PURGED_GENERATION)
+    ).rowcount
+    if not updated:
+        db.add(SystemGeneration(project_name=name, generation=PURGED_GENERATION))
+
+def purge_system(session_factory, name, deleted=None):
+    """Deletes everything stored for a system. Returns {table: rows deleted}, empty if it had nothing."""
+    deleted = {} if deleted is None else deleted
+    with session_factory() as db:
+        found = db.execute(select(exists().where(System.name == name))).scalar() or db.execute(
+            select(exists().where(MatrixCell.project_name == name))
+        ).scalar()
+        if not found:
+            return deleted
+        hide(db, name)
+        for model, column in SMALL_TABLES:
+            count(deleted, model.__tablename__, db.execute(
+                delete(model).where(column == name).execution_options(synchronize_session=False)
+            ).rowcount)
+        db.commit()
+    for model, column in BULK_TABLES:
+        count(deleted, model.__tablename__, batches(session_factory, select(model.id).where(column == name),
+                                                    delete_ids(model)))
+    return deleted
+
+def purge_domain(session_factory, domain):
+    """Purges every system of a domain. Returns (system names, {table: rows deleted})."""
+    with session_factory() as db:
+        names = db.execute(select(System.name).where(System.domain == domain).order_by(System.name)).scalars().all()
+    deleted = {}
+    for name in names:
+        purge_system(session_factory, name, deleted)
+    return names, deleted
+
+def purge_cells(session_factory, older_than, system=None):
+    """Deletes live cells not written since older_than. Returns {table: rows deleted}.
+
+    Every write of a cell sets its updated_at, changed or not. Their summaries
+    and search documents follow, the history itself is kept.
+    """
+    criteria = [generations.current(), MatrixCell.updated_at < older_than]
+    if system is not None:
+        criteria.append(MatrixCell.project_name == system)
+    deleted = {}
+
+    def delete_cells(db, ids):
+        keys = db.execute(
+            select(MatrixCell.project_name, MatrixCell.row_id, MatrixCell.phase_id).where(MatrixCell.id.in_(ids))
+        ).all()
+        summary.remove_cells(db, MatrixCell.id.in_(ids))
+        count(deleted, SearchDoc.__tablename__, db.execute(
+            delete(SearchDoc)
+            .where(tuple_(SearchDoc.project_name, SearchDoc.row_id, SearchDoc.phase_id).in_([tuple(k) for k in keys]))
+            .execution_options(synchronize_session=False)
+        ).rowcount)
+        delete_ids(MatrixCell)(db, ids)
+
+    count(deleted, MatrixCell.__tablename__, batches(session_factory, select(MatrixCell.id).where(*criteria),
+                                                     delete_cells))
+    return deleted
+
+def backfill(session_factory):
+    """Dates cells written before updated_at existed by their latest history sample, now without one."""
+    latest = (
+        select(func.max(CellHistory.recorded_at))
+        .where(CellHistory.project_name == MatrixCell.project_name, CellHistory.row_id == MatrixCell.row_id,
+               CellHistory.phase_id == MatrixCell.phase_id)
+        .scalar_subquery()
+    )
+    with session_factory() as db:
+        if db.query(MatrixCell.id).filter(MatrixCell.updated_at.is_(None)).first() is not None:
+            db.execute(
+                update(MatrixCell).where(MatrixCell.updated_at.is_(None))
+                .values(updated_at=func.coalesce(latest, utcnow()), revision=MatrixCell.revision)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+def reset(bind):
+    """Drops and recreates every table but data_version, and bumps it, in one transaction."""
+    tables = [table for table in Base.metadata.sorted_tables if table is not DataVersion.__table__]
+    with bind.begin() as conn:
+        statements = search.index_statements(conn)
+        search.drop_index(conn)
+        Base.metadata.drop_all(conn, tables=tables)
+        Base.metadata.create_all(conn, tables=tables)
+        for statement in statements:
+            conn.execute(DDL(statement))
+        conn.execute(
+            update(DataVersion.__table__).where(DataVersion.id == 1).values(version=DataVersion.version + 1)
+        )
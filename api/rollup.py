@@ -0,0 +1,122 @@
+"""Server-side granularity rollups.
+
+Mirrors build_status_payload in the ingest script, but works from the
+scenario-level results stored in scenario_results. Matrix cells act as the
+per-system cache of the rollup: an ingest only recomputes the rows whose
+scenarios changed, while a granularity change re-aggregates the system from
+stored scenarios without a new test run.
+"""
+from .models import CatalogComponent, ScenarioResult
+
+PHASES = range(4)
+DEFAULT_GRANULARITY = "component"
+
+def target_row(granularity, system_name, domain, component, parent):
+    """Row a component's results roll up into for the given granularity."""
+    if granularity == "domain":
+        return domain
+    if granularity == "system":
+        return system_name # One row for the whole system
+    if granularity == "component":
+        # If subcomponent has a parent, roll up to parent. Else use own name.
+        return parent if parent else component
+    # Explicit 'subcomponent' -> Own row
+    return component
+
+def row_members(system, components):
+    """Maps each target row to its member components, in catalog order."""
+    granularity = system.granularity or DEFAULT_GRANULARITY
+    domain = system.domain or "unknown-domain"
+    rows = {}
+    for comp in components:
+        row = target_row(granularity, system.name, domain, comp.name, comp.parent)
+        rows.setdefault(row, []).append(comp.name)
+    return rows
+
+def config_rows(system, components, row_label=None):
+    """Display rows for /config, matching build_config_payload in the ingest script."""
+    if (system.granularity or DEFAULT_GRANULARITY) == "system":
+        # Synthesize the System Row
+        return [{"key": system.name, "label": row_label or system.name, "parent_row": None}]
+    return [{"key": c.name, "label": c.label, "parent_row": c.parent} for c in components]
+
+def detail(scenario):
+    return {
+        "feature": scenario.feature,
+        "scenario": scenario.scenario,
+        "status": scenario.status,
+        "passed_steps": scenario.passed_steps,
+        "total_steps": scenario.total_steps,
+        "tag": scenario.tag,
+        "steps": scenario.steps or [],
+    }
+
+def aggregate_cell(system_name, row_id, phase, scenarios):
+    """One matrix cell (as an /ingest item dict) from the scenarios rolled into it."""
+    total_scenarios = len(scenarios)
+    passed_scenarios = sum(1 for s in scenarios if s.status == "passed")
+    total_steps = sum(s.total_steps or 0 for s in scenarios)
+    passed_steps = sum(s.passed_steps or 0 for s in scenarios)
+
+    completion = int((passed_steps / total_steps) * 100) if total_steps > 0 else 0
+
+    if total_steps == 0 and total_scenarios == 0:
+        status = "empty"
+    elif completion == 100:
+        status = "pass"
+    else:
+        status = "pending" # Partial or no completion
+
+    return {
+        "project_name": system_name,
+        "row_id": row_id,
+        "phase_id": phase,
+        "status": status,
+        "completion": completion,
+        "scenarios_total": total_scenarios,
+        "scenarios_passed": passed_scenarios,
+        "steps_total": total_steps,
+        "steps_passed": passed_steps,
+        "details": [detail(s) for s in scenarios],
+    }
+
+def recompute(db, system, touched_components=None, components=None):
+    """Recomputes cells for the rows containing touched_components (None means every row).
+
+    components defaults to the stored catalog components. Returns (cells,
+    live_rows): the cell dicts to upsert and every row the system currently
+    rolls up into, so callers can drop ghost rows.
+    """
+    if components is None:
+        components = (
+            db.query(CatalogComponent)
+            .filter(CatalogComponent.system_name == system.name)
+            .order_by(CatalogComponent.id)
+            .all()
+        )
+    rows = row_members(system, components)
+    if touched_components is not None:
+        rows = {
+            row: members for row, members in rows.items()
+            if any(m in touched_components for m in members)
+        }
+
+    members = [m for row_components in rows.values() for m in row_components]
+    by_key = {}
+    if members:
+        query = (
+            db.query(ScenarioResult)
+            .filter(ScenarioResult.project_name == system.name, ScenarioResult.component.in_(members))
+            .order_by(ScenarioResult.id)
+            # Scenarios may have been bulk updated behind the session's back
+            .populate_existing()
+        )
+        for scenario in query:
+            by_key.setdefault((scenario.component, scenario.phase_id), []).append(scenario)
+
+    cells = []
+    for row, row_components in rows.items():
+        for phase in PHASES:
+            scenarios = [s for c in row_components for s in by_key.get((c, phase), [])]
+            cells.append(aggregate_cell(system.name, row, phase, scenarios))
+    return cells, set(row_members(system, components))
@@ -0,0 +1,181 @@
+"""Full-text search over scenarios, steps and tags.
+
+Every scenario in a matrix cell's details is stored as a row of search_docs,
+rewritten only for cells whose details changed. On SQLite an external-content
+FTS5 table (search_fts) indexes those rows through triggers and ranks hits
+with bm25; on PostgreSQL a generated tsvector column with a GIN index does
+the same. Without either (SQLite built without FTS5) /search falls back to a
+slower LIKE scan.
+"""
+import re
+
+from sqlalchemy import DDL, delete, insert, inspect, text, tuple_
+
+from . import generations
+from .models import MatrixCell, SearchDoc
+
+MAX_LIMIT = 100
+
+SQLITE_FTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        feature, scenario, tag, steps, content='search_docs', content_rowid='id', tokenize='unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS search_docs_ai AFTER INSERT ON search_docs BEGIN
+        INSERT INTO search_fts(rowid, feature, scenario, tag, steps)
+        VALUES (new.id, new.feature, new.scenario, new.tag, new.steps);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS search_docs_ad AFTER DELETE ON search_docs BEGIN
+        INSERT INTO search_fts(search_fts, rowid, feature, scenario, tag, steps)
+        VALUES ('delete', old.id, old.feature, old.scenario, old.tag, old.steps);
+    END""",
+]
+
+POSTGRES_FTS = [
+    """ALTER TABLE search_docs ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('simple', coalesce(feature, '') || ' ' || coalesce(scenario, '') || ' ' ||
+                              coalesce(tag, '') || ' ' || coalesce(steps, ''))
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_search_docs_vector ON search_docs USING GIN (search_vector)",
+]
+
+def create_index(bind):
+    """Creates the full-text index next to search_docs. Returns False if the database has none."""
+    statements = {"sqlite": SQLITE_FTS, "postgresql": POSTGRES_FTS}.get(bind.dialect.name)
+    if not statements:
+        return False
+    try:
+        with bind.begin() as conn:
+            for statement in statements:
+                conn.execute(DDL(statement))
+    except Exception: # e.g. "no such module: fts5"
+        return False
+    return True
+
+def index_statements(conn):
+    """Statements recreating the full-text index the database has, for api/purge.py's reset."""
+    if conn.dialect.name == "sqlite":
+        return SQLITE_FTS if inspect(conn).has_table("search_fts") else []
+    return POSTGRES_FTS if conn.dialect.name == "postgresql" else []
+
+def drop_index(conn):
+    """Drops the SQLite full-text table, the triggers and PostgreSQL's index go with search_docs."""
+    if conn.dialect.name == "sqlite":
+        conn.execute(DDL("DROP TABLE IF EXISTS search_fts"))
+
+def has_index(db):
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return inspect(db.get_bind()).has_table("search_fts")
+    return dialect == "postgresql"
+
+def step_text(steps):
+    return "\n".join(f"{s.get('keyword', '')} {s.get('name', '')}".strip() for s in steps or [])
+
+def index_cells(db, cells, new=()):
+    """Replaces the documents of cells, a dict {(project, row, phase): details}.
+
+    Keys in new are cells just inserted, which have no documents to delete.
+    """
+    if not cells:
+        return
+    replaced = [key for key in cells if key not in new]
+    if replaced:
+        db.execute(
+            delete(SearchDoc)
+            .where(tuple_(SearchDoc.project_name, SearchDoc.row_id, SearchDoc.phase_id).in_(replaced))
+            .execution_options(synchronize_session=False)
+        )
+    docs = [
+        {
+            "project_name": project, "row_id": row, "phase_id": phase,
+            "feature": d.get("feature"), "scenario": d.get("scenario"), "status": d.get("status"),
+            "tag": d.get("tag"), "steps": step_text(d.get("steps")),
+        }
+        for (project, row, phase), details in cells.items() for d in details or []
+    ]
+    if docs:
+        db.execute(insert(SearchDoc), docs)
+
+def remove_ghosts(db, project, live_rows):
+    """Drops the documents of a project's rows that no longer exist."""
+    db.execute(
+        delete(SearchDoc)
+        .where(SearchDoc.project_name == project, SearchDoc.row_id.not_in(live_rows))
+        .execution_options(synchronize_session=False)
+    )
+
+def clear(db):
+    db.query(SearchDoc).delete()
+
+def backfill(session_factory):
+    """Indexes existing cells once for a database that predates search_docs."""
+    with session_factory() as db:
+        if db.query(SearchDoc.id).first() is None and db.query(MatrixCell.id).first() is not None:
+            cells = {
+                (c.project_name, c.row_id, c.phase_id): c.details
+                for c in db.query(MatrixCell).filter(MatrixCell.details.isnot(None), generations.current())
+            }
+            index_cells(db, cells, new=cells)
+            db.commit()
+
+TERM = re.compile(r"\w+", re.UNICODE)
+
+def fts_query(q):
+    """Turns free text into an FTS5 query: every word must match, the last as a prefix."""
+    terms = TERM.findall(q)
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def search(db, q, project=None, phase=None, limit=20):
+    """Ranked hits for q, best first."""
+    limit = max(1, min(limit, MAX_LIMIT))
+    dialect = db.get_bind().dialect.name
+    filters = ""
+    params = {"limit": limit}
+    if project is not None:
+        filters += " AND d.project_name = :project"
+        params["project"] = project
+    if phase is not None:
+        filters += " AND d.phase_id = :phase"
+        params["phase"] = phase
+
+    columns = "d.project_name, d.row_id, d.phase_id, d.feature, d.scenario, d.status, d.tag"
+    if dialect == "sqlite" and has_index(db):
+        params["q"] = fts_query(q)
+        if params["q"] is None:
+            return []
+        sql = (
+            f"SELECT {columns}, -bm25(search_fts) AS score,"
+            " snippet(search_fts, 3, '[', ']', '…', 12) AS snippet"
+            " FROM search_fts JOIN search_docs d ON d.id = search_fts.rowid"
+            f" WHERE search_fts MATCH :q{filters} ORDER BY bm25(search_fts) LIMIT :limit"
+        )
+    elif dialect == "postgresql":
+        params["q"] = q
+        sql = (
+            f"SELECT {columns}, ts_rank(d.search_vector, query) AS score,"
+            " ts_headline('simple', d.steps, query, 'StartSel=[, StopSel=], MaxFragments=1') AS snippet"
+            " FROM search_docs d, websearch_to_tsquery('simple', :q) query"
+            f" WHERE d.search_vector @@ query{filters} ORDER BY score DESC LIMIT :limit"
+        )
+    else:
+        terms = TERM.findall(q)
+        if not terms:
+            return []
+        for n, term in enumerate(terms):
+            params[f"t{n}"] = f"%{term}%"
+            filters += (f" AND (d.feature LIKE :t{n} OR d.scenario LIKE :t{n}"
+                        f" OR d.tag LIKE :t{n} OR d.steps LIKE :t{n})")
+        sql = f"SELECT {columns}, 0 AS score, NULL AS snippet FROM search_docs d WHERE 1 = 1{filters} LIMIT :limit"
+
+    return [
+        {
+            "project": r.project_name, "row": r.row_id, "phase": r.phase_id,
+            "feature": r.feature, "scenario": r.scenario, "status": r.status, "tag": r.tag,
+            "score": round(float(r.score or 0), 4), "snippet": r.snippet,
+        }
+        for r in db.execute(text(sql), params)
+    ]
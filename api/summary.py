@@ -0,0 +1,132 @@
+"""Portfolio summary totals maintained by delta.
+
+Every write to matrix_cells records the change in cell counts, scenarios and
+steps per (system, phase) in a SummaryDelta, which is applied to
+phase_summaries with one upsert in the same transaction. GET /summary then
+reads a handful of rows instead of scanning the matrix.
+"""
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import generations
+from .models import MatrixCell, PhaseSummary, System
+
+FIELDS = ("cells", "cells_passed", "scenarios_total", "scenarios_passed", "steps_total", "steps_passed")
+
+def cell_totals(status, scenarios_total, scenarios_passed, steps_total, steps_passed):
+    """A cell's contribution to its phase totals, in FIELDS order."""
+    return (1, 1 if status == "pass" else 0, scenarios_total or 0, scenarios_passed or 0, steps_total or 0, steps_passed or 0)
+
+class SummaryDelta:
+    """Accumulates per (system, phase) changes during one write."""
+
+    def __init__(self):
+        self.changes = {}
+
+    def _add(self, project_name, phase_id, totals, sign):
+        current = self.changes.setdefault((project_name, phase_id), [0] * len(FIELDS))
+        for i, value in enumerate(totals):
+            current[i] += sign * value
+
+    def add(self, project_name, phase_id, totals):
+        self._add(project_name, phase_id, totals, 1)
+
+    def remove(self, project_name, phase_id, totals):
+        self._add(project_name, phase_id, totals, -1)
+
+    def apply(self, db):
+        """Adds the accumulated deltas to phase_summaries, one statement for all of them."""
+        rows = [
+            {"project_name": project, "phase_id": phase, **dict(zip(FIELDS, values))}
+            for (project, phase), values in self.changes.items() if any(values)
+        ]
+        self.changes = {}
+        if not rows:
+            return
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(PhaseSummary)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["project_name", "phase_id"],
+            set_={field: getattr(PhaseSummary, field) + getattr(stmt.excluded, field) for field in FIELDS},
+        )
+        db.execute(stmt, rows)
+
+def cell_totals_query(*criteria):
+    """Per (system, phase) totals of the matching cells, in FIELDS order."""
+    return select(
+        MatrixCell.project_name, MatrixCell.phase_id, func.count(),
+        func.sum(case((MatrixCell.status == "pass", 1), else_=0)),
+        func.sum(MatrixCell.scenarios_total), func.sum(MatrixCell.scenarios_passed),
+        func.sum(MatrixCell.steps_total), func.sum(MatrixCell.steps_passed),
+    ).where(*criteria).group_by(MatrixCell.project_name, MatrixCell.phase_id)
+
+def remove_cells(db, *criteria) -> int:
+    """Subtracts the cells matching criteria from the totals, call right before deleting them.
+
+    Returns the number of matching cells, so callers can skip a DELETE that has nothing to do.
+    """
+    delta = SummaryDelta()
+    count = 0
+    for project, phase, *totals in db.execute(cell_totals_query(*criteria)):
+        delta.remove(project, phase, [int(value or 0) for value in totals])
+        count += totals[0]
+    delta.apply(db)
+    return count
+
+def set_totals(db, rows):
+    delta = SummaryDelta()
+    for project, phase, *totals in rows:
+        delta.add(project, phase, [int(value or 0) for value in totals])
+    delta.apply(db)
+
+def rebuild(db):
+    """Recomputes every total from matrix_cells, for databases that predate the summary table."""
+    db.query(PhaseSummary).delete()
+    set_totals(db, db.execute(cell_totals_query(generations.current())))
+
+def replace(db, project, rows):
+    """Sets a system's totals to rows of cell_totals_query, when all its cells were swapped at once."""
+    db.query(PhaseSummary).filter(PhaseSummary.project_name == project).delete(synchronize_session=False)
+    set_totals(db, rows)
+
+def backfill(session_factory):
+    """Builds the totals once for a database with cells but no summary rows yet."""
+    with session_factory() as db:
+        if db.query(PhaseSummary.id).first() is None and db.query(MatrixCell.id).first() is not None:
+            rebuild(db)
+            db.commit()
+
+def read(db):
+    """Per-system, per-domain and per-phase totals from one query."""
+    query = (
+        select(PhaseSummary, System.domain)
+        .outerjoin(System, System.name == PhaseSummary.project_name)
+        .order_by(PhaseSummary.project_name, PhaseSummary.phase_id)
+    )
+
+    def add(target, row):
+        for field in FIELDS:
+            target[field] = target.get(field, 0) + getattr(row, field)
+
+    def phase(totals, phase_id):
+        return totals["_phases"].setdefault(phase_id, {"phase": phase_id})
+
+    systems, domains, phases, total = {}, {}, {}, dict.fromkeys(FIELDS, 0)
+    for row, domain in db.execute(query):
+        system = systems.setdefault(row.project_name, {"name": row.project_name, "domain": domain, "_phases": {}})
+        domain_totals = domains.setdefault(domain, {"name": domain, "_phases": {}})
+        for target in (system, phase(system, row.phase_id), domain_totals, phase(domain_totals, row.phase_id),
+                       phases.setdefault(row.phase_id, {"phase": row.phase_id}), total):
+            add(target, row)
+
+    def finish(totals):
+        by_phase = totals.pop("_phases")
+        totals["phases"] = [by_phase[p] for p in sorted(by_phase)]
+        return totals
+
+    return {
+        "systems": [finish(s) for s in systems.values()],
+        "domains": [finish(d) for _, d in sorted(domains.items(), key=lambda item: item[0] or "")],
+        "phases": [phases[p] for p in sorted(phases)],
+        "totals": total,
+    }
@@ -0,0 +1,174 @@
+"""Benchmark fixtures.
+
+Run with `pytest benchmarks` (they are not part of the default `pytest` run,
+which drives the BDD features). Besides timings the directory holds the SQL
+statement budgets per endpoint; CI runs those with `pytest benchmarks -m "not timing"`,
+every test using the bench fixture is marked timing.
+
+Timings are compared against benchmarks/baseline.json, a benchmark slower than
+its baseline by more than --bench-tolerance fails. Refresh the baseline with
+`pytest benchmarks --update-baseline` and commit it, so changes in ingest cost
+show up in review.
+
+The workload size is picked with VORDU_BENCH_SCALE (small, medium, large).
+"""
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import pytest
+
+# The API reads DATABASE_URL on import, point it at a throwaway SQLite file first
+BENCH_DB_DIR = tempfile.mkdtemp(prefix="vordu-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(BENCH_DB_DIR, 'bench.db')}")
+# Benchmarks ingest back to back, far above the per-key rate limit
+os.environ.setdefault("VORDU_INGEST_RATE", "100000")
+os.environ.setdefault("VORDU_INGEST_BURST", "100000")
+
+scripts_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "resources", "scripts"))
+if scripts_path not in sys.path:
+    sys.path.append(scripts_path)
+# Payload helpers are shared with the step definitions of the BDD features
+steps_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "tests", "step_defs"))
+if steps_path not in sys.path:
+    sys.path.append(steps_path)
+
+from payloads import HEADERS, status_item, system_config  # noqa: E402,F401
+from .workload import SCALES, generate_workload  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+SCALE = os.getenv("VORDU_BENCH_SCALE", "small")
+
+def pytest_addoption(parser):
+    group = parser.getgroup("vordu benchmarks")
+    group.addoption("--update-baseline", action="store_true", help="Rewrite benchmarks/baseline.json with this run's timings")
+    group.addoption("--bench-tolerance", type=float, default=3.0,
+                    help="Fail when a benchmark is this many times slower than its baseline (default: 3.0)")
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "timing: compares wall-clock timings, skipped in CI with -m 'not timing'")
+
+def pytest_collection_modifyitems(items):
+    for item in items:
+        if "bench" in getattr(item, "fixturenames", ()):
+            item.add_marker(pytest.mark.timing)
+
+def load_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+@pytest.fixture(scope="session")
+def bench_results(request):
+    results = {}
+    yield results
+    if request.config.getoption("--update-baseline") and results:
+        baseline = load_baseline()
+        baseline.setdefault(SCALE, {}).update(results)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+@pytest.fixture
+def bench(request, bench_results):
+    """Times fn over several rounds, records the result and checks it against the baseline."""
+    baseline = load_baseline().get(SCALE, {})
+    tolerance = request.config.getoption("--bench-tolerance")
+    update = request.config.getoption("--update-baseline")
+
+    def run(fn, *args, rounds=5, name=None, **kwargs):
+        name = name or request.node.name
+        timings = []
+        result = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            timings.append(time.perf_counter() - start)
+        bench_results[name] = {
+            "min_s": round(min(timings), 6),
+            "median_s": round(statistics.median(timings), 6),
+            "rounds": rounds,
+        }
+        expected = baseline.get(name)
+        if expected and not update and min(timings) > expected["min_s"] * tolerance:
+            pytest.fail(
+                f"{name} regressed: {min(timings):.4f}s vs baseline {expected['min_s']:.4f}s "
+                f"(tolerance x{tolerance}, scale {SCALE})"
+            )
+        return result
+
+    return run
+
+@pytest.fixture(scope="session")
+def workload(tmp_path_factory):
+    """Paths of a generated catalog, feature tree and Cucumber report at VORDU_BENCH_SCALE."""
+    return generate_workload(str(tmp_path_factory.mktemp("workload")), **SCALES[SCALE])
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = getattr(config, "_vordu_bench_results", None)
+    if not results:
+        return
+    baseline = load_baseline().get(SCALE, {})
+    terminalreporter.section(f"vordu benchmarks (scale: {SCALE})")
+    for name, result in sorted(results.items()):
+        expected = baseline.get(name, {}).get("min_s")
+        ratio = f"x{result['min_s'] / expected:.2f}" if expected else "new"
+        terminalreporter.write_line(f"{name:<45} min {result['min_s'] * 1000:10.2f} ms  median {result['median_s'] * 1000:10.2f} ms  {ratio}")
+
+@pytest.fixture(scope="session", autouse=True)
+def _expose_results(request, bench_results):
+    # Lets pytest_terminal_summary print the table after the session fixtures are gone
+    request.config._vordu_bench_results = bench_results
+
+@pytest.fixture
+def query_budget():
+    """Context manager factory asserting at most `limit` SQL statements run inside it.
+
+        with query_budget(5):
+            client.post("/ingest", ...)
+    """
+    from contextlib import contextmanager
+    from sqlalchemy import event
+    from api.models import engine, async_engine
+
+    # Read endpoints may go through the async engine
+    engines = [engine] if async_engine is None else [engine, async_engine.sync_engine]
+
+    @contextmanager
+    def budget(limit):
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(" ".join(statement.split()))
+
+        for e in engines:
+            event.listen(e, "after_cursor_execute", count)
+        try:
+            yield statements
+        finally:
+            for e in engines:
+                event.remove(e, "after_cursor_execute", count)
+        assert len(statements) <= limit, (
+            f"{len(statements)} SQL statements, budget is {limit}:\n" + "\n".join(statements)
+        )
+
+    return budget
+
+@pytest.fixture
+def clean_db(client):
+    """Empties the database, and the per-worker caches that outlive it, before the test."""
+    from api import details
+    assert client.delete("/admin/db", headers=HEADERS).status_code == 200
+    details.details_cache.clear()
@@ -0,0 +1,233 @@
+"""Local HTTP load test for the Vörðu API.
+
+Starts uvicorn against a temporary SQLite file (or targets --url) and drives a
+mixed workload from an asyncio client: writer tasks replay CI bursts
+(/config/ingest then /ingest for their own system) while reader tasks poll
+/matrix and /config like dashboards. Reports throughput, p50/p95/p99 latency
+and errors per route, counting SQLite "database is locked" failures and
+writes throttled by admission control (429) apart.
+
+--db-mode both runs the local server twice, with the async read path and with
+reads in the threadpool (VORDU_ASYNC_DB=0), and compares read throughput.
+
+Usage: python -m benchmarks.loadtest --duration 30 --writers 4 --readers 16
+"""
+import argparse
+import asyncio
+import contextlib
+import copy
+import io
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+from .workload import SCALES, generate_workload
+
+scripts_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "resources", "scripts"))
+if scripts_path not in sys.path:
+    sys.path.append(scripts_path)
+
+import vordu_ingest  # noqa: E402
+
+HEADERS = {"X-API-Key": "dev-key"}
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+class Stats:
+    """Latency samples and error counts per route."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock_errors = defaultdict(int)
+        self.throttled = defaultdict(int)
+
+    def record(self, route, seconds, response=None, error=None):
+        self.latencies[route].append(seconds)
+        if error is None and response.status_code == 429:
+            self.throttled[route] += 1
+        elif error is not None or response.status_code >= 400:
+            self.errors[route] += 1
+            text = str(error) if error is not None else response.text
+            if "database is locked" in text.lower() or "busy" in text.lower():
+                self.lock_errors[route] += 1
+
+    def report(self, elapsed):
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            if len(samples) > 1:
+                cuts = statistics.quantiles(samples, n=100, method="inclusive")
+                p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+            else:
+                p50 = p95 = p99 = samples[0]
+            routes[route] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(p50 * 1000, 2),
+                "p95_ms": round(p95 * 1000, 2),
+                "p99_ms": round(p99 * 1000, 2),
+                "max_ms": round(max(samples) * 1000, 2),
+                "errors": self.errors[route],
+                "lock_errors": self.lock_errors[route],
+                "throttled": self.throttled[route],
+            }
+        return routes
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(port, workers, db_path, db_mode="auto"):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    if db_mode != "auto":
+        env["VORDU_ASYNC_DB"] = "1" if db_mode == "async" else "0"
+    command = [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--log-level", "warning"]
+    if workers > 1:
+        command += ["--workers", str(workers)]
+    return subprocess.Popen(command, cwd=REPO_ROOT, env=env)
+
+async def wait_for_health(client, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API did not become healthy")
+
+def build_payloads(scale, systems):
+    """One (config, status) payload pair per synthetic system, derived from a single workload."""
+    # The ingest script narrates every scenario, keep that out of the report
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        paths = generate_workload(tmp, **SCALES[scale])
+        config_payload, status_payload = vordu_ingest.process_catalog(
+            paths["catalog"], vordu_ingest.parse_cucumber_json(paths["report"])
+        )
+    payloads = []
+    for n in range(systems):
+        name = f"load-{n}"
+        config = copy.deepcopy(config_payload)
+        config["system"]["name"] = name
+        status = [dict(item, project_name=name) for item in status_payload]
+        payloads.append((config, status))
+    return payloads
+
+async def timed(client, stats, route, method, path, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, path, **kwargs)
+    except httpx.HTTPError as e:
+        stats.record(route, time.perf_counter() - start, error=e)
+        return
+    stats.record(route, time.perf_counter() - start, response=response)
+
+async def writer(client, stats, payload, deadline, pause):
+    config, status = payload
+    rng = random.Random(config["system"]["name"])
+    while time.monotonic() < deadline:
+        # Each burst flips some cells so every ingest really writes
+        items = [
+            dict(item, status=rng.choice(["pass", "pending"]), completion=rng.randint(0, 100))
+            for item in status
+        ]
+        await timed(client, stats, "POST /config/ingest", "POST", "/config/ingest", json=config, headers=HEADERS)
+        await timed(client, stats, "POST /ingest", "POST", "/ingest", json=items, headers=HEADERS)
+        await asyncio.sleep(pause)
+
+async def reader(client, stats, deadline, pause):
+    while time.monotonic() < deadline:
+        await timed(client, stats, "GET /matrix", "GET", "/matrix")
+        await timed(client, stats, "GET /config", "GET", "/config")
+        await asyncio.sleep(pause)
+
+async def run(args, db_mode="auto"):
+    payloads = build_payloads(args.scale, args.systems)
+    server = None
+    url = args.url
+    tmp = tempfile.TemporaryDirectory()
+    if not url:
+        port = free_port()
+        server = start_server(port, args.workers, os.path.join(tmp.name, "load.db"), db_mode)
+        url = f"http://127.0.0.1:{port}"
+
+    limits = httpx.Limits(max_connections=args.writers + args.readers)
+    try:
+        async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+            await wait_for_health(client)
+            # Seed every system once so readers see a full matrix from the start
+            for config, status in payloads:
+                await client.post("/config/ingest", json=config, headers=HEADERS)
+                await client.post("/ingest", json=status, headers=HEADERS)
+
+            stats = Stats()
+            started = time.monotonic()
+            deadline = started + args.duration
+            tasks = [writer(client, stats, payloads[n % len(payloads)], deadline, args.writer_pause)
+                     for n in range(args.writers)]
+            tasks += [reader(client, stats, deadline, args.reader_pause) for _ in range(args.readers)]
+            await asyncio.gather(*tasks)
+            return stats.report(time.monotonic() - started)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+        tmp.cleanup()
+
+def print_report(routes):
+    print(f"{'route':<22}{'reqs':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}{'locked':>8}{'429':>8}")
+    for route, r in routes.items():
+        print(f"{route:<22}{r['requests']:>8}{r['throughput_rps']:>9}{r['p50_ms']:>10}{r['p95_ms']:>10}"
+              f"{r['p99_ms']:>10}{r['max_ms']:>10}{r['errors']:>8}{r['lock_errors']:>8}{r['throttled']:>8}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mixed read/write load test for the Vörðu API")
+    parser.add_argument("--url", help="Target a running API instead of starting a local uvicorn")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local server (default: 1)")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds to run (default: 15)")
+    parser.add_argument("--writers", type=int, default=4, help="Concurrent CI writers (default: 4)")
+    parser.add_argument("--readers", type=int, default=16, help="Concurrent dashboard readers (default: 16)")
+    parser.add_argument("--systems", type=int, default=4, help="Distinct systems written to (default: 4)")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Workload size per system (default: small)")
+    parser.add_argument("--writer-pause", type=float, default=0.5, help="Seconds between a writer's bursts (default: 0.5)")
+    parser.add_argument("--reader-pause", type=float, default=0.0, help="Seconds between a reader's polls (default: 0)")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds (default: 30)")
+    parser.add_argument("--db-mode", choices=["auto", "async", "sync", "both"], default="auto",
+                        help="Read endpoints on the async engine, in the threadpool, or both for comparison "
+                             "(default: auto, the server's VORDU_ASYNC_DB default)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON")
+    args = parser.parse_args(argv)
+    if args.url and args.db_mode == "both":
+        parser.error("--db-mode both needs the local server, drop --url")
+
+    modes = ["async", "sync"] if args.db_mode == "both" else [args.db_mode]
+    reports = {}
+    for mode in modes:
+        if len(modes) > 1:
+            print(f"\n== {mode} reads")
+        reports[mode] = asyncio.run(run(args, mode))
+        print_report(reports[mode])
+    if len(modes) > 1:
+        print()
+        for route in ("GET /matrix", "GET /config"):
+            rates = [reports[mode].get(route, {}).get("throughput_rps", 0) for mode in modes]
+            ratio = f"{rates[0] / rates[1]:.2f}x" if rates[1] else "n/a"
+            print(f"{route:<22} async {rates[0]:>8} req/s  sync {rates[1]:>8} req/s  ({ratio})")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            routes = reports if len(modes) > 1 else reports[modes[0]]
+            json.dump({"args": vars(args), "routes": routes}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
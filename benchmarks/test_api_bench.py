@@ -0,0 +1,40 @@
+"""API endpoints at benchmark scale, through an in-process test client."""
+import pytest
+
+import vordu_ingest
+
+from .conftest import HEADERS
+
+@pytest.fixture(scope="module")
+def payloads(workload, client):
+    config_payload, status_payload = vordu_ingest.process_catalog(
+        workload["catalog"], vordu_ingest.parse_cucumber_json(workload["report"])
+    )
+    client.delete("/admin/db", headers=HEADERS)
+    return {"config": config_payload, "status": status_payload}
+
+def post(client, path, payload):
+    response = client.post(path, json=payload, headers=HEADERS)
+    assert response.status_code == 200, response.text
+    return response
+
+def get(client, path):
+    response = client.get(path)
+    assert response.status_code == 200, response.text
+    return response
+
+def test_config_ingest(bench, client, payloads):
+    bench(post, client, "/config/ingest", payloads["config"])
+
+def test_status_ingest(bench, client, payloads):
+    bench(post, client, "/ingest", payloads["status"])
+
+def test_get_matrix(bench, client, payloads):
+    post(client, "/ingest", payloads["status"])
+    response = bench(get, client, "/matrix")
+    assert len(response.json()) == len(payloads["status"])
+
+def test_get_config(bench, client, payloads):
+    post(client, "/config/ingest", payloads["config"])
+    response = bench(get, client, "/config")
+    assert response.json()
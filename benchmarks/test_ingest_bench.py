@@ -0,0 +1,47 @@
+"""Client-side ingest stages at benchmark scale."""
+import os
+
+import pytest
+
+import vordu_ingest
+
+@pytest.fixture(scope="module")
+def parsed(workload):
+    entities = vordu_ingest.parse_catalog(workload["catalog"])
+    vordu_data = vordu_ingest.extract_vordu_metadata(entities)
+    scanned = vordu_ingest.scan_feature_files(workload["root"], vordu_data["system"])
+    results = vordu_ingest.parse_cucumber_json(workload["report"])
+    return {"vordu_data": vordu_data, "scanned": scanned, "results": results}
+
+def test_parse_catalog(bench, workload):
+    entities = bench(vordu_ingest.parse_catalog, workload["catalog"])
+    assert any(e["kind"] == "System" for e in entities)
+
+def test_catalog_index_cached(bench, workload, tmp_path):
+    cache = str(tmp_path / "catalogs.json")
+    vordu_ingest.index_catalogs([workload["catalog"]], cache_path=cache)
+    index = bench(vordu_ingest.index_catalogs, [workload["catalog"]], cache_path=cache)
+    assert index.hits == 1
+    assert index.systems()
+
+def test_scan_feature_files(bench, workload, parsed):
+    scanned = bench(vordu_ingest.scan_feature_files, workload["root"], parsed["vordu_data"]["system"])
+    assert len(scanned) == len(parsed["results"])
+
+def test_parse_cucumber_json(bench, workload):
+    results = bench(vordu_ingest.parse_cucumber_json, workload["report"])
+    assert results
+
+def test_merge_results(bench, parsed):
+    merged = bench(vordu_ingest.merge_results, parsed["scanned"], parsed["results"])
+    assert len(merged) == len(parsed["scanned"])
+
+def test_build_status_payload(bench, parsed):
+    merged = vordu_ingest.merge_results(parsed["scanned"], parsed["results"])
+    payload = bench(vordu_ingest.build_status_payload, parsed["vordu_data"], merged)
+    assert sum(item["scenarios_total"] for item in payload) == len(merged)
+
+def test_process_catalog(bench, workload, parsed):
+    config_payload, status_payload = bench(vordu_ingest.process_catalog, workload["catalog"], parsed["results"], rounds=3)
+    assert os.path.basename(workload["catalog"]) == vordu_ingest.CATALOG_FILENAME
+    assert status_payload
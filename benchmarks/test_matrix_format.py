@@ -0,0 +1,78 @@
+"""Columnar /matrix response against the array of objects: payload size and client parse time."""
+import gzip
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from .conftest import HEADERS, status_item
+
+COLUMNAR = "application/vnd.vordu.matrix.columnar+json"
+SYSTEMS, ROWS, PHASES = 20, 60, 4
+STATUSES = ("pass", "fail", "pending")
+
+# What each client does with the body: JSON.parse only for rows, which are
+# used as they are, JSON.parse plus one typed array per column for columnar
+# (see ui/src/utils/columnar.ts)
+NODE_PARSE = """
+const fs = require('fs');
+const [rows, columnar] = process.argv.slice(1).map(p => fs.readFileSync(p, 'utf8'));
+const fastest = (fn) => {
+    let best = Infinity;
+    for (let i = 0; i < 20; i++) {
+        const start = process.hrtime.bigint();
+        fn();
+        best = Math.min(best, Number(process.hrtime.bigint() - start) / 1e6);
+    }
+    return best;
+};
+const rows_ms = fastest(() => JSON.parse(rows));
+const columnar_ms = fastest(() => {
+    const payload = JSON.parse(columnar);
+    for (const name of Object.keys(payload.columns)) Int32Array.from(payload.columns[name]);
+});
+console.log(JSON.stringify({ rows_ms, columnar_ms }));
+"""
+
+def cell(system, row, phase):
+    return status_item(f"system-{system}", f"component-{row}", phase, STATUSES[(system + row + phase) % 3],
+                       completion=(row * 7 + phase) % 101, scenarios_total=row % 13, scenarios_passed=row % 7,
+                       steps_total=row * 3, steps_passed=row * 2)
+
+@pytest.fixture(scope="module")
+def bodies(client):
+    client.delete("/admin/db", headers=HEADERS)
+    for system in range(SYSTEMS):
+        items = [cell(system, row, phase) for row in range(ROWS) for phase in range(PHASES)]
+        assert client.post("/ingest", json=items, headers=HEADERS).status_code == 200
+    rows = client.get("/matrix")
+    columnar = client.get("/matrix", headers={"Accept": COLUMNAR})
+    assert columnar.headers["content-type"] == COLUMNAR
+    return rows.content, columnar.content
+
+def test_columnar_payload_size(bodies):
+    rows, columnar = bodies
+    print(f"\n/matrix of {SYSTEMS * ROWS * PHASES} cells: rows {len(rows)} B ({len(gzip.compress(rows))} B gzip), "
+          f"columnar {len(columnar)} B ({len(gzip.compress(columnar))} B gzip)")
+    assert len(columnar) < len(rows) * 0.4
+    assert len(gzip.compress(columnar)) < len(gzip.compress(rows))
+
+def test_columnar_parse_time(bench, bodies):
+    rows, columnar = bodies
+    bench(json.loads, rows, name="test_matrix_parse_rows")
+    bench(json.loads, columnar, name="test_matrix_parse_columnar")
+
+@pytest.mark.timing
+def test_columnar_parse_time_in_node(bodies, tmp_path):
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node is not installed")
+    paths = []
+    for name, body in zip(("rows.json", "columnar.json"), bodies):
+        (tmp_path / name).write_bytes(body)
+        paths.append(str(tmp_path / name))
+    result = json.loads(subprocess.run([node, "-e", NODE_PARSE, *paths], capture_output=True, text=True,
+                                       check=True).stdout)
+    print(f"\nnode parse: rows {result['rows_ms']:.2f} ms, columnar {result['columnar_ms']:.2f} ms")
+    assert result["columnar_ms"] < result["rows_ms"]
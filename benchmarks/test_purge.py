@@ -0,0 +1,42 @@
+"""Purges run in batches of their own transaction, writes of other systems proceed meanwhile."""
+import threading
+import time
+
+import pytest
+from sqlalchemy import select
+
+from .conftest import HEADERS, status_item, system_config
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+def ingest(client, project, domain):
+    config = system_config(project, ("auth", "billing"), domain=domain)
+    assert client.post("/config/ingest", json=config, headers=HEADERS).status_code == 200
+    items = [status_item(project, row, phase, details=[{"feature": "Access", "scenario": f"{project} {row} {phase}",
+                                                        "status": "passed", "steps": [], "duration_ms": 5}])
+             for row in ("auth", "billing") for phase in (0, 1)]
+    assert client.post("/ingest", json=items, headers=HEADERS).status_code == 200
+
+@pytest.mark.timing
+def test_writes_proceed_during_a_purge(client, monkeypatch):
+    from api import purge
+    from api.models import CellHistory, SessionLocal
+    ingest(client, "big", "platform")
+    with SessionLocal() as db:
+        sample = db.execute(select(CellHistory).limit(1)).scalar_one()
+        db.execute(CellHistory.__table__.insert(), [
+            {c.name: getattr(sample, c.name) for c in CellHistory.__table__.columns if c.name != "id"}
+        ] * 5000)
+        db.commit()
+    monkeypatch.setattr(purge, "PURGE_BATCH", 100)
+    monkeypatch.setattr(purge, "PURGE_PAUSE_S", 0.005)
+    purging = threading.Thread(target=purge.purge_system, args=(SessionLocal, "big"))
+    purging.start()
+    started = time.perf_counter()
+    ingest(client, "other", "platform")
+    elapsed = time.perf_counter() - started
+    still_purging = purging.is_alive()
+    purging.join()
+    assert still_purging, "the purge finished before the ingest, nothing was interleaved"
+    assert elapsed < 2
+    assert len(client.get("/matrix").json()) == 4
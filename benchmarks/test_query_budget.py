@@ -0,0 +1,174 @@
+"""SQL statement budgets per endpoint, and the indexes their queries use.
+
+Budgets do not grow with the payload, so an N+1 query pattern fails here
+instead of reaching production. Runs in CI with `pytest benchmarks -m "not timing"`.
+"""
+import pytest
+
+from .conftest import HEADERS, status_item
+
+pytestmark = pytest.mark.usefixtures("clean_db")
+
+def config_payload(system, components, revision=0):
+    return {
+        "system": {"name": system, "label": f"{system.capitalize()} r{revision}", "domain": "budget"},
+        "components": [
+            {"name": f"{system}-c{i}", "label": f"Component {i} r{revision}", "system": system} for i in range(components)
+        ],
+    }
+
+def status_payload(system, components, revision=0):
+    return [
+        status_item(system, f"{system}-c{i}", phase, "pending", completion=revision, scenarios_total=2,
+                    scenarios_passed=1, steps_total=10, steps_passed=5,
+                    details=[{"feature": "F", "scenario": "S", "status": "passed"}])
+        for i in range(components) for phase in range(4)
+    ]
+
+@pytest.mark.parametrize("size", [5, 100])
+def test_config_ingest_budget(client, query_budget, size):
+    # Insert path, which also writes the row hierarchy's closure, then update path
+    for revision, limit in ((0, 6), (1, 5)):
+        # Includes the data_version bump every write commits
+        with query_budget(limit):
+            response = client.post("/config/ingest", json=config_payload("budget", size, revision), headers=HEADERS)
+            assert response.status_code == 200
+
+@pytest.mark.parametrize("size", [5, 100])
+def test_status_ingest_budget(client, query_budget, size):
+    # Cells, plus the phase summary upsert, the history samples and the data_version
+    # bump. The first write also looks up the system's live generation and indexes
+    # the cells' details for search, later ones leave them alone.
+    for revision, limit in ((0, 7), (1, 5)):
+        with query_budget(limit):
+            response = client.post("/ingest", json=status_payload("budget", size, revision), headers=HEADERS)
+            assert response.status_code == 200
+
+@pytest.mark.parametrize("systems", [1, 20])
+def test_get_config_budget(client, query_budget, systems):
+    for n in range(systems):
+        client.post("/config/ingest", json=config_payload(f"budget{n}", 3), headers=HEADERS)
+    # The data_version check, then systems and rows on a cache miss
+    with query_budget(3):
+        assert len(client.get("/config").json()) == systems
+    with query_budget(1):
+        assert len(client.get("/config").json()) == systems
+
+@pytest.mark.parametrize("size", [5, 100])
+def test_get_matrix_budget(client, query_budget, size):
+    client.post("/ingest", json=status_payload("budget", size), headers=HEADERS)
+    with query_budget(2):
+        assert len(client.get("/matrix").json()) == size * 4
+    # Cached until the next write, whichever worker serves it
+    with query_budget(1):
+        assert len(client.get("/matrix").json()) == size * 4
+
+@pytest.mark.parametrize("size", [5, 100])
+def test_get_summary_budget(client, query_budget, size):
+    for n in range(3):
+        client.post("/ingest", json=status_payload(f"budget{n}", size), headers=HEADERS)
+    with query_budget(1):
+        summary = client.get("/summary").json()
+    assert summary["totals"]["cells"] == 3 * size * 4
+    assert summary["totals"]["steps_total"] == 3 * size * 4 * 10
+
+def scenario_payload(system, components, revision=0, scenarios_per_component=5):
+    return {
+        "system": {"name": system, "label": system.capitalize(), "domain": "budget", "granularity": "component"},
+        "components": [
+            {"name": f"{system}-c{i}", "label": f"Component {i}", "system": system} for i in range(components)
+        ],
+        "scenarios": [
+            {
+                "component": f"{system}-c{i}", "phase": n % 4, "feature": f"Feature {i}", "scenario": f"Scenario {n}",
+                "status": "passed" if revision == 0 or n else "failed", "passed_steps": 5 if revision == 0 or n else 0,
+                "total_steps": 5,
+            }
+            for i in range(components) for n in range(scenarios_per_component)
+        ],
+    }
+
+@pytest.mark.parametrize("size", [5, 100])
+def test_scenario_ingest_budget(client, query_budget, size):
+    # First run inserts everything, the second changes one scenario per component
+    # and so also re-indexes those cells for search and dates the unchanged ones
+    # in one statement. Both append history samples, the first also looks up the
+    # system's live generation and writes the row hierarchy's closure.
+    for revision, limit in ((0, 18), (1, 14)):
+        with query_budget(limit):
+            response = client.post("/ingest/scenarios", json=scenario_payload("budget", size, revision), headers=HEADERS)
+            assert response.status_code == 200
+
+@pytest.mark.parametrize("size", [5, 100])
+def test_search_budget(client, query_budget, size):
+    client.post("/ingest/scenarios", json=scenario_payload("budget", size), headers=HEADERS)
+    with query_budget(2):
+        hits = client.get("/search", params={"q": "scenario 3", "limit": 5}).json()["hits"]
+    assert len(hits) == 5
+    assert all("3" in f"{hit['feature']} {hit['scenario']}" for hit in hits)
+
+@pytest.mark.parametrize("size", [5, 100])
+def test_rollups_budget(client, query_budget, size):
+    payload = config_payload("budget", size)
+    for i, component in enumerate(payload["components"]):
+        component["parent"] = f"budget-c{i // 2}" if i else None
+    client.post("/config/ingest", json=payload, headers=HEADERS)
+    client.post("/ingest", json=status_payload("budget", size), headers=HEADERS)
+    # Every row's subtree totals, however deep the tree
+    with query_budget(1):
+        assert len(client.get("/systems/budget/rollups").json()) == size
+    with query_budget(1):
+        assert client.get("/systems/budget/rows/budget-c0/rollup").json()["cells"] == size * 4
+
+def test_details_budget(client, query_budget):
+    details = [{"feature": "Access", "scenario": "Login", "status": "passed", "steps": []}]
+    client.post("/ingest", json=[status_item("budget", "auth", details=details)], headers=HEADERS)
+    client.get("/matrix/budget/auth/0/details")
+    # Only the revision lookup, popular cells are served from memory
+    for _ in range(5):
+        with query_budget(1):
+            assert client.get("/matrix/budget/auth/0/details").json() == details
+
+def timed_payload(system):
+    details = [{"feature": "F", "scenario": f"S{n}", "status": "passed", "duration_ms": 10.0,
+                "steps": [{"keyword": "Given ", "name": "a step", "status": "passed", "duration_ms": 10.0}]}
+               for n in range(2)]
+    return [status_item(system, row, phase, details=details, scenarios_total=2, scenarios_passed=2)
+            for row in ("auth", "export") for phase in range(2)]
+
+def test_timed_ingest_budget(client, query_budget):
+    client.post("/ingest", json=timed_payload("budget"), params={"run_id": "build-1"}, headers=HEADERS)
+    # Unchanged cells cost their usual 4 statements, the timings 3 more: inserting
+    # them, then reading and updating the run's aggregates
+    with query_budget(7):
+        client.post("/ingest", json=timed_payload("budget"), params={"run_id": "build-1"}, headers=HEADERS)
+
+@pytest.mark.parametrize("size", [5, 100])
+def test_export_matrix_budget(client, query_budget, monkeypatch, size):
+    from api import export
+    # Several chunks, still one streamed statement
+    monkeypatch.setattr(export, "CHUNK_ROWS", 7)
+    client.post("/ingest", json=status_payload("budget", size), headers=HEADERS)
+    with query_budget(1):
+        response = client.get("/export/matrix", params={"system": "budget", "details": True})
+    assert len(response.text.splitlines()) == size * 4
+
+def query_plan(statement):
+    from sqlalchemy import text
+    from api.models import engine
+    if engine.dialect.name != "sqlite":
+        pytest.skip("SQLite query plan")
+    with engine.connect() as conn:
+        return " ".join(r[-1] for r in conn.execute(text(f"EXPLAIN QUERY PLAN {statement}")))
+
+def test_history_reads_use_the_cell_index():
+    assert "ix_cell_history_cell" in query_plan(
+        "SELECT * FROM cell_history WHERE project_name = 'budget' AND row_id = 'c0' ORDER BY recorded_at"
+    )
+
+def test_rollup_uses_the_indexes():
+    from api import hierarchy
+    from api.models import engine
+    plan = query_plan(hierarchy.rollup_query("budget", "budget-c0").compile(engine, compile_kwargs={"literal_binds": True}))
+    assert "ix_row_closure_ancestor" in plan
+    assert "ix_matrix_cells_project_row" in plan
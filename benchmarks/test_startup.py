@@ -0,0 +1,39 @@
+"""Start-up cost of the packaged ingest client (vordu_pack.py), paid on every CI build."""
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import vordu_pack
+
+SCRIPT = os.path.join(os.path.dirname(vordu_pack.__file__), "vordu_ingest.py")
+CATALOG = os.path.join(os.path.dirname(__file__), "..", "catalog-info.yaml")
+# Start-up on top of a bare interpreter, for --help and a full offline ingest of the repo's catalog
+STARTUP_BUDGET_S = 0.06
+
+@pytest.fixture(scope="module")
+def pyz(tmp_path_factory):
+    return vordu_pack.pack(SCRIPT, str(tmp_path_factory.mktemp("pack") / "vordu_ingest.pyz"))
+
+def run(*args):
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True)
+
+def fastest(*args, rounds=5):
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def test_startup_budget(pyz, bench):
+    bare = fastest("-c", "pass")
+    bench(run, pyz, "--help", name="test_startup_help")
+    help_s = fastest(pyz, "--help")
+    ingest_s = fastest(pyz, os.path.abspath(CATALOG))
+    print(f"\nstart-up over a bare interpreter: --help {(help_s - bare) * 1000:.1f} ms, "
+          f"offline ingest {(ingest_s - bare) * 1000:.1f} ms")
+    assert help_s - bare < STARTUP_BUDGET_S
+    assert ingest_s - bare < STARTUP_BUDGET_S
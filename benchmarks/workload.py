@@ -0,0 +1,158 @@
+"""Synthetic workload generator for the ingest pipeline.
+
+Writes a catalog-info.yaml with N components, a features/ tree with M
+scenarios spread over those components and a matching Cucumber JSON report,
+so parse_catalog, scan_feature_files, parse_cucumber_json and the API can be
+exercised at realistic scale.
+
+Usage: python -m benchmarks.workload OUT_DIR --components 40 --scenarios 2000
+"""
+import argparse
+import json
+import os
+import random
+
+# Named scales shared by the benchmark suite and the load-test harness
+SCALES = {
+    "small": {"components": 10, "scenarios": 200, "steps": 5},
+    "medium": {"components": 40, "scenarios": 2000, "steps": 8},
+    "large": {"components": 100, "scenarios": 20000, "steps": 10},
+}
+
+CATALOG_SYSTEM = """apiVersion: backstage.io/v1alpha1
+kind: System
+metadata:
+  name: {system}
+  description: Synthetic benchmark system.
+  annotations:
+    vordu.io/row-label: "Benchmark"
+spec:
+  owner: bench
+  domain: {domain}
+"""
+
+CATALOG_COMPONENT = """---
+apiVersion: backstage.io/v1alpha1
+kind: Component
+metadata:
+  name: {name}
+  system: {system}
+  annotations:
+    vordu.io/row-label: "{label}"{parent}
+spec:
+  type: service
+  owner: bench
+"""
+
+STEP_KEYWORDS = ["Given", "When", "Then", "And"]
+
+def component_names(system, components):
+    return [f"{system}-c{i}" for i in range(components)]
+
+def generate_catalog(system, domain, components):
+    """Returns catalog YAML text. Every fifth component is a sub-component of the one before."""
+    docs = [CATALOG_SYSTEM.format(system=system, domain=domain)]
+    names = component_names(system, components)
+    for i, name in enumerate(names):
+        parent = ""
+        if i % 5 == 4:
+            parent = f'\n    vordu.io/parent-component: "{names[i - 1]}"'
+        docs.append(CATALOG_COMPONENT.format(name=name, system=system, label=f"Component {i}", parent=parent))
+    return "".join(docs)
+
+def generate_scenarios(system, components, scenarios, steps, pass_rate=0.7, seed=0):
+    """Yields scenario dicts (component, feature, name, phase, steps, step statuses)."""
+    rng = random.Random(seed)
+    names = component_names(system, components)
+    for n in range(scenarios):
+        component_index = n % components
+        statuses = []
+        outcome = rng.random()
+        for s in range(steps):
+            if outcome < pass_rate:
+                statuses.append("passed")
+            elif outcome < pass_rate + (1 - pass_rate) / 2:
+                # Fails part way through, the remaining steps are skipped
+                fail_at = n % steps
+                statuses.append("passed" if s < fail_at else "failed" if s == fail_at else "skipped")
+            else:
+                statuses.append("undefined")
+        yield {
+            "component": names[component_index],
+            "subdir": f"c{component_index}",
+            "feature": f"Feature c{component_index}-{n % 3}",
+            "file": f"f{n % 3}",
+            "name": f"Scenario {n}",
+            "phase": (n // components) % 4,
+            "steps": [f"step {s} of scenario {n} does something observable" for s in range(steps)],
+            "statuses": statuses,
+        }
+
+def generate_workload(out_dir, components=10, scenarios=200, steps=5, system="bench", domain="bench-domain",
+                      pass_rate=0.7, seed=0):
+    """Writes catalog-info.yaml, features/ and cucumber.json below out_dir. Returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    catalog_path = os.path.join(out_dir, "catalog-info.yaml")
+    with open(catalog_path, "w", encoding="utf-8") as f:
+        f.write(generate_catalog(system, domain, components))
+
+    # Group by feature file: features/<subdir>/<file>.feature maps to "<system>-<subdir>" by convention
+    files = {}
+    for scenario in generate_scenarios(system, components, scenarios, steps, pass_rate, seed):
+        files.setdefault((scenario["subdir"], scenario["file"]), []).append(scenario)
+
+    report = []
+    for (subdir, file_name), items in files.items():
+        feature_dir = os.path.join(out_dir, "features", subdir)
+        os.makedirs(feature_dir, exist_ok=True)
+        feature_name = items[0]["feature"]
+        lines = [f"Feature: {feature_name}", ""]
+        elements = []
+        for scenario in items:
+            lines.append(f"    @phase:{scenario['phase']}")
+            lines.append(f"    Scenario: {scenario['name']}")
+            for s, step in enumerate(scenario["steps"]):
+                lines.append(f"        {STEP_KEYWORDS[min(s, 3)]} {step}")
+            lines.append("")
+            elements.append({
+                "type": "scenario",
+                "name": scenario["name"],
+                "tags": [{"name": f"@phase:{scenario['phase']}"}],
+                "steps": [
+                    {
+                        "keyword": STEP_KEYWORDS[min(s, 3)] + " ",
+                        "name": step,
+                        "result": {"status": status, "duration": 1_000_000 * (s + 1)},
+                    }
+                    for s, (step, status) in enumerate(zip(scenario["steps"], scenario["statuses"]))
+                ],
+            })
+        with open(os.path.join(feature_dir, f"{file_name}.feature"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        report.append({"name": feature_name, "elements": elements})
+
+    report_path = os.path.join(out_dir, "cucumber.json")
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+    return {"root": out_dir, "catalog": catalog_path, "report": report_path}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Vörðu ingest workload")
+    parser.add_argument("out_dir", help="Directory to write catalog-info.yaml, features/ and cucumber.json to")
+    parser.add_argument("--scale", choices=sorted(SCALES), help="Named scale (overridden by explicit sizes)")
+    parser.add_argument("--components", type=int, help="Number of components (default: 10)")
+    parser.add_argument("--scenarios", type=int, help="Number of scenarios (default: 200)")
+    parser.add_argument("--steps", type=int, help="Steps per scenario (default: 5)")
+    parser.add_argument("--system", default="bench", help="System name (default: bench)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for step outcomes")
+    args = parser.parse_args(argv)
+
+    sizes = dict(SCALES[args.scale or "small"])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+    paths = generate_workload(args.out_dir, system=args.system, seed=args.seed, **sizes)
+    print(f"Generated {sizes['scenarios']} scenarios over {sizes['components']} components in {paths['root']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,198 @@
 #!/usr/bin/env python3
-import yaml
+# Modules only some stages need (yaml, http.client, gzip, concurrent.futures,
+# ...) are imported where they are used, a run only loads what it exercises.
 import json
 import argparse
 import sys
 import os
-import urllib.request
-import urllib.error
+import time
+from contextlib import contextmanager
+import urllib.parse
+
+CATALOG_FILENAME = 'catalog-info.yaml'
+DEFAULT_CHUNK_BYTES = 512 * 1024
+SPOOL_SUFFIX = '.ndjson.gz'
+# NDJSON per replay request before gzip, the API limits the inflated body (32 MiB by default)
+REPLAY_BATCH_BYTES = 16 * 1024 * 1024
+CATALOG_CACHE_ENTRIES = 256
+
+def parse_catalog_content(content, file_path):
+    """Entities of a multi-document YAML catalog, or None if it is not valid YAML.
+
+    Uses libyaml's C loader when PyYAML was built with it, several times faster
+    than the pure-Python SafeLoader it falls back to.
+    """
+    import yaml
+
+    try:
+        documents = list(yaml.load_all(content, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader)))
+    except yaml.YAMLError as exc:
+        print(f"Error parsing YAML in {file_path}: {exc}")
+        return None
+    return [doc for doc in documents if isinstance(doc, dict) and 'kind' in doc and 'metadata' in doc]
 
 def parse_catalog(file_path):
     """Parses a multi-document YAML catalog file."""
     if not os.path.exists(file_path):
         print(f"Error: Catalog file not found at {file_path}")
         return []
-    
-    with open(file_path, 'r') as f:
+    with open(file_path, 'rb') as f:
+        return parse_catalog_content(f.read(), file_path) or []
+
+def catalog_system(entity):
+    """Vörðu config of a System entity, from its vordu.io/* annotations."""
+    meta = entity.get('metadata', {})
+    annotations = meta.get('annotations') or {}
+    spec = entity.get('spec') or {}
+    name = meta.get('name')
+    row_label = annotations.get('vordu.io/row-label')
+    return {
+        "name": name,
+        "label": name.capitalize(), # Header uses Name (e.g. Mimir)
+        "row_label": row_label or name, # Specific label for the Section Row
+        "description": meta.get('description'),
+        "domain": spec.get('domain'),
+        "granularity": annotations.get('vordu.io/granularity', 'component')
+    }
+
+def catalog_component(entity):
+    """Vörðu config of a Component entity, system is the System it names (None if it names none)."""
+    meta = entity.get('metadata', {})
+    annotations = meta.get('annotations') or {}
+    spec = entity.get('spec') or {}
+    return {
+        "name": meta.get('name'),
+        "label": annotations.get('vordu.io/row-label') or meta.get('name'),
+        "system": meta.get('system') or spec.get('partOf'),
+        "parent": annotations.get('vordu.io/parent-component')
+    }
+
+def index_systems(catalogs):
+    """Groups the entities of [(catalog path, entities)] by System, mirrors api/catalog.py.
+
+    Returns ({system name: {"system", "components"}}, {system name: catalog
+    paths}). A Component joins the System its spec.partOf (or metadata.system)
+    names, whichever catalog declares it, one naming none joins the System of
+    its own catalog if that has exactly one. The paths are those of the catalog
+    declaring the System, then of the ones contributing Components to it.
+    """
+    systems, paths = {}, {}
+    for path, entities in catalogs:
+        for entity in entities:
+            if entity.get('kind') != 'System':
+                continue
+            system = catalog_system(entity)
+            if system['name'] in systems:
+                print(f"Warning: System {system['name']} in {path} is already declared in {paths[system['name']][0]}, ignoring it.")
+                continue
+            systems[system['name']] = {"system": system, "components": []}
+            paths[system['name']] = [path]
+    for path, entities in catalogs:
+        local = [e['metadata'].get('name') for e in entities if e.get('kind') == 'System']
+        for entity in entities:
+            if entity.get('kind') != 'Component':
+                continue
+            component = catalog_component(entity)
+            component['system'] = component['system'] or (local[0] if len(local) == 1 else None)
+            if component['system'] not in systems:
+                print(f"Warning: Component {component['name']} in {path} is part of no known System ({component['system']}), skipping.")
+                continue
+            systems[component['system']]['components'].append(component)
+            if path not in paths[component['system']]:
+                paths[component['system']].append(path)
+    return systems, paths
+
+def extract_vordu_metadata(entities):
+    """Vörðu metadata of the first System in entities and its Components.
+
+    Catalogs with several Systems, or Systems spread over several catalogs,
+    are read through CatalogIndex.
+    """
+    systems, _ = index_systems([('catalog', entities)])
+    return next(iter(systems.values()), {"system": None, "components": []})
+
+class CatalogIndex:
+    """The catalogs of a run, each parsed once, and the System -> Components map over all of them.
+
+    Parsed entities are kept in a JSON file (cache_path) keyed by the SHA-256
+    of the catalog's content, so a catalog unchanged since an earlier build
+    on the agent is never parsed as YAML again. The CATALOG_CACHE_ENTRIES
+    most recently used entries are kept.
+    """
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self.cached = {}
+        if cache_path:
+            try:
+                with open(cache_path, encoding='utf-8') as f:
+                    self.cached = json.load(f)
+            except (OSError, ValueError):
+                pass # No cache yet, or a damaged one that is rebuilt
+        self.used = {} # Digest -> entities, of this run
+        self.catalogs = {} # Catalog path -> entities
+        self.hits = 0
+        self._systems = None
+
+    def add(self, path):
+        """Parses the catalog at path, or takes it from the cache. Returns its entities."""
+        import hashlib
+
         try:
-            documents = list(yaml.safe_load_all(f))
-        except yaml.YAMLError as exc:
-            print(f"Error parsing YAML: {exc}")
+            with open(path, 'rb') as f:
+                content = f.read()
+        except OSError:
+            print(f"Error: Catalog file not found at {path}")
             return []
-            
-    entities = []
-    for doc in documents:
-        if doc and 'kind' in doc and 'metadata' in doc:
-            entities.append(doc)
-    return entities
+        digest = hashlib.sha256(content).hexdigest()
+        entities = self.cached.get(digest)
+        if entities is not None:
+            self.hits += 1
+        else:
+            entities = parse_catalog_content(content, path)
+            if entities is None:
+                return []
+        self.used[digest] = entities
+        self.catalogs[path] = entities
+        self._systems = None
+        return entities
 
-def extract_vordu_metadata(entities):
-    """Extracts Vörðu-specific annotations from entities."""
-    data = {
-        "system": None,
-        "components": []
-    }
-    
-    for entity in entities:
-        kind = entity.get('kind')
-        meta = entity.get('metadata', {})
-        name = meta.get('name')
-        annotations = meta.get('annotations', {})
-        spec = entity.get('spec', {})
-        
-        # Look for Vörðu annotations
-        row_label = annotations.get('vordu.io/row-label')
-        
-        if kind == 'System':
-            data['system'] = {
-                "name": name,
-                "label": name.capitalize(), # Header uses Name (e.g. Mimir)
-                "row_label": row_label or name, # Specific label for the Section Row
-                "description": meta.get('description'),
-                "domain": spec.get('domain'),
-                "granularity": annotations.get('vordu.io/granularity', 'component') 
-            }
-        elif kind == 'Component':
-            component_data = {
-                "name": name,
-                "label": row_label or name,
-                "system": meta.get('system') or spec.get('partOf'),
-                "parent": annotations.get('vordu.io/parent-component')
-            }
-            data['components'].append(component_data)
-            
+    def systems(self):
+        """{system name: {"system", "components"}} over every added catalog, built once."""
+        if self._systems is None:
+            self._systems = index_systems(list(self.catalogs.items()))
+        return self._systems[0]
+
+    def roots(self, system_name):
+        """Directories of the catalogs a System and its Components come from, where its features are.
 
+        A directory below another one is left out, its features are found from there.
+        """
+        self.systems()
+        dirs = [os.path.dirname(os.path.abspath(path)) for path in self._systems[1][system_name]]
+        return [d for i, d in enumerate(dirs)
+                if d not in dirs[:i] and not any(d.startswith(other + os.sep) for other in dirs)]
 
-    return data
+    def save(self):
+        """Writes this run's entries first, then earlier ones up to CATALOG_CACHE_ENTRIES."""
+        if not self.cache_path or not self.used:
+            return
+        entries = dict(self.used)
+        for digest, entities in self.cached.items():
+            if len(entries) >= CATALOG_CACHE_ENTRIES:
+                break
+            entries.setdefault(digest, entities)
+        if list(entries) == list(self.cached):
+            return
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            with open(tmp, 'w', encoding='utf-8') as f:
+                # default=str: YAML dates and timestamps in annotations
+                json.dump(entries, f, default=str)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"Warning: Could not write the catalog cache {self.cache_path}: {e}")
 
 def mock_bdd_results():
     """Returns mock BDD data."""
@@ -93,6 +222,32 @@ def build_config_payload(vordu_data):
         
     return payload
 
+def parse_vordu_tags(tag_str):
+    """Returns the (component, phase) a scenario's tags map it to, either may be None."""
+    comp_name = None
+    phase_id = None
+    
+    parts = tag_str.split()
+    for part in parts:
+        # Normalize tag (remove @ if present)
+        clean_part = part.lstrip("@")
+        
+        if clean_part.startswith("component:"):
+            comp_name = clean_part.split(":")[1]
+        elif clean_part.startswith("vordu:row="): # Support vordu tags
+            comp_name = clean_part.split("=")[1]
+        elif clean_part.startswith("phase:"):
+            try:
+                phase_id = int(clean_part.split(":")[1])
+            except ValueError:
+                continue
+        elif clean_part.startswith("vordu:phase="): # Support vordu tags
+            try:
+                phase_id = int(clean_part.split("=")[1])
+            except ValueError:
+                continue
+    return comp_name, phase_id
+
 def build_status_payload(vordu_data, test_results):
     """Payload for /ingest (Flattened List[IngestItem])."""
     system_name = vordu_data['system']['name']
@@ -111,29 +266,7 @@ def build_status_payload(vordu_data, test_results):
         r_passed = result.get('passed_steps', 5 if status == 'passed' else 0)
         r_total = result.get('total_steps', 5)
         
-        # Parse tags
-        comp_name = None
-        phase_id = None
-        
-        parts = tag_str.split()
-        for part in parts:
-            # Normalize tag (remove @ if present)
-            clean_part = part.lstrip("@")
-            
-            if clean_part.startswith("component:"):
-                comp_name = clean_part.split(":")[1]
-            elif clean_part.startswith("vordu:row="): # Support vordu tags
-                comp_name = clean_part.split("=")[1]
-            elif clean_part.startswith("phase:"):
-                try:
-                    phase_id = int(clean_part.split(":")[1])
-                except ValueError:
-                    continue
-            elif clean_part.startswith("vordu:phase="): # Support vordu tags
-                try:
-                    phase_id = int(clean_part.split("=")[1])
-                except ValueError:
-                    continue
+        comp_name, phase_id = parse_vordu_tags(tag_str)
         
         if comp_name and phase_id is not None:
             key = (comp_name, phase_id)
@@ -150,6 +283,8 @@ def build_status_payload(vordu_data, test_results):
                 "tag": tag_str,
                 "steps": result.get('steps', []) # Add steps key
             }
+            if 'duration_ms' in result:
+                detail_item["duration_ms"] = result['duration_ms']
             
             status_map[key].append(detail_item)
             print(f"DEBUG: Mapped {tag_str} -> {key} Status: {status} Steps: {r_passed}/{r_total}")
@@ -256,34 +391,377 @@ def build_status_payload(vordu_data, test_results):
             
     return ingest_items
 
-def post_to_api(url, api_key, payload):
-    """Posts payload to URL."""
-    headers = {
-        "Content-Type": "application/json",
-        "X-API-Key": api_key
+def build_scenario_payload(vordu_data, test_results):
+    """Payload for /ingest/scenarios: raw scenarios, rolled up by the server.
+
+    Step count defaults match build_status_payload so both modes produce the same cells.
+    """
+    declared = {comp['name'] for comp in vordu_data['components']}
+    scenarios = []
+    for result in test_results:
+        tag_str = result['tag']
+        comp_name, phase_id = parse_vordu_tags(tag_str)
+        if comp_name not in declared or phase_id is None:
+            continue
+        status = result.get('status')
+        scenarios.append({
+            "component": comp_name,
+            "phase": phase_id,
+            "feature": result.get('feature', 'Unknown'),
+            "scenario": result.get('name', 'Unknown'),
+            "status": status,
+            "passed_steps": result.get('passed_steps', 5 if status == 'passed' else 0),
+            "total_steps": result.get('total_steps', 5),
+            "tag": tag_str,
+            "steps": result.get('steps', []),
+            "duration_ms": result.get('duration_ms'),
+        })
+    return {
+        "system": vordu_data['system'],
+        "components": vordu_data['components'],
+        "scenarios": scenarios,
     }
-    data = json.dumps(payload).encode('utf-8')
-    req = urllib.request.Request(url, data=data, headers=headers, method='POST')
-    
-    try:
+
+# Responses worth retrying: the API pod is restarting or asking us to slow down
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+
+def iter_chunks(items, max_bytes):
+    """Yields JSON array bodies of already-encoded items, each at most max_bytes.
+
+    Items are encoded one at a time so the full payload is never serialized as
+    a single string. An item larger than max_bytes is sent on its own.
+    """
+    parts = []
+    size = 2 # The enclosing brackets
+    for item in items:
+        encoded = json.dumps(item).encode('utf-8')
+        if parts and size + len(encoded) + 1 > max_bytes:
+            yield b'[' + b','.join(parts) + b']'
+            parts = []
+            size = 2
+        parts.append(encoded)
+        size += len(encoded) + 1
+    if parts:
+        yield b'[' + b','.join(parts) + b']'
+
+class ApiSession:
+    """Posts payloads to the Vörðu API over one persistent HTTP/1.1 connection.
+
+    Batch runs send a config and a status payload per catalog, so reusing the
+    connection avoids a TCP (and TLS) handshake for every POST. Bodies are
+    gzip-compressed and transient failures are retried with jittered
+    exponential backoff.
+    """
+
+    def __init__(self, base_url, api_key, timeout=30, compress=True, retries=5,
+                 backoff=0.5, max_backoff=30.0):
+        parts = urllib.parse.urlsplit(base_url)
+        self.scheme = parts.scheme or 'http'
+        self.netloc = parts.netloc
+        self.base_path = parts.path.rstrip('/')
+        self.api_key = api_key
         # Timeout set to 30 seconds to prevent hanging indefinitely
-        with urllib.request.urlopen(req, timeout=30) as response:
-            print(f"[{url}] Success: {response.status}")
-            return True
-    except urllib.error.HTTPError as e:
-        print(f"[{url}] Error: {e.code} {e.reason}")
-        print(e.read().decode())
-        return False
-    except urllib.error.URLError as e:
-        print(f"[{url}] Connection Error: {e.reason}")
-        return False
-    except Exception as e:
-        print(f"[{url}] Unexpected Error: {e}")
+        self.timeout = timeout
+        self.compress = compress
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self):
+        import http.client
+
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _request(self, path, body, headers):
+        if self.conn is None:
+            self.conn = self._connect()
+        self.conn.request('POST', self.base_path + path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        # Drain the body so the connection can be reused for the next request
+        return response.status, response.reason, response.getheader('Retry-After'), response.read()
+
+    def _delay(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring a server supplied Retry-After."""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        import random
+
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def post_body(self, path, data, content_type="application/json", gzipped=False):
+        """Posts an encoded body to path (e.g. "/ingest"). Returns True on a 2xx response."""
+        return self.send(path, data, content_type, gzipped) is not None
+
+    def send(self, path, data, content_type="application/json", gzipped=False):
+        """Posts an encoded body to path. Returns the response body of a 2xx response, else None."""
+        import gzip
+        import http.client
+
+        url = f"{self.scheme}://{self.netloc}{self.base_path}{path}"
+        headers = {
+            "Content-Type": content_type,
+            "X-API-Key": self.api_key
+        }
+        if self.compress and not gzipped:
+            data = gzip.compress(data, compresslevel=6)
+            gzipped = True
+        if gzipped:
+            headers["Content-Encoding"] = "gzip"
+
+        for attempt in range(self.retries + 1):
+            last_try = attempt == self.retries
+            try:
+                try:
+                    status, reason, retry_after, body = self._request(path, data, headers)
+                except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                    # The server closed an idle keep-alive connection, reconnect straight away
+                    self.close()
+                    status, reason, retry_after, body = self._request(path, data, headers)
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                print(f"[{url}] Connection Error: {e}")
+                if last_try:
+                    return None
+                delay = self._delay(attempt)
+                print(f"[{url}] Retrying in {delay:.1f}s ({attempt + 1}/{self.retries})...")
+                time.sleep(delay)
+                continue
+
+            if 200 <= status < 300:
+                print(f"[{url}] Success: {status}")
+                return body
+            print(f"[{url}] Error: {status} {reason}")
+            print(body.decode(errors='replace'))
+            if status not in RETRYABLE_STATUSES or last_try:
+                return None
+            delay = self._delay(attempt, retry_after)
+            print(f"[{url}] Retrying in {delay:.1f}s ({attempt + 1}/{self.retries})...")
+            time.sleep(delay)
+        return None
+
+    def post(self, path, payload):
+        """Posts a JSON payload to path. Returns True on a 2xx response."""
+        return self.post_body(path, json.dumps(payload).encode('utf-8'))
+
+    def post_scenarios(self, payload, max_bytes):
+        """Posts a /ingest/scenarios payload in size-bounded chunks. Returns True if every chunk succeeded.
+
+        Chunks share a run_id and only the last one is marked complete, so the
+        server prunes scenarios missing from the run once all of them arrived.
+        """
+        chunks = list(iter_chunks(payload['scenarios'], max_bytes)) or [b'[]']
+        run_id = os.urandom(16).hex()
+        for i, chunk in enumerate(chunks):
+            envelope = {k: v for k, v in payload.items() if k != 'scenarios'}
+            envelope.update(run_id=run_id, complete=i == len(chunks) - 1)
+            body = json.dumps(envelope).encode('utf-8')[:-1] + b', "scenarios": ' + chunk + b'}'
+            if not self.post_body("/ingest/scenarios", body):
+                return False
+        return True
+
+    def post_items(self, path, items, max_bytes):
+        """Posts a list payload in size-bounded chunks. Returns True if every chunk succeeded."""
+        for body in iter_chunks(items, max_bytes):
+            if not self.post_body(path, body):
+                return False
+        return True
+
+    def post_snapshot(self, items, max_bytes):
+        """Replaces each system's cells with items atomically. Returns True if every system was published.
+
+        The cells are staged in size-bounded chunks as a new generation of the
+        system, dashboards keep showing the previous matrix until the publish.
+        A staging generation left behind by a failure is collected by the API.
+        """
+        by_system = {}
+        for item in items:
+            by_system.setdefault(item['project_name'], []).append(item)
+        for system, system_items in by_system.items():
+            base = f"/systems/{urllib.parse.quote(system, safe='')}/generations"
+            body = self.send(base, b'')
+            if body is None:
+                return False
+            generation = json.loads(body)['generation']
+            if not self.post_items(f"{base}/{generation}/cells", system_items, max_bytes):
+                return False
+            if not self.post_body(f"{base}/{generation}/publish", b''):
+                return False
+        return True
+
+class Spool:
+    """Gzip-compressed NDJSON file of payloads the API could not accept.
+
+    Each line is {"endpoint": ..., "payload": ..., "spooled_at": ...}. The file
+    is written under a temporary name and renamed on close, so a concurrent
+    replay never picks up a half-written spool.
+    """
+
+    def __init__(self, spool_dir):
+        self.spool_dir = spool_dir
+        self.path = None
+        self.file = None
+        self.count = 0
+
+    def write(self, endpoint, payload):
+        if self.file is None:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            stamp = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+            # Unique even for several runs of one process within a second
+            self.path = os.path.join(self.spool_dir, f"vordu-{stamp}-{os.getpid()}-{os.urandom(4).hex()}{SPOOL_SUFFIX}")
+            import gzip
+
+            self.file = gzip.open(self.path + '.tmp', 'wt', encoding='utf-8')
+        record = {
+            "endpoint": endpoint,
+            "payload": payload,
+            "spooled_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        }
+        self.file.write(json.dumps(record) + "\n")
+        self.count += 1
+        print(f"Spooled {endpoint} payload to {self.path}")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            os.replace(self.path + '.tmp', self.path)
+            self.file = None
+
+def read_spool(path):
+    """Records of a spool file, in the order they were spooled."""
+    import gzip
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def rewrite_spool(path, lines):
+    """Replaces a spool file with the given encoded lines, atomically like Spool.close."""
+    import gzip
+
+    with gzip.open(path + '.tmp', 'wb') as f:
+        f.writelines(lines)
+    os.replace(path + '.tmp', path)
+
+def split_spool_record(record, max_bytes):
+    """Encoded NDJSON lines for a spool record, each at most max_bytes where the payload allows.
+
+    Status payloads are split into several records and scenario payloads into
+    chunks sharing a run_id, the way post_items and post_scenarios send them.
+    A config payload, or a single item larger than max_bytes, stays whole.
+    """
+    line = json.dumps(record).encode('utf-8') + b'\n'
+    endpoint, payload = record['endpoint'], record['payload']
+    if len(line) <= max_bytes or endpoint not in ('/ingest', '/ingest/scenarios'):
+        return [line]
+    items = payload if endpoint == '/ingest' else payload['scenarios']
+    # Each split record repeats the envelope, leave room for it and the run_id
+    overhead = len(line) - len(json.dumps(items).encode('utf-8')) + 128
+    chunks = [json.loads(chunk) for chunk in iter_chunks(items, max(max_bytes - overhead, 1))]
+    if endpoint == '/ingest':
+        payloads = chunks
+    else:
+        run_id = payload.get('run_id') or os.urandom(16).hex()
+        last = len(chunks) - 1
+        payloads = [
+            {**payload, 'scenarios': chunk, 'run_id': run_id, 'complete': i == last and payload.get('complete', True)}
+            for i, chunk in enumerate(chunks)
+        ]
+    return [json.dumps({**record, 'payload': p}).encode('utf-8') + b'\n' for p in payloads]
+
+def replay_spool(spool_dir, session, batch_bytes=REPLAY_BATCH_BYTES):
+    """Drains spool_dir through the bulk /admin/import endpoint. Returns True when empty.
+
+    The API limits request bodies after inflating them, so records are packed
+    into requests of at most batch_bytes of NDJSON before compression, larger
+    records are split first. A file is removed once the API has committed all
+    of its records, after a failure it is rewritten with the ones left.
+    """
+    import gzip
+
+    paths = sorted(
+        os.path.join(spool_dir, name) for name in os.listdir(spool_dir) if name.endswith(SPOOL_SUFFIX)
+    )
+    if not paths:
+        print(f"Spool {spool_dir} is empty.")
+        return True
+
+    # [path, lines, lines committed] of files with records not committed yet
+    pending = []
+    batch, size = [], 0
+
+    def post_batch():
+        data = gzip.compress(b''.join(entry[1][i] for entry, i in batch))
+        print(f"Replaying {len(batch)} record(s)...")
+        if not session.post_body("/admin/import", data, content_type="application/x-ndjson", gzipped=True):
+            return False
+        for entry, _ in batch:
+            entry[2] += 1
+        for entry in [e for e in pending if e[2] == len(e[1])]:
+            os.remove(entry[0])
+            pending.remove(entry)
+        return True
+
+    def fail(unread):
+        for path, lines, committed in pending:
+            if committed:
+                rewrite_spool(path, lines[committed:])
+        print(f"Replay failed, {len(pending) + unread} file(s) left in {spool_dir}")
         return False
 
-def parse_cucumber_json(file_path):
-    """Parses a Cucumber JSON report to extract Vörðu tags and status."""
+    for n, path in enumerate(paths):
+        entry = [path, [line for record in read_spool(path) for line in split_spool_record(record, batch_bytes)], 0]
+        pending.append(entry)
+        for i, line in enumerate(entry[1]):
+            if batch and size + len(line) > batch_bytes:
+                if not post_batch():
+                    return fail(len(paths) - n - 1)
+                batch, size = [], 0
+            batch.append((entry, i))
+            size += len(line)
+    if batch and not post_batch():
+        return fail(0)
+    # Files without records have nothing to send
+    for path, _, _ in pending:
+        os.remove(path)
+    print(f"Replayed {len(paths)} spool file(s).")
+    return True
+
+def replay_main(argv):
+    parser = argparse.ArgumentParser(prog='vordu_ingest.py replay', description='Replay spooled Vörðu payloads')
+    parser.add_argument('--spool-dir', required=True, help='Directory written by --spool-dir')
+    parser.add_argument('--api-url', required=True, help='Base URL of the Vörðu API (e.g., http://localhost:8000)')
+    parser.add_argument('--api-key', help='API Key for authentication', default='dev-key')
+    parser.add_argument('--retries', type=int, default=5, help='Retries for transient API failures (default: 5)')
+    parser.add_argument('--batch-size', type=int, default=REPLAY_BATCH_BYTES,
+                        help='Maximum uncompressed bytes per import request, below VORDU_MAX_BODY_BYTES (default: 16 MiB)')
+    args = parser.parse_args(argv)
+
+    with ApiSession(args.api_url, args.api_key, retries=args.retries) as session:
+        if not replay_spool(args.spool_dir, session, args.batch_size):
+            sys.exit(1)
+
+def parse_cucumber_json(file_path, strict=False):
+    """Parses a Cucumber JSON report to extract Vörðu tags and status.
+
+    With strict a missing or unreadable report raises (OSError, ValueError)
+    instead of counting as an empty one.
+    """
     if not os.path.exists(file_path):
+        if strict:
+            raise FileNotFoundError(file_path)
         print(f"Error: Report file not found at {file_path}")
         return []
     
@@ -291,6 +769,8 @@ def parse_cucumber_json(file_path):
         try:
             features = json.load(f)
         except json.JSONDecodeError as e:
+            if strict:
+                raise
             print(f"Error parsing JSON: {e}")
             return []
             
@@ -342,14 +822,21 @@ def parse_cucumber_json(file_path):
                 
             # Collect step details
             step_details = []
+            scenario_ms = None
             for s in steps:
-                step_details.append({
+                step = {
                     "keyword": s.get('keyword', ''),
                     "name": s.get('name', ''),
                     "status": s.get('result', {}).get('status', 'undefined')
-                })
+                }
+                # Cucumber reports durations in nanoseconds, skipped steps have none
+                duration = s.get('result', {}).get('duration')
+                if isinstance(duration, (int, float)):
+                    step["duration_ms"] = round(duration / 1e6, 3)
+                    scenario_ms = (scenario_ms or 0) + step["duration_ms"]
+                step_details.append(step)
 
-            results.append({
+            result = {
                 "feature": feature_name,
                 "name": scenario_name,
                 "tag": tag_str,
@@ -357,116 +844,658 @@ def parse_cucumber_json(file_path):
                 "total_steps": total_steps,
                 "passed_steps": passed_steps,
                 "steps": step_details # Store detailed steps
-            })
+            }
+            if scenario_ms is not None:
+                result["duration_ms"] = round(scenario_ms, 3)
+            results.append(result)
             
     return results
 
-def main():
-    parser = argparse.ArgumentParser(description='Vörðu Ingestion Script')
-    parser.add_argument('catalog', help='Path to catalog-info.yaml')
-    parser.add_argument('--report', help='Path to cucumber.json test report (optional)')
-    parser.add_argument('--api-url', help='Base URL of the Vörðu API (e.g., http://localhost:8000)')
-    parser.add_argument('--api-key', help='API Key for authentication', default='dev-key')
-    args = parser.parse_args()
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB, or None where unsupported."""
+    try:
+        import resource
+    except ImportError: # Windows agents
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
 
-    print(f"--- Processing {args.catalog} ---")
-    
-    entities = parse_catalog(args.catalog)
-    if not entities:
-        print("No valid entities found.")
-        sys.exit(1)
-        
-    vordu_data = extract_vordu_metadata(entities)
-    
-    if not vordu_data['system']:
-        print("Warning: No 'System' entity found. Proceeding with Components only.")
-        
-    if args.report:
-        print(f"Parsing test results from {args.report}...")
-        results = parse_cucumber_json(args.report)
-    else:
-        print("Using Mock BDD results (No report provided).")
-        results = mock_bdd_results()
-    
-    # 1. Config Ingestion
-    config_payload = build_config_payload(vordu_data)
-    
-    # NEW: Phase A - Direct Feature Scanning (Planned Work)
-    print("Scanning feature files for planned scenarios...")
-    # Assume feature files are in a standard location relative to catalog or use current dir
-    # For now, we search recursively in current working directory
-    # Ideally this root should be configurable or relative to catalog file dir
-    root_dir = os.path.dirname(os.path.abspath(args.catalog))
-    scanned_features = scan_feature_files(root_dir, vordu_data['system'])
-    print(f"Found {len(scanned_features)} planned scenarios.")
-
-    if args.report:
-        print(f"Parsing test results from {args.report}...")
-        results = parse_cucumber_json(args.report)
-    else:
-        print("Using Mock BDD results (No report provided).")
-        results = mock_bdd_results()
-        
-    # NEW: Phase B - Merge Logic
+class StageProfiler:
+    """Records wall time, CPU time, peak RSS and item counts per ingest stage.
+
+    Disabled profilers only hand out a scratch record, so stages can always be
+    wrapped. CPU time is per thread, which keeps concurrent catalogs apart.
+    """
+
+    def __init__(self, enabled=False, cprofile=False):
+        self.enabled = enabled
+        self.cprofile = cprofile
+        self.entries = []
+        self.started = time.perf_counter()
+        import threading
+
+        self.lock = threading.Lock()
+        self.slowest = None # (wall_s, stage, label, cProfile.Profile)
+
+    @contextmanager
+    def stage(self, name, label=None):
+        """Times the enclosed block. Set record['items'] to report how much it processed."""
+        record = {"stage": name, "label": label, "items": None}
+        if not self.enabled:
+            yield record
+            return
+
+        profile = None
+        if self.cprofile:
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield record
+        finally:
+            record["wall_s"] = time.perf_counter() - wall_start
+            record["cpu_s"] = time.thread_time() - cpu_start
+            if profile:
+                profile.disable()
+            record["peak_rss_kb"] = peak_rss_kb()
+            with self.lock:
+                self.entries.append(record)
+                if profile and (self.slowest is None or record["wall_s"] > self.slowest[0]):
+                    self.slowest = (record["wall_s"], name, label, profile)
+
+    def report(self):
+        """Machine-readable summary: per-stage totals plus every individual stage run."""
+        stages = {}
+        for entry in self.entries:
+            totals = stages.setdefault(entry["stage"], {
+                "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "items": 0, "peak_rss_kb": None
+            })
+            totals["calls"] += 1
+            totals["wall_s"] += entry["wall_s"]
+            totals["cpu_s"] += entry["cpu_s"]
+            totals["items"] += entry["items"] or 0
+            if entry["peak_rss_kb"] is not None:
+                totals["peak_rss_kb"] = max(totals["peak_rss_kb"] or 0, entry["peak_rss_kb"])
+
+        report = {
+            "version": 1,
+            "created_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            "python": sys.version.split()[0],
+            "argv": sys.argv[1:],
+            "total_wall_s": time.perf_counter() - self.started,
+            "peak_rss_kb": peak_rss_kb(),
+            "stages": stages,
+            "entries": self.entries,
+        }
+        if self.slowest:
+            report["cprofile_stage"] = {"stage": self.slowest[1], "label": self.slowest[2]}
+        return report
+
+    def write(self, path, cprofile_path=None):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        print(f"Profile written to {path}")
+        if cprofile_path and self.slowest:
+            self.slowest[3].dump_stats(cprofile_path)
+            print(f"cProfile of slowest stage ({self.slowest[1]}) written to {cprofile_path}")
+
+def merge_results(scanned_features, results):
+    """Overlays execution results onto the scanned (planned) scenarios."""
     # We want to create a master list of results.
     # 1. Start with Scanned Scenarios (Status: Planned/Pending)
     # 2. Overlay Execution Results (Status: Pass/Fail/Skip -> Pending)
-    
+
     # Create a lookup for results by (Feature, Scenario)
     result_map = {}
     for r in results:
         key = (r.get('feature'), r.get('name'))
         result_map[key] = r
-    
+
     merged_results = []
-    
+
     for scanned in scanned_features:
         key = (scanned['feature'], scanned['name'])
-        
+
         if key in result_map:
              # Found execution result -> Use it
              # Use Scanned Tags (includes conventions) + Result Status
              result = result_map[key]
              merged_item = scanned.copy()
              merged_item['status'] = result['status']
-             merged_item['total_steps'] = result['total_steps']
-             merged_item['passed_steps'] = result['passed_steps']
+             # Mock results carry no step counts, keep the scanned ones then
+             if 'total_steps' in result:
+                 merged_item['total_steps'] = result['total_steps']
+                 merged_item['passed_steps'] = result['passed_steps']
              merged_item['steps'] = result.get('steps', []) # Fix: Copy steps to merged item
-             
+
              merged_results.append(merged_item)
              # Mark as used
              del result_map[key]
         else:
              # No result -> It is Planned
              merged_results.append(scanned)
-             
+
     # Add any remaining results (Dynamic/Generated tests?)
     for r in result_map.values():
         merged_results.append(r)
-            
-    final_results = merged_results
 
-    if args.api_url:
-        config_url = f"{args.api_url}/config/ingest"
-        print(f"Posting Config to {config_url}...")
-        if not post_to_api(config_url, args.api_key, config_payload):
-            print(f"Failed to post config to {config_url}")
-            sys.exit(1)
-        
-        # 2. Status Ingestion (Using Merged Results)
+    return merged_results
+
+def process_system(index, system_name, results, profiler=None, server_rollup=False):
+    """Builds the (config, status) payloads of one System of a CatalogIndex.
+
+    With server_rollup the config payload is None and the status payload is the
+    scenario-level /ingest/scenarios payload.
+    """
+    profiler = profiler or StageProfiler()
+    vordu_data = index.systems()[system_name]
+
+    # 1. Config Ingestion
+    config_payload = build_config_payload(vordu_data)
+
+    # Phase A - Direct Feature Scanning (Planned Work)
+    # Feature files are searched recursively relative to the catalog file dirs
+    with profiler.stage("scan_features", system_name) as record:
+        scanned_features = []
+        for root_dir in index.roots(system_name):
+            scanned_features.extend(scan_feature_files(root_dir, vordu_data['system']))
+        record["items"] = len(scanned_features)
+    print(f"[{system_name}] Found {len(scanned_features)} planned scenarios.")
+
+    # Phase B - Merge Logic
+    with profiler.stage("merge", system_name) as record:
+        final_results = merge_results(scanned_features, results)
+        record["items"] = len(final_results)
+
+    if server_rollup:
+        # The API aggregates, so granularity can change later without a new run
+        scenario_payload = build_scenario_payload(vordu_data, final_results)
+        return None, scenario_payload
+
+    # 2. Status Ingestion (Using Merged Results)
+    with profiler.stage("aggregate", system_name) as record:
         status_payload = build_status_payload(vordu_data, final_results)
-        status_url = f"{args.api_url}/ingest"
-        print(f"Posting Status to {status_url}...")
-        if not post_to_api(status_url, args.api_key, status_payload):
-            print(f"Failed to post status to {status_url}")
-            sys.exit(1)
-        
+        record["items"] = len(status_payload)
+    return config_payload, status_payload
+
+def index_catalogs(catalogs, profiler=None, cache_path=None):
+    """CatalogIndex of the catalogs, parsed (or read from the cache) one after the other."""
+    profiler = profiler or StageProfiler()
+    index = CatalogIndex(cache_path)
+    for catalog_path in catalogs:
+        print(f"--- Processing {catalog_path} ---")
+        with profiler.stage("parse_catalog", catalog_path) as record:
+            entities = index.add(catalog_path)
+            record["items"] = len(entities)
+        if not entities:
+            print(f"No valid entities found in {catalog_path}.")
+    index.save()
+    return index
+
+def process_catalog(catalog_path, results, profiler=None, server_rollup=False):
+    """Builds the (config, status) payloads for the System of one catalog, or None if it has none.
+
+    See process_system, a catalog declaring several Systems only yields the first.
+    """
+    index = index_catalogs([catalog_path], profiler)
+    systems = list(index.systems())
+    if not systems:
+        print(f"Warning: No 'System' entity found in {catalog_path}. Skipping.")
+        return None
+    if len(systems) > 1:
+        print(f"Warning: {catalog_path} declares {len(systems)} Systems, only {systems[0]} is processed.")
+    return process_system(index, systems[0], results, profiler, server_rollup)
+
+def processed_systems(index, results, profiler, args):
+    """Yields (system name, process_system() result) as the index's Systems finish.
+
+    Several Systems are processed on up to args.jobs threads, a single one
+    on this thread without paying for the pool.
+    """
+    systems = list(index.systems())
+    if len(systems) <= 1 or args.jobs <= 1:
+        for name in systems:
+            yield name, process_system(index, name, results, profiler, args.server_rollup)
+        return
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {executor.submit(process_system, index, name, results, profiler, args.server_rollup): name
+                   for name in systems}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def discover_catalogs(root_dir):
+    """Finds every catalog-info.yaml below root_dir, skipping hidden and vendored dirs."""
+    catalogs = []
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames[:] = sorted(
+            d for d in dirnames if not d.startswith('.') and d != 'node_modules'
+        )
+        if CATALOG_FILENAME in filenames:
+            catalogs.append(os.path.join(dirpath, CATALOG_FILENAME))
+    return catalogs
+
+# Watch Mode
+# Long-running ingest for local BDD work. The catalog, the feature files and
+# the report are re-parsed only when they change, and only cells (or, with
+# --server-rollup, scenarios) that differ from the last push are posted.
+
+# Events arriving within this many seconds of each other are handled together
+WATCH_DEBOUNCE_S = 0.05
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_ISDIR = 0x40000000
+
+def file_stamp(path):
+    """(mtime_ns, size) of path, None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def watched_dirs(root_dir):
+    """root_dir and every directory below it, skipping hidden and vendored ones."""
+    for dirpath, dirnames, _ in os.walk(root_dir):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.') and d != 'node_modules']
+        yield dirpath
+
+class InotifyWatcher:
+    """Linux inotify on the watched directories, through ctypes so the script needs no extra package.
+
+    wait() returns the changed paths, or a set containing None when events
+    were lost and everything has to be re-read.
+    """
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, roots, dirs):
+        import ctypes
+        import ctypes.util
+
+        self.ctypes = ctypes
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.roots = list(roots)
+        self.watches = {}
+        try:
+            for root in self.roots:
+                for directory in watched_dirs(root):
+                    self.add(directory)
+            for directory in dirs:
+                self.add(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def add(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            # ENOSPC: fs.inotify.max_user_watches is too low for the tree
+            raise OSError(self.ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.watches[wd] = directory
+
+    def read(self):
+        import struct
+
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = struct.unpack_from('iIII', data, offset)
+            name = os.fsdecode(data[offset + 16:offset + 16 + length].rstrip(b'\0'))
+            offset += 16 + length
+            directory = self.watches.get(wd)
+            if mask & IN_Q_OVERFLOW:
+                changed.add(None)
+                continue
+            if directory is None:
+                continue
+            path = os.path.join(directory, name)
+            if not mask & IN_ISDIR:
+                changed.add(path)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                if any(path.startswith(root + os.sep) for root in self.roots):
+                    for subdir in watched_dirs(path):
+                        self.add(subdir)
+                    changed.update(find_feature_files(path))
+            elif mask & IN_MOVED_FROM:
+                # A directory moved away takes its files without an event for each
+                changed.add(None)
+        return changed
+
+    def wait(self, timeout=None):
+        """Blocks until something changed, then collects events until it is quiet."""
+        import select
+
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        changed = self.read()
+        while select.select([self.fd], [], [], WATCH_DEBOUNCE_S)[0]:
+            changed |= self.read()
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class PollingWatcher:
+    """Fallback for other platforms and network file systems: compares file stamps every interval seconds."""
+
+    def __init__(self, roots, files, interval):
+        self.roots = list(roots)
+        self.files = list(files)
+        self.interval = interval
+        self.stamps = self.snapshot()
+
+    def snapshot(self):
+        stamps = {path: file_stamp(path) for path in self.files}
+        for root in self.roots:
+            for path in find_feature_files(root):
+                stamps[path] = file_stamp(path)
+        return stamps
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(self.interval)
+            stamps = self.snapshot()
+            changed = {path for path in stamps.keys() | self.stamps.keys() if stamps.get(path) != self.stamps.get(path)}
+            self.stamps = stamps
+            if changed:
+                return changed
+        return set()
+
+    def close(self):
+        pass
+
+def make_watcher(roots, files, poll_interval, poll=False):
+    """inotify where available, polling otherwise."""
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots, {os.path.dirname(path) for path in files})
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), polling every {poll_interval}s instead.")
+    return PollingWatcher(roots, files, poll_interval)
+
+class WatchedCatalog:
+    """Parse caches of one catalog and what was last pushed for it."""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.root = os.path.dirname(self.path)
+        self.vordu_data = None
+        self.features = {} # Feature file -> its scanned scenarios
+        self.pushed = {} # Cell (or scenario) key -> payload item the API has
+        self.config_pushed = False
+
+    @property
+    def system(self):
+        return self.vordu_data and self.vordu_data['system']
+
+    def load(self):
+        """Parses the catalog and all its feature files. Returns False if it has no System."""
+        systems, _ = index_systems([(self.path, parse_catalog(self.path))])
+        if len(systems) > 1:
+            print(f"Warning: {self.path} declares {len(systems)} Systems, watch mode follows {next(iter(systems))}.")
+        self.vordu_data = next(iter(systems.values()), {"system": None, "components": []})
+        self.features = {}
+        self.config_pushed = False
+        if not self.system:
+            print(f"Warning: No 'System' entity found in {self.path}. Waiting for changes.")
+            return False
+        for path in find_feature_files(self.root):
+            self.update_feature(path)
+        return True
+
+    def owns(self, path):
+        return path.startswith(self.root + os.sep)
+
+    def update_feature(self, path):
+        try:
+            self.features[path] = parse_feature_file(path, self.system['name'])
+        except (OSError, ValueError):
+            # Deleted or moved away since the event, or caught mid-write
+            self.features.pop(path, None)
+
+    def scanned(self):
+        # Sorted, so the details of unchanged cells compare equal across pushes
+        return [item for path in sorted(self.features) for item in self.features[path]]
+
+def push_changes(session, catalog, results, args, catalog_changed=False):
+    """Posts what differs from the last push. Returns how many cells or scenarios were sent, None on failure."""
+    merged = merge_results(catalog.scanned(), results)
+    if args.server_rollup:
+        payload = build_scenario_payload(catalog.vordu_data, merged)
+        # The API identifies a scenario within its component, like build_status_payload counts them
+        current = {(s['component'], s['feature'], s['scenario']): s for s in payload['scenarios']}
+        changed = [s for key, s in current.items() if catalog.pushed.get(key) != s]
+        if catalog_changed or catalog.pushed.keys() - current.keys():
+            # The whole run, so the API prunes scenarios that are gone
+            sent, posted = len(current), session.post_scenarios(payload, args.chunk_size)
+        elif changed:
+            sent, posted = len(changed), session.post("/ingest/scenarios", {**payload, "scenarios": changed, "complete": False})
+        else:
+            return 0
     else:
-        print("\n[Generated Config Payload]")
-        print(json.dumps(config_payload, indent=2))
-        print("\n[Generated Status Payload]")
-        status_payload = build_status_payload(vordu_data, final_results)
-        print(json.dumps(status_payload, indent=2))
+        if not catalog.config_pushed:
+            if not session.post("/config/ingest", build_config_payload(catalog.vordu_data)):
+                return None
+            catalog.config_pushed = True
+        items = build_status_payload(catalog.vordu_data, merged)
+        current = {(i['project_name'], i['row_id'], i['phase_id']): i for i in items}
+        changed = [i for key, i in current.items() if catalog.pushed.get(key) != i]
+        if args.atomic and (catalog_changed or catalog.pushed.keys() - current.keys()):
+            # Cells of rows that are gone disappear with the snapshot
+            sent, posted = len(items), session.post_snapshot(items, args.chunk_size)
+        elif changed:
+            sent, posted = len(changed), session.post_items(f"/ingest?run_id={os.urandom(16).hex()}", changed, args.chunk_size)
+        else:
+            return 0
+    if not posted:
+        # Nothing is marked as pushed, the next change sends it again
+        return None
+    catalog.pushed = current
+    return sent
+
+def load_results(report):
+    if not report:
+        return mock_bdd_results()
+    return parse_cucumber_json(report, strict=True)
+
+def watch_main(args, catalogs):
+    """Ingests the catalogs, then keeps the API in step with their files and the report until interrupted."""
+    session = ApiSession(args.api_url, args.api_key, compress=not args.no_gzip, retries=args.retries)
+    report = os.path.abspath(args.report) if args.report else None
+    try:
+        results = load_results(report)
+    except (OSError, ValueError) as e:
+        print(f"Report not readable yet ({e}), using no results until it is.")
+        results = []
+    watched = [WatchedCatalog(c) for c in catalogs]
+    for catalog in watched:
+        if catalog.load():
+            push_changes(session, catalog, results, args, catalog_changed=True)
+
+    watcher = make_watcher([c.root for c in watched], [c.path for c in watched] + ([report] if report else []),
+                           args.poll_interval, args.poll)
+    print(f"Watching {len(watched)} catalog(s){' and ' + report if report else ''} for changes (Ctrl+C to stop)...")
+    try:
+        while True:
+            changed = watcher.wait()
+            started = time.monotonic()
+            rescan = None in changed
+            report_changed = report is not None and (rescan or report in changed)
+            if report_changed:
+                try:
+                    results = load_results(report)
+                except (OSError, ValueError) as e:
+                    # Usually a report still being written, its close triggers another event
+                    print(f"Skipping unreadable report ({e}).")
+                    report_changed = False
+            for catalog in watched:
+                catalog_changed = rescan or catalog.path in changed
+                if catalog_changed:
+                    if not catalog.load():
+                        continue
+                elif not catalog.system:
+                    continue
+                else:
+                    features = {p for p in changed if p.endswith('.feature') and catalog.owns(p)}
+                    for path in features:
+                        catalog.update_feature(path)
+                    if not features and not report_changed:
+                        continue
+                sent = push_changes(session, catalog, results, args, catalog_changed)
+                elapsed_ms = (time.monotonic() - started) * 1000
+                if sent is None:
+                    print(f"[{catalog.path}] Push failed, retrying with the next change.")
+                elif sent:
+                    print(f"[{catalog.path}] Pushed {sent} change(s) in {elapsed_ms:.0f} ms.")
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        watcher.close()
+        session.close()
+
+def main():
+    # "replay" is dispatched by hand, a subparser would swallow the positional catalogs
+    if len(sys.argv) > 1 and sys.argv[1] == 'replay':
+        return replay_main(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(description='Vörðu Ingestion Script', epilog='Run "%(prog)s replay --help" to drain a spool.')
+    parser.add_argument('catalogs', nargs='*', metavar='catalog', help='Path(s) to catalog-info.yaml')
+    parser.add_argument('--discover', metavar='ROOT', help=f'Ingest every {CATALOG_FILENAME} found below ROOT')
+    parser.add_argument('--jobs', type=int, default=4, help='Number of Systems processed concurrently (default: 4)')
+    parser.add_argument('--catalog-cache', metavar='PATH', default=os.environ.get('VORDU_CATALOG_CACHE'),
+                        help='JSON file caching parsed catalogs by content hash across runs (default: $VORDU_CATALOG_CACHE, none)')
+    parser.add_argument('--report', help='Path to cucumber.json test report (optional)')
+    parser.add_argument('--api-url', help='Base URL of the Vörðu API (e.g., http://localhost:8000)')
+    parser.add_argument('--api-key', help='API Key for authentication', default='dev-key')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_BYTES, help='Maximum uncompressed bytes per status POST (default: 512 KiB)')
+    parser.add_argument('--retries', type=int, default=5, help='Retries for transient API failures (default: 5)')
+    parser.add_argument('--no-gzip', action='store_true', help='Send request bodies uncompressed')
+    parser.add_argument('--server-rollup', action='store_true', help='Send scenario-level results to /ingest/scenarios and let the API aggregate them')
+    parser.add_argument('--atomic', action='store_true', help='Publish each system\'s status as one snapshot, readers never see a partially ingested matrix')
+    parser.add_argument('--spool-dir', metavar='DIR', help='Spool payloads the API rejects or cannot receive to DIR instead of failing')
+    parser.add_argument('--watch', action='store_true', help='Keep running and push only what changed whenever the catalog, a feature file or the report changes')
+    parser.add_argument('--poll', action='store_true', help='With --watch, poll file stamps instead of using inotify')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='Seconds between polls with --watch --poll or without inotify (default: 0.5)')
+    parser.add_argument('--profile', metavar='PATH', help='Write a JSON report of per-stage wall/CPU time, peak RSS and item counts')
+    parser.add_argument('--profile-cprofile', metavar='PATH', help='With --profile, also dump cProfile stats of the slowest stage')
+    args = parser.parse_args()
+
+    catalogs = list(args.catalogs)
+    if args.discover:
+        catalogs.extend(discover_catalogs(args.discover))
+    if not catalogs:
+        parser.error(f"provide at least one catalog or --discover a root containing {CATALOG_FILENAME}")
+    if args.watch:
+        if not args.api_url:
+            parser.error("--watch needs --api-url")
+        return watch_main(args, catalogs)
+
+    profiler = StageProfiler(enabled=bool(args.profile), cprofile=bool(args.profile and args.profile_cprofile))
+
+    # The report is shared by every catalog (e.g. one cucumber.json for a monorepo)
+    with profiler.stage("parse_report", args.report) as record:
+        if args.report:
+            print(f"Parsing test results from {args.report}...")
+            results = parse_cucumber_json(args.report)
+        else:
+            print("Using Mock BDD results (No report provided).")
+            results = mock_bdd_results()
+        record["items"] = len(results)
+
+    index = index_catalogs(catalogs, profiler, args.catalog_cache)
+    if index.hits:
+        print(f"{index.hits} of {len(catalogs)} catalog(s) unchanged, taken from {args.catalog_cache}.")
+    # A catalog may only contribute Components to a System declared elsewhere
+    failed = not index.systems() or any(not index.catalogs.get(c) for c in catalogs)
+    if not index.systems():
+        print("Warning: No 'System' entity found in any catalog.")
+    session = None
+    if args.api_url:
+        session = ApiSession(args.api_url, args.api_key, compress=not args.no_gzip, retries=args.retries)
+    spool = Spool(args.spool_dir) if args.spool_dir else None
+
+    # Scanning and aggregating run concurrently, posting stays on this thread so every
+    # payload goes over the one keep-alive connection.
+    for system_name, payloads in processed_systems(index, results, profiler, args):
+        config_payload, status_payload = payloads
+
+        if session and args.server_rollup:
+            print(f"Posting Scenarios for {system_name}...")
+            with profiler.stage("post_scenarios", system_name) as record:
+                record["items"] = len(status_payload['scenarios'])
+                posted = session.post_scenarios(status_payload, args.chunk_size)
+            if not posted:
+                print(f"Failed to post scenarios for {system_name}")
+                if spool:
+                    spool.write("/ingest/scenarios", status_payload)
+                else:
+                    failed = True
+        elif session:
+            print(f"Posting Config for {system_name}...")
+            with profiler.stage("post_config", system_name) as record:
+                record["items"] = len(config_payload['components'])
+                posted = session.post("/config/ingest", config_payload)
+            if not posted:
+                print(f"Failed to post config for {system_name}")
+                if spool:
+                    # Keep config and status together so a replay applies them in order
+                    spool.write("/config/ingest", config_payload)
+                    spool.write("/ingest", status_payload)
+                else:
+                    failed = True
+                continue
+
+            print(f"Posting Status for {system_name}...")
+            with profiler.stage("post_status", system_name) as record:
+                record["items"] = len(status_payload)
+                if args.atomic:
+                    posted = session.post_snapshot(status_payload, args.chunk_size)
+                else:
+                    # Chunks share a run_id, so their durations count as one run
+                    posted = session.post_items(f"/ingest?run_id={os.urandom(16).hex()}", status_payload, args.chunk_size)
+            if not posted:
+                print(f"Failed to post status for {system_name}")
+                if spool:
+                    spool.write("/ingest", status_payload)
+                else:
+                    failed = True
+        elif args.server_rollup:
+            print(f"\n[Generated Scenario Payload: {system_name}]")
+            print(json.dumps(status_payload, indent=2))
+        else:
+            print(f"\n[Generated Config Payload: {system_name}]")
+            print(json.dumps(config_payload, indent=2))
+            print(f"\n[Generated Status Payload: {system_name}]")
+            print(json.dumps(status_payload, indent=2))
+
+    if session:
+        session.close()
+    if spool and spool.count:
+        spool.close()
+        print(f"Warning: {spool.count} payload(s) spooled to {spool.path}, run 'replay' once the API is back.")
+    if args.profile:
+        profiler.write(args.profile, args.profile_cprofile)
+    if failed:
+        sys.exit(1)
 
 def deduce_component_from_path(file_path, system_name):
     """
@@ -498,100 +1527,105 @@ def deduce_component_from_path(file_path, system_name):
         
     return None
 
-def scan_feature_files(root_dir, system_info):
-    """Scans .feature files for scenarios and interprets tags/conventions."""
+def find_feature_files(root_dir):
+    """Every .feature file below root_dir."""
     import glob
-    import re
-    
-    scanned_items = []
-    system_name = system_info['name']
-    
+
     # Find all feature files recursively
     # Use glob with recursive flag
     pattern = os.path.join(glob.escape(root_dir), "**", "*.feature")
-    files = glob.glob(pattern, recursive=True)
+    return glob.glob(pattern, recursive=True)
+
+def scan_feature_files(root_dir, system_info):
+    """Scans .feature files for scenarios and interprets tags/conventions."""
+    scanned_items = []
+    for file_path in find_feature_files(root_dir):
+        scanned_items.extend(parse_feature_file(file_path, system_info['name']))
+    return scanned_items
+
+def parse_feature_file(file_path, system_name):
+    """The scenarios of one .feature file, as planned (pending) results."""
+    scanned_items = []
+    # Determine Convention Component
+    convention_comp = deduce_component_from_path(file_path, system_name)
     
-    for file_path in files:
-        # Determine Convention Component
-        convention_comp = deduce_component_from_path(file_path, system_name)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+    current_tags = []
+    current_feature_name = "Unknown Feature"
+    current_scenario = None
+    current_feature_tags = []
+    
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
             
-        current_tags = []
-        current_feature_name = "Unknown Feature"
-        current_scenario = None
-        current_feature_tags = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Naive Gherkin Parsing
-            if line.startswith('@'):
-                # Tag line
-                current_tags.extend(line.split())
-            elif line.startswith('Feature:'):
-                 # Extract Feature Name
-                 parts = line.split(':', 1)
-                 if len(parts) > 1:
-                     current_feature_name = parts[1].strip()
-                 current_feature_tags = list(current_tags) # Capture feature tags
-                 current_tags = [] # Reset tags specifically for next element (Background/Rule/Scenario)
-            elif line.startswith('Scenario:') or line.startswith('Scenario Outline:'):
-                # Found a Scenario
-                parts = line.split(':', 1)
-                scenario_name = parts[1].strip() if len(parts) > 1 else "Unknown"
-
-                # Determine Tags
-                final_tags = list(current_feature_tags) + list(current_tags)
-                tag_str = " ".join(final_tags)
-                
-                # Check if explicit row tag exists
-                has_row_tag = any(t.startswith("@vordu:row=") or t.startswith("@component:") for t in final_tags)
-                
-                if not has_row_tag and convention_comp:
-                    # Apply Convention Tag
-                    # We inject it into the tag string so build_status_payload can parse it
-                    tag_str += f" @component:{convention_comp}"
-                
-                # Prepare for next scenario but also capture this one
-                if current_scenario:
-                     scanned_items.append(current_scenario)
-                
-                current_scenario = {
-                    "feature": current_feature_name,
-                    "name": scenario_name,
-                    "tag": tag_str,
-                    "status": "pending",
-                    "total_steps": 0,
-                    "passed_steps": 0,
-                    "steps": []
-                }
-                
-                current_tags = [] # Reset for next scenario
-            elif line.startswith('#'):
-                 pass
-            elif any(line.startswith(k) for k in ['Given', 'When', 'Then', 'And', 'But']) and current_scenario:
-                 # It is a step
-                 parts = line.split(maxsplit=1)
-                 keyword = parts[0]
-                 name = parts[1] if len(parts) > 1 else ""
-                 
-                 current_scenario['steps'].append({
-                     "keyword": keyword,
-                     "name": name,
-                     "status": "pending"
-                 })
-                 current_scenario['total_steps'] += 1
-            else:
-                 pass
-                 
-        # Append the last found scenario
-        if current_scenario:
-            scanned_items.append(current_scenario)
-                 
+        # Naive Gherkin Parsing
+        if line.startswith('@'):
+            # Tag line
+            current_tags.extend(line.split())
+        elif line.startswith('Feature:'):
+             # Extract Feature Name
+             parts = line.split(':', 1)
+             if len(parts) > 1:
+                 current_feature_name = parts[1].strip()
+             current_feature_tags = list(current_tags) # Capture feature tags
+             current_tags = [] # Reset tags specifically for next element (Background/Rule/Scenario)
+        elif line.startswith('Scenario:') or line.startswith('Scenario Outline:'):
+            # Found a Scenario
+            parts = line.split(':', 1)
+            scenario_name = parts[1].strip() if len(parts) > 1 else "Unknown"
+
+            # Determine Tags
+            final_tags = list(current_feature_tags) + list(current_tags)
+            tag_str = " ".join(final_tags)
+            
+            # Check if explicit row tag exists
+            has_row_tag = any(t.startswith("@vordu:row=") or t.startswith("@component:") for t in final_tags)
+            
+            if not has_row_tag and convention_comp:
+                # Apply Convention Tag
+                # We inject it into the tag string so build_status_payload can parse it
+                tag_str += f" @component:{convention_comp}"
+            
+            # Prepare for next scenario but also capture this one
+            if current_scenario:
+                 scanned_items.append(current_scenario)
+            
+            current_scenario = {
+                "feature": current_feature_name,
+                "name": scenario_name,
+                "tag": tag_str,
+                "status": "pending",
+                "total_steps": 0,
+                "passed_steps": 0,
+                "steps": []
+            }
+            
+            current_tags = [] # Reset for next scenario
+        elif line.startswith('#'):
+             pass
+        elif any(line.startswith(k) for k in ['Given', 'When', 'Then', 'And', 'But']) and current_scenario:
+             # It is a step
+             parts = line.split(maxsplit=1)
+             keyword = parts[0]
+             name = parts[1] if len(parts) > 1 else ""
+             
+             current_scenario['steps'].append({
+                 "keyword": keyword,
+                 "name": name,
+                 "status": "pending"
+             })
+             current_scenario['total_steps'] += 1
+        else:
+             pass
+             
+    # Append the last found scenario
+    if current_scenario:
+        scanned_items.append(current_scenario)
+             
     return scanned_items
 
 if __name__ == "__main__":
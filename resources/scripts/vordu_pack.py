@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Packages vordu_ingest.py as a self-contained zipapp with precompiled bytecode.
+
+    python3 vordu_pack.py vordu_ingest.py vordu_ingest.pyz
+    python3 vordu_ingest.pyz catalog-info.yaml --api-url ...
+
+Agents that run the script straight from libraryResource byte-compile it on
+every build, since the workspace copy is always new. The archive carries
+unchecked hash-based .pyc files (PEP 552) next to the sources, which
+zipimport loads without compiling or stat-ing anything. An interpreter of
+another version ignores them and falls back to the sources.
+
+PyYAML's pure-Python modules, if the packing interpreter has them, are
+bundled under _vendor/ and put at the end of sys.path: an agent's own PyYAML
+(which may have the libyaml C loader) still wins, one without any PyYAML
+still parses catalogs.
+
+The archive is reproducible, the same inputs always give the same bytes, so
+ingestVordu can cache it by content hash.
+"""
+import argparse
+import importlib.util
+import marshal
+import os
+import sys
+import zipfile
+
+INTERPRETER = '/usr/bin/env python3'
+VENDOR_DIR = '_vendor'
+# Fixed timestamp of every member, keeps the archive reproducible
+DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+MAIN = f"""\
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), {VENDOR_DIR!r}))
+
+import vordu_ingest
+
+sys.exit(vordu_ingest.main())
+"""
+
+def bytecode(source, filename):
+    """Unchecked hash-based .pyc contents of source.
+
+    filename is the member name, not the archive's path, which would make the
+    bytes depend on where the archive is written.
+    """
+    code = compile(source, filename, 'exec', dont_inherit=True)
+    flags = 0b01 # Hash-based, source is not checked
+    return (importlib.util.MAGIC_NUMBER + flags.to_bytes(4, 'little')
+            + importlib.util.source_hash(source) + marshal.dumps(code))
+
+def vendored_yaml():
+    """(archive name, source) of the pure-Python PyYAML modules, empty without PyYAML."""
+    spec = importlib.util.find_spec('yaml')
+    if spec is None or not spec.submodule_search_locations:
+        return []
+    package_dir = spec.submodule_search_locations[0]
+    return [
+        (f"{VENDOR_DIR}/yaml/{name}", open(os.path.join(package_dir, name), 'rb').read())
+        for name in sorted(os.listdir(package_dir)) if name.endswith('.py')
+    ]
+
+def pack(script_path, target, vendor=True):
+    """Writes the zipapp of script_path to target, replacing it atomically. Returns target."""
+    with open(script_path, 'rb') as f:
+        modules = [('vordu_ingest.py', f.read())]
+    if vendor:
+        modules.extend(vendored_yaml())
+    modules.append(('__main__.py', MAIN.encode('utf-8')))
+
+    directory = os.path.dirname(os.path.abspath(target))
+    os.makedirs(directory, exist_ok=True)
+    # Builds running side by side on one agent may pack the same target
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(b'#!' + INTERPRETER.encode('utf-8') + b'\n')
+        # Stored, not deflated: the archive is read on every start
+        with zipfile.ZipFile(f, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for name, source in modules:
+                for member, data in ((name, source), (name + 'c', bytecode(source, name))):
+                    info = zipfile.ZipInfo(member, DATE_TIME)
+                    info.external_attr = 0o644 << 16
+                    archive.writestr(info, data)
+    os.chmod(tmp, 0o755)
+    os.replace(tmp, target)
+    return target
+
+def main():
+    parser = argparse.ArgumentParser(description='Package vordu_ingest.py as a zipapp with precompiled bytecode')
+    parser.add_argument('script', help='Path to vordu_ingest.py')
+    parser.add_argument('target', help='Path of the .pyz to write')
+    parser.add_argument('--no-vendor', action='store_true', help='Do not bundle PyYAML, rely on the agent\'s')
+    args = parser.parse_args()
+    print(f"Packed {pack(args.script, args.target, vendor=not args.no_vendor)}")
+
+if __name__ == "__main__":
+    sys.exit(main())
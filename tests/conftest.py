@@ -28,6 +28,23 @@ def page(browser_context):
 def api_base_url():
     return os.getenv("API_BASE_URL", "http://127.0.0.1:8000") # Avoid IPv6 issues
 
+@pytest.fixture(scope="session")
+def app_client(tmp_path_factory):
+    """The API in-process, for scenarios that tune its limits or look into its tables.
+
+    It runs against a throwaway SQLite file, never DATABASE_URL's database:
+    scenarios reset it. Subprocesses (workers, the importer CLI) inherit it.
+    """
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp_path_factory.mktemp('api') / 'vordu.db'}"
+    # Scenarios ingest back to back, far above the per-key rate limit
+    os.environ.setdefault("VORDU_INGEST_RATE", "100000")
+    os.environ.setdefault("VORDU_INGEST_BURST", "100000")
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    with TestClient(app) as client:
+        yield client
+
 @pytest.fixture
 def ui_base_url():
     return os.getenv("UI_BASE_URL", "http://localhost:5173") # Better for local dev
@@ -110,6 +127,26 @@ from pytest_bdd import given, when, then, parsers
 from playwright.sync_api import Page, expect
 import re
 
+@given('the API is running')
+def api_running(api_base_url):
+    try:
+        response = requests.get(f"{api_base_url}/docs")
+        assert response.status_code == 200
+    except requests.exceptions.ConnectionError:
+        pytest.fail("API is not running")
+
+@given('the API is running in-process', target_fixture="client")
+def api_in_process(app_client):
+    # An empty database, and empty per-worker caches that outlive it
+    from api import details
+    assert app_client.delete("/admin/db", headers={"X-API-Key": "dev-key"}).status_code == 200
+    details.details_cache.clear()
+    return app_client
+
+@then(parsers.parse('the response status should be {status:d}'))
+def response_status(response, status):
+    assert response.status_code == status, response.text
+
 @given('the Vörðu UI is running')
 def vordu_ui_running(page: Page, ui_base_url, seed_vordu_data):
     page.goto(ui_base_url)
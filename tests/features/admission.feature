@@ -0,0 +1,88 @@
+Feature: Admission Control
+    As the operator of a shared Vörðu API
+    I want write endpoints to cap, rate limit and queue what CI pipelines send
+    So that one noisy pipeline cannot starve the others or exhaust the server
+
+    Background:
+        Given the API is running in-process
+        And no key has used its rate limit yet
+
+    @component:vordu-api @phase:1
+    Scenario: Cap the items of one request
+        Given writes accept at most 10 items
+        When I ingest 10 status items
+        Then the response status should be 200
+        When I ingest 11 status items
+        Then the response status should be 413
+        And 1 request should have been rejected for "items"
+
+    @component:vordu-api @phase:1
+    Scenario: Cap the body size after inflating it
+        Given writes accept bodies of at most 4096 bytes
+        When I ingest 100 status items as plain JSON
+        Then the response status should be 413
+        When I ingest 100 status items gzip-compressed below the limit
+        Then the response status should be 413
+        And 2 requests of the key "default" should have been rejected for "size"
+        When I ingest 2 status items gzip-compressed
+        Then the response status should be 200
+        When the key "wrong" ingests 100 status items as plain JSON
+        Then the response status should be 413
+        And 1 requests of the key "unknown" should have been rejected for "size"
+
+    @component:vordu-api @phase:1
+    Scenario: Rate limit every API key on its own
+        Given the API keys "noisy:noisy-secret,quiet:quiet-secret" with 2 writes of burst and 0.5 per second
+        When the key "noisy-secret" ingests 2 times
+        Then the response status should be 200
+        When the key "noisy-secret" ingests 1 times
+        Then the response status should be 429
+        And the response should ask to retry within 2 seconds
+        When the key "quiet-secret" ingests 1 times
+        Then the response status should be 200
+        When the key "dev-key" ingests 1 times
+        Then the response status should be 403
+
+    @component:vordu-api @phase:1
+    Scenario: Admit purges like the other writes
+        Given the API keys "ops:ops-secret" with 1 writes of burst and 0.5 per second
+        When the key "ops-secret" purges the cells not written since 2026-01-01
+        Then the response status should be 200
+        When the key "ops-secret" purges the system "gone"
+        Then the response status should be 429
+        When the key "ops-secret" purges the domain "gone"
+        Then the response status should be 429
+        And 2 requests of the key "ops" should have been rejected for "rate"
+
+    @component:vordu-api @phase:1
+    Scenario: Push back when the write queue is full
+        Given a write gate with 1 slot and 1 waiting place, both taken
+        When I ingest 1 status items
+        Then the response status should be 429
+        And the response should ask to retry within 1 seconds
+        And 1 request should have been rejected for "busy"
+        When the write gate frees up
+        And I ingest 1 status items
+        Then the response status should be 200
+        And no write should hold the gate
+
+    @component:vordu-api @phase:1
+    Scenario: Push back when a write waits too long
+        Given a write gate without free slots
+        When I ingest 1 status items
+        Then the response status should be 429
+        And no write should hold the gate
+
+    @component:vordu-api @phase:1
+    Scenario: Read every member of a gzip body
+        When I import 3 configs gzip-compressed one member each
+        Then the response status should be 200
+        And the import should count 3 records
+        And the config should list the systems "first,second,third"
+        When I import them truncated
+        Then the response status should be 400
+        When I import them followed by garbage
+        Then the response status should be 400
+        When the body limit is one byte less than the inflated members
+        And I import the 3 configs again
+        Then the response status should be 413
@@ -9,3 +9,36 @@ Feature: Vörðu API
         When I POST a Cucumber JSON report to "/ingest"
         Then the response status should be 200
         And the database should contain the new test results
+
+    @vordu:phase=1
+    Scenario: Ingest a gzip-compressed payload
+        Given the API is running
+        When I POST a gzip-compressed status payload to "/ingest"
+        Then the response status should be 200
+        And the database should contain the new test results
+
+    @vordu:phase=1
+    Scenario: Expose Prometheus metrics
+        Given the API is running
+        When I POST a Cucumber JSON report to "/ingest"
+        And I GET "/metrics"
+        Then the response status should be 200
+        And the metrics should include "vordu_ingest_items_count"
+        And the metrics should include "vordu_db_queries_per_request_count"
+
+    @vordu:phase=1
+    Scenario: Summarize portfolio progress
+        Given the API is running
+        When I POST a Cucumber JSON report to "/ingest"
+        And I POST a Cucumber JSON report to "/ingest"
+        And I GET "/summary"
+        Then the response status should be 200
+        And the summary for "vordu-test" should count 5 of 5 scenarios in phase 0
+
+    @vordu:phase=1
+    Scenario: Search scenarios and steps
+        Given the API is running
+        When I POST a status payload with scenario details to "/ingest"
+        And I GET "/search?q=lighthouse beac"
+        Then the response status should be 200
+        And the first search hit should be row "api-search" in phase 1
@@ -0,0 +1,59 @@
+Feature: Catalog Index
+    As a platform team whose systems span several repositories
+    I want one ingest run to index every catalog it is given
+    So that a system's components are published together wherever they are declared
+
+    Background:
+        Given a "platform" repository declaring the systems "storage" and "network" with a component each
+        And a "service" repository adding "storage-cache" to "storage" and "billing-api" to an unknown "billing"
+
+    @component:vordu-api @phase:1
+    Scenario: Index systems and components across catalogs
+        When I index both catalogs
+        Then the index should list the systems "storage,network"
+        And "storage" should have the components "storage-blobs,storage-cache"
+        And "network" should have the components "network-dns"
+        And the index should have reported "billing-api" as part of no system
+        And "storage" should scan the features of both repositories
+        And "network" should scan the features of the "platform" repository
+        And "storage" should have scenarios in "storage-cache" phase 1 only
+        And "network" should have scenarios in "network-dns" phase 0 only
+
+    @component:vordu-api @phase:1
+    Scenario: Components without a system join the only system of their catalog
+        Given a catalog with the system "solo" and the component "solo-a" without a system
+        When I extract its metadata
+        Then the system should be "solo"
+        And "solo-a" should be part of "solo"
+
+    @component:vordu-api @phase:1
+    Scenario: Cache parsed catalogs by their content
+        When I index both catalogs with a cache
+        Then 0 catalogs should have come from the cache
+        And the cache should hold 2 catalogs
+        When I index both catalogs with the cache, without parsing YAML
+        Then 2 catalogs should have come from the cache
+        And the index should list the same systems as before
+        And YAML should not have been imported
+        When the "service" catalog gains "storage-disk"
+        And I index both catalogs with the cache
+        Then 1 catalogs should have come from the cache
+        And the last component of "storage" should be "storage-disk"
+        And the cache should hold 3 catalogs
+
+    @component:vordu-api @phase:1
+    Scenario: Ingest every system of the catalogs from the command line
+        When I run the ingest script on both catalogs
+        Then the ingest script should generate the config of "storage"
+        And the ingest script should generate the config of "network"
+
+    @component:vordu-api @phase:1
+    Scenario: Ingest the raw documents of the catalogs
+        Given the API is running in-process
+        When I ingest the documents of both catalogs as config
+        Then the response status should be 200
+        And the response should list the systems "storage,network" and skip "billing-api"
+        And the config of "storage" should have the rows "storage-blobs,storage-cache"
+        And the config of "network" should have the rows "network-dns"
+        When I ingest a system document without a name as config
+        Then the response status should be 422
@@ -0,0 +1,66 @@
+Feature: Cell Details
+    As the Vörðu dashboard opening a cell
+    I want the scenarios of one cell on request, served from memory when popular
+    So that the matrix stays small and opening a cell stays fast
+
+    Background:
+        Given the API is running in-process
+        And the cells of "wall":
+            | row     | phase | scenarios     |
+            | auth    | 0     | Login         |
+            | auth    | 1     | Logout        |
+            | billing | 0     | Pay           |
+
+    @component:vordu-api @phase:1
+    Scenario: Ship the details of cells on request only
+        Then the matrix should not ship details
+        And the matrix with details should list "Logout" in "auth" phase 1
+        And the details of "auth" phase 1 should be those of the matrix
+        And the details of "auth" phase 2 should not be found
+
+    @component:vordu-api @phase:1
+    Scenario: Serve popular cells from memory
+        When I open "auth" phase 0 6 times
+        Then the details cache should have missed 1 times and hit 5 times
+
+    @component:vordu-api @phase:1
+    Scenario: Writes invalidate the details of their cell only
+        Given "auth" phase 0 and "billing" phase 0 were opened
+        When the same cells are ingested again
+        And I open "auth" phase 0
+        Then the details cache should have missed 0 times
+        When "auth" phase 0 is ingested with "Login,Logout"
+        Then the details of "auth" phase 0 should list "Login,Logout"
+        When I open "billing" phase 0
+        Then the details cache should have missed 1 times
+
+    @component:vordu-api @phase:1
+    Scenario: See the writes of other workers
+        Given "auth" phase 0 was opened
+        When another worker changes the details of "auth" phase 0 to "Elsewhere"
+        Then the details of "auth" phase 0 should list "Elsewhere"
+
+    @component:vordu-api @phase:1
+    Scenario: Published generations replace cached details
+        Given "auth" phase 0 was opened
+        When "auth" phase 0 is ingested atomically with "Snapshot"
+        Then the details of "auth" phase 0 should list "Snapshot"
+
+    @component:vordu-api @phase:1
+    Scenario: Keep the details cache within its byte budget
+        Given a details cache of 4000 bytes
+        When 10 cells of 600 bytes are cached
+        Then the cache should never have grown over its budget
+        When the 6th cell is read and an 11th cached
+        Then the 6th cell should still be cached and the 7th not
+        And 6 cells should have been evicted for size
+        And the 6th cell should not be found under another revision, nor after it
+        When a cell of 1000 bytes is cached
+        Then it should not be cached
+        And the size metric should match the cache
+
+    @component:vordu-api @phase:1
+    Scenario: See the writes of other workers in the matrix
+        Given the matrix holds 3 cells of "wall"
+        When another worker adds a cell of "other"
+        Then the matrix should hold 4 cells
@@ -0,0 +1,69 @@
+Feature: Scenario Durations
+    As a developer waiting on a slow CI pipeline
+    I want the durations of scenarios and runs kept and ranked
+    So that I know which tests to speed up first
+
+    Background:
+        Given the API is running in-process
+
+    @component:vordu-api @phase:2
+    Scenario: Carry the durations of a Cucumber report into the payload
+        Given a Cucumber report of "Login with SSO" with steps of 200 ms and 1.5 ms
+        When I parse the report
+        Then the scenario should take 201.5 ms
+        And its steps should take "200.0,1.5" ms
+
+    @component:vordu-api @phase:2
+    Scenario: Keep durations out of the cell details
+        When the run of "timed" is ingested
+        Then the details of the matrix should carry no duration
+        When the run of "timed" is ingested again 2 times slower
+        Then only the first run's history samples should carry details
+
+    @component:vordu-api @phase:2
+    Scenario: Rank the slowest scenarios and features
+        When the run of "timed" is ingested
+        And the run of "timed" is ingested again 3 times slower
+        Then the slowest scenarios of "timed" should be "Login with SSO,Export a report,Logout"
+        And the slowest scenario should take 2000 ms on average, at most 3000 ms, over 2 runs
+        And the slowest feature of "timed" should be "Login" with 2020 ms on average
+        And the slowest scenarios in phase 1 of "timed" should be "Export a report"
+        And ranking the durations of "timed" by step should be rejected
+
+    @component:vordu-api @phase:2
+    Scenario: Percentiles and trend from the run aggregates
+        When the run of "timed" is ingested at 1, 2 and 4 times its duration
+        Then phase 0 of "timed" should count 3 runs, 6 scenarios and take at most 4000 ms
+        And the percentiles of phase 0 should be within a histogram bucket
+        And the trend of "timed" should total "1160,2320,4640" ms
+        And the trend of the last 2 runs should total "2320,4640" ms
+        And the trend of phase 1 should peak at "150,300,600" ms
+
+    @component:vordu-api @phase:2
+    Scenario: Chunks of one run share its aggregates
+        When the run of "timed" is ingested as "build-1"
+        And the run of "timed" is ingested again 2 times slower as "build-1"
+        Then the trend of "timed" should hold "build-1" with 6 scenarios and 3480 ms
+
+    @component:vordu-api @phase:2
+    Scenario: Attribute the durations of scenario results to their row
+        When the scenario "Login with SSO" of "sso" under "auth" is ingested taking 42 ms
+        Then the slowest scenario of "timed" should be in "auth", taking 42 ms
+        And the details of "auth" should carry no duration
+
+    @component:vordu-api @phase:2
+    Scenario: Label steps of both report shapes
+        Given the steps "Given |a user", "Given|it works" and "|no keyword"
+        When I take their durations
+        Then the scenario should take 13 ms
+        And the steps should be labelled "Given a user,Given it works,no keyword"
+        When a cell with the step "Given|it works" is ingested
+        Then its timing should be stored as "Given it works"
+
+    @component:vordu-api @phase:2
+    Scenario: Keep run aggregates longer than scenario timings
+        When the run of "timed" is ingested
+        And the history is compacted a month later
+        Then 3 timings should have been deleted
+        And "timed" should have no slowest scenarios
+        And the trend of "timed" should hold 1 runs
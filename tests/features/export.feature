@@ -0,0 +1,41 @@
+Feature: Bulk Export
+    As an analyst working outside the dashboard
+    I want every matrix cell and history sample streamed in a file format
+    So that I can load the roadmap into my own tools
+
+    Background:
+        Given the API is running in-process
+        And exports of 7 rows a chunk
+        And 10 cells of "alpha" and "beta" with details
+        And 50 hourly history samples of "alpha" from 2026-03-01
+
+    @component:vordu-data @phase:2
+    Scenario: Export the matrix as NDJSON
+        When I export the matrix of "beta" with details
+        Then the export should be NDJSON
+        And it should hold the cells "r0" to "r9" of "beta" in order
+        And its cells should carry their details
+
+    @component:vordu-data @phase:2
+    Scenario: Export a time range of history as CSV
+        When I export the history of "alpha" as CSV from 2026-03-01T10:00:00Z until 2026-03-02T00:00:00Z
+        Then the export should hold 14 samples from 2026-03-01T10:00:00Z without details
+
+    @component:vordu-data @phase:2
+    Scenario: Reject unknown datasets, formats and dates
+        When I export the dataset "runs"
+        Then the response status should be 404
+        When I export the matrix as "xml"
+        Then the response status should be 400
+        When I export the matrix since "2026-01-01"
+        Then the response status should be 400
+
+    @component:vordu-data @phase:2
+    Scenario Outline: Export the history as <file_format>
+        When I export the history of "alpha" in the <file_format> format
+        Then the table should hold 60 samples with UTC timestamps
+
+        Examples:
+            | file_format |
+            | arrow       |
+            | parquet     |
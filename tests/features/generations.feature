@@ -0,0 +1,69 @@
+Feature: Atomic Snapshots
+    As a CI/CD pipeline publishing a system in several requests
+    I want readers to see either the old or the new snapshot of the system
+    So that a dashboard never shows half of a run
+
+    Background:
+        Given the API is running in-process
+
+    @component:vordu-api @phase:1
+    Scenario: Readers see the old matrix until the generation is published
+        Given "atomic" has 4 passing cells
+        When I stage failing cells r0 to r1 in a new generation of "atomic"
+        Then the matrix of "atomic" should still hold 4 passing cells
+        When I stage failing cells r2 to r2 in the same generation
+        Then the matrix of "atomic" should still hold 4 passing cells
+        When I publish the generation
+        Then the publish should report 3 cells
+        And the matrix of "atomic" should hold 3 failing cells
+        And the summary of "atomic" should count 3 cells, 0 passed and 6 steps
+        And 3 cells should be stored
+        And searching "Atomic" should find the rows "r0,r1,r2"
+
+    @component:vordu-api @phase:1
+    Scenario: In-place ingest after a publish updates the live generation
+        Given "atomic" has 2 passing cells ingested atomically
+        When I ingest failing cells r1 to r2 of "atomic" in place
+        Then the matrix of "atomic" should hold "r0:pass,r1:fail,r2:fail"
+        And the summary of "atomic" should count 3 cells
+
+    @component:vordu-api @phase:1
+    Scenario: Atomic ingest publishes each system of the request
+        Given "atomic" has 3 passing cells
+        And "other" has 2 passing cells
+        When I ingest atomically 1 failing cell of "atomic" and 5 passing cells of "other"
+        Then the response status should be 200
+        And the response should list the generations of "atomic,other"
+        And the matrix of "atomic" should hold "r0:fail"
+        And the matrix of "other" should hold 5 passing cells
+        And the summary should count 6 cells
+        And 6 cells should be stored
+
+    @component:vordu-api @phase:1
+    Scenario: Reject writes to the wrong generation
+        Given a new generation of "atomic"
+        When I stage cells of "other" in it
+        Then the response status should be 422
+        When I publish it as a generation of "other"
+        Then the response status should be 409
+        When I stage cells of "atomic" in generation 999999
+        Then the response status should be 409
+        When I publish the generation
+        Then the response status should be 200
+        When I publish the generation
+        Then the response status should be 409
+        When I stage failing cells r0 to r0 in the same generation
+        Then the response status should be 409
+
+    @component:vordu-api @phase:1
+    Scenario: Collect staging abandoned past its time to live
+        Given "atomic" has 2 passing cells ingested atomically
+        And 50 cells staged in a new generation of "atomic"
+        When I collect abandoned generations
+        Then 0 staged cells should have been collected
+        When I collect abandoned generations past their time to live, 7 cells at a time
+        Then 50 staged cells should have been collected
+        And 2 cells should be stored
+        And the matrix of "atomic" should hold "r0:pass,r1:pass"
+        When I publish the generation
+        Then the response status should be 409
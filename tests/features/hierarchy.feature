@@ -0,0 +1,47 @@
+Feature: Row Hierarchy
+    As a Project Manager of a system with nested components
+    I want every row to roll up the cells of its whole subtree
+    So that a parent component shows the progress of its children
+
+    Background:
+        Given the API is running in-process
+        And the system "tree" with the rows "platform", "auth" and "storage" under "platform", and "tokens" under "auth"
+        And the cells of "tree":
+            | row     | phase | status | completion | steps_passed |
+            | auth    | 0     | pass   | 100        | 4            |
+            | tokens  | 0     | fail   | 50         | 2            |
+            | tokens  | 1     | pass   | 100        | 4            |
+            | storage | 0     | fail   | 0          | 0            |
+
+    @component:vordu-api @phase:1
+    Scenario: Roll up the subtree of every row
+        Then the rollups of "tree" should list every row
+        And the rollup of "platform" should count 4 cells, 2 passed, 16 steps and 10 passed steps
+        And the rollup of "platform" should be 62% complete with 3 cells in phase 0 and 1 in phase 1
+        And the rollup of "auth" should count 3 cells, 2 passed and be 83% complete
+        And the rollup of "auth" should be 75% complete in phase 0 and 100% in phase 1
+        When "empty" is added under "storage"
+        Then the rollup of "empty" should be empty
+        And the rollup of "missing" should not be found
+
+    @component:vordu-api @phase:1
+    Scenario: Follow a row moving to another parent
+        Then "tokens" should be 2 levels below "platform"
+        When "tokens" moves under "storage"
+        Then "tokens" should no longer be below "auth"
+        And "tokens" should be 1 level below "storage"
+        And "tokens" should be 2 levels below "platform"
+        And the rollup of "auth" should count 1 cells
+        And the rollup of "storage" should count 3 cells
+
+    @component:vordu-api @phase:1
+    Scenario: Build the hierarchy of existing rows on start-up
+        Given the hierarchy table is emptied
+        When the hierarchy is backfilled
+        Then the hierarchy should be as before
+        And "platform" should have 4 rows in its subtree
+
+    @component:vordu-api @phase:1
+    Scenario: Ignore unknown parents and cycles
+        When the system "cycle" is configured with "a" under "b", "b" under "a" and "c" under "elsewhere"
+        Then the hierarchy of "cycle" should only hold each row, "b" over "a" and "a" over "b"
@@ -0,0 +1,44 @@
+Feature: Vörðu Ingestion Client
+    As a CI/CD pipeline
+    I want to ingest many catalogs from one run of the ingest script
+    So that large monorepos are cheap to publish to the roadmap
+
+    @component:vordu-api @phase:1
+    Scenario: Batch ingest of discovered catalogs
+        Given the API is running
+        And a monorepo with catalogs for "alpha" and "beta"
+        When I run the ingest script with "--discover" on the monorepo
+        Then the ingest script should succeed
+        And the config should contain the systems "alpha" and "beta"
+
+    @component:vordu-api @phase:1
+    Scenario: Replay payloads spooled during an outage
+        Given the API is running
+        And a monorepo with catalogs for "gamma" and "delta"
+        When I run the ingest script against an unreachable API with a spool directory
+        Then the ingest script should succeed
+        When I replay the spool
+        Then the ingest script should succeed
+        And the config should contain the systems "gamma" and "delta"
+        And the spool should be empty
+
+    @component:vordu-api @phase:1
+    Scenario: Replay several spool files in one request
+        Given the API is running
+        And a monorepo with catalogs for "eta" and "theta"
+        When I run the ingest script against an unreachable API once per catalog
+        Then the spool should hold 2 files
+        When I replay the spool
+        Then the ingest script should succeed
+        And the config should contain the systems "eta" and "theta"
+        And the spool should be empty
+
+    @component:vordu-api @phase:1
+    Scenario: Re-aggregate server-side rollups without a new run
+        Given the API is running
+        And a monorepo with catalogs for "epsilon" and "zeta"
+        When I run the ingest script with server-side rollups on the monorepo
+        Then the ingest script should succeed
+        And the matrix for "epsilon" should only have the row "epsilon-core"
+        When I switch "epsilon" to "system" granularity
+        Then the matrix for "epsilon" should only have the row "epsilon"
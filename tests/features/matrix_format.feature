@@ -0,0 +1,25 @@
+Feature: Columnar Matrix
+    As the Vörðu dashboard loading large matrices
+    I want /matrix as one array per column on request
+    So that the payload is smaller and faster to parse than an array of objects
+
+    Background:
+        Given the API is running in-process
+        And 3 systems of 10 rows in 4 phases with every status
+
+    @component:vordu-api @phase:1
+    Scenario: Decode the columnar matrix to the same cells
+        When I request the matrix as columnar JSON
+        Then the response should be columnar JSON of 120 cells
+        And its status dictionary should hold "pass,fail,pending"
+        And it should decode to the cells of the default format
+        And the format parameter should return the same body
+
+    @component:vordu-api @phase:1
+    Scenario: Reject unknown formats and columnar details
+        When I request the matrix in the format "xml"
+        Then the response status should be 400
+        When I request the matrix in the format "columnar" with details
+        Then the response status should be 400
+        When I request the matrix
+        Then the response should vary by Accept
@@ -0,0 +1,34 @@
+Feature: Packaged Ingest Client
+    As a CI/CD pipeline running the ingest script on every build
+    I want it shipped as one archive that starts fast on a bare interpreter
+    So that publishing results adds as little as possible to the build
+
+    Background:
+        Given the ingest script packed into an archive
+
+    @component:vordu-api @phase:1
+    Scenario: Pack the same archive twice
+        When I pack the ingest script again
+        Then both archives should be identical
+
+    @component:vordu-api @phase:1
+    Scenario: Run the precompiled bytecode without compiling the source
+        Given a copy of the archive whose source fails when run
+        When I run the copy with "--help"
+        Then it should print the help of the ingest script
+
+    @component:vordu-api @phase:1
+    Scenario: Import the stages of the ingest script lazily
+        When I import the ingest script from the archive
+        Then none of "yaml,http.client,gzip,concurrent.futures,uuid,ctypes" should have been loaded
+
+    @component:vordu-api @phase:1
+    Scenario: Parse the catalog without the C YAML loader
+        Given the catalog parsed with the C YAML loader
+        When I parse it without the C YAML loader
+        Then both should parse to the same entities
+
+    @component:vordu-api @phase:1
+    Scenario: Parse the catalog with the bundled YAML library
+        When I run the archive on the repository's catalog without site-packages
+        Then it should print the generated config payload
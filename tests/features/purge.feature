@@ -0,0 +1,81 @@
+Feature: Scoped Purges
+    As the operator of a shared Vörðu database
+    I want to delete a system, a domain or stale cells without stopping writes
+    So that retired projects leave the roadmap without a reset
+
+    Background:
+        Given the API is running in-process
+        And the systems "alpha" and "beta" of domain "platform" with 4 cells each
+        And the system "gamma" of domain "payments" with 4 cells
+
+    @component:vordu-data @phase:1
+    Scenario: Purge a system
+        When I purge the system "alpha"
+        Then the response status should be 200
+        And the purge should have deleted 4 cells, 1 systems, 2 rows and 4 timings
+        And no table should hold rows of "alpha"
+        And the matrix should only hold the systems "beta,gamma"
+        And the config should only list the systems "beta,gamma"
+        And the summary should not list "alpha"
+        And searching "alpha" should find nothing
+        When I purge the system "alpha"
+        Then the response status should be 404
+        When I ingest the system "alpha" of domain "platform" again
+        Then the matrix should hold 4 cells of "alpha"
+
+    @component:vordu-data @phase:1
+    Scenario: Purge a domain
+        When I purge the domain "platform"
+        Then the purge should list the systems "alpha,beta"
+        And the purge should have deleted 8 cells
+        And the matrix should only hold the systems "gamma"
+        When I purge the domain "platform"
+        Then the response status should be 404
+
+    @component:vordu-data @phase:1
+    Scenario: Purge cells not written since a point in time
+        Given the time is noted
+        When I ingest the row "auth" of "alpha" again
+        And I purge the cells of "alpha" not written since then
+        Then the purge should have deleted 2 cells and 2 search documents
+        And the matrix should hold the rows "auth" of "alpha"
+        And the summary should count 2 cells of "alpha"
+        When I purge every cell not written since then
+        Then the matrix should only hold the systems "alpha"
+        And the history of "beta" should keep 4 samples
+
+    @component:vordu-data @phase:1
+    Scenario: Keep fresh cells without history
+        Given the history of "alpha" is deleted
+        When I purge every cell not written since 1 days ago
+        Then the purge should have deleted nothing
+        And the matrix should hold 4 cells of "alpha"
+
+    @component:vordu-data @phase:1
+    Scenario: Date cells written before they carried a date by their history
+        Given a database from before cells carried a date
+        And the history of the row "auth" of "alpha" was recorded 10 days ago
+        And the history of the row "billing" of "alpha" is deleted
+        When the API starts
+        Then the cells of "alpha" row "auth" should be dated 10 days ago
+        And the cells of "alpha" row "billing" should be dated today
+        When I purge every cell not written since 5 days ago
+        Then the purge should have deleted 2 cells and 2 search documents
+        And the matrix should hold the rows "billing" of "alpha"
+
+    @component:vordu-data @phase:1
+    Scenario: Purge in batches of their own transaction
+        Given purges of 3 rows a batch
+        When I purge the system "gamma", counting commits
+        Then at least 9 commits should have been made
+        And no table should hold rows of "gamma"
+
+    @component:vordu-data @phase:1
+    Scenario: Reset the database and move caches on
+        Given the matrix is cached
+        When I reset the database
+        Then the response status should be 200
+        And the cache version should have moved on
+        And the matrix should be empty
+        When I ingest the system "alpha" of domain "platform" again
+        Then searching "alpha" should find something
@@ -0,0 +1,57 @@
+Feature: History Retention
+    As the operator of a long-running Vörðu database
+    I want old cell history downsampled and compacted in the background
+    So that trends stay available while the database stays bounded
+
+    Background:
+        Given the API is running in-process
+
+    @component:vordu-data @phase:2
+    Scenario: Downsample history by the retention policy
+        Given 800 days of history with 3 samples a day for 2 cells
+        When I compact the history
+        Then the compaction should be complete
+        And every sample of the last 14 days should be kept
+        And one sample a day should be kept for a year
+        And one sample a week should be kept before that
+        When I compact the history again
+        Then nothing should have been downsampled or deleted
+
+    @component:vordu-data @phase:2
+    Scenario: Stop at the time budget and resume
+        Given 800 days of history with 3 samples a day for 2 cells
+        When I compact the history without a time budget
+        Then the compaction should not be complete
+        And every sample should be kept
+        When I compact the history
+        Then the compaction should be complete
+
+    @component:vordu-data @phase:2
+    Scenario: Drop the details of downsampled samples and reclaim their space
+        Given 800 days of history with 3 samples a day for 2 cells
+        When I compact the history
+        Then only samples of single runs should keep their details
+        And a SQLite database should have no free pages left
+
+    @component:vordu-data @phase:2
+    Scenario: Read the history of a cell
+        When I ingest a passing cell "c0" of "hist"
+        Then the history of "hist" row "c0" should hold one sample of a run in phase 0
+
+    @component:vordu-data @phase:2
+    Scenario: Convert an old SQLite file only on request
+        Given a SQLite file created before incremental vacuum with free pages
+        When I compact its history
+        Then the compaction should ask for a vacuum
+        And the file should keep its free pages
+        When I compact its history with vacuum
+        Then the compaction should not ask for a vacuum
+        And the file should have no free pages left
+
+    @component:vordu-data @phase:2
+    Scenario: One worker holds the compaction lease
+        When "worker-a" takes the lease for 60 seconds
+        Then "worker-b" should not get the lease for 60 seconds
+        When "worker-a" renews the lease, expiring it
+        Then "worker-b" should get the lease for 60 seconds
+        And "worker-a" should not get the lease for 60 seconds
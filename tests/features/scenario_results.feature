@@ -0,0 +1,25 @@
+Feature: Scenario Results
+    As the Vörðu API rolling up the scenarios of a system
+    I want a scenario identified within its component
+    So that components reporting the same scenario name are all counted
+
+    Background:
+        Given the API is running in-process
+        And the system "shared" of the components "a" and "b" in one row
+        And the scenario "Login" passing in "a" and failing in "b"
+
+    @component:vordu-api @phase:1
+    Scenario: Count a scenario name reported by two components
+        When the scenarios are rolled up by the API
+        Then the API should hold 2 results of "Login"
+        And the cell of "shared" should count 2 scenarios, 1 passed
+        When the scenarios are rolled up by the API again
+        Then the API should hold 2 results of "Login"
+        And the cell of "shared" should count 2 scenarios, 1 passed
+
+    @component:vordu-data @phase:1
+    Scenario: Roll up like the ingest script does
+        When the scenarios are rolled up by the ingest script
+        Then its cell of "shared" should count 2 scenarios, 1 passed
+        When the scenarios are rolled up by the API
+        Then the cell of "shared" should be the one of the ingest script
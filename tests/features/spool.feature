@@ -0,0 +1,47 @@
+Feature: Spool Replay
+    As a CI/CD pipeline that ran while the API was down
+    I want spooled payloads replayed in requests the API accepts
+    So that no result is lost or imported twice
+
+    Background:
+        Given the API is running in-process
+        And a replay batch of 4000 bytes
+
+    @component:vordu-api @phase:1
+    Scenario: Replay batches stay under the inflated body limit
+        Given the API accepts bodies of one replay batch
+        And spooled runs of 20 components for "alpha,beta,gamma"
+        When I replay the spool in-process
+        Then the replay should succeed
+        And the spool directory should be empty
+        And every replay request should inflate to one batch at most
+        And the matrix should hold 240 cells
+
+    @component:vordu-api @phase:1
+    Scenario: Split an oversized scenario record into one run
+        Given a spooled scenario record of 100 scenarios
+        When I split it into replay batches
+        Then every part should fit one batch
+        And the parts should share one run, only the last complete
+        And the parts should hold every scenario in order
+        And a record of 1 scenario should be left as it is
+
+    @component:vordu-api @phase:1
+    Scenario: Resume a failed replay where it stopped
+        Given spooled runs of 20 components for "alpha,beta"
+        When I replay the spool in-process, failing the third request
+        Then the replay should fail
+        And the spool directory should hold 2 files
+        When I replay the spool in-process
+        Then the replay should succeed
+        And the spool directory should be empty
+        And every spooled record should have been imported once
+        And the matrix should hold 160 cells
+
+    @component:vordu-api @phase:1
+    Scenario: Import spool files with the importer CLI
+        Given spooled runs of 1 components for "alpha"
+        And a spooled scenario run of "beta"
+        When I import the spool with the importer CLI
+        Then the importer should report 3 records, 1 configs and 1 scenarios
+        And the matrix should have cells of "alpha" and "beta"
@@ -0,0 +1,15 @@
+Feature: API Start-up
+    As the operator of an API served by several workers
+    I want the tables derived from the cells rebuilt once on start-up
+    So that an upgrade neither leaves them empty nor duplicates their rows
+
+    Background:
+        Given the API is running in-process
+
+    @component:vordu-api @phase:1
+    Scenario: Backfill the derived tables once across workers
+        Given the system "alpha" with "auth" under "platform" and 2 cells of "auth" with details
+        And the summaries, search documents and row hierarchy are emptied
+        When 4 workers import the API at the same time
+        Then every worker should have started
+        And the summaries, search documents and row hierarchy should be as before
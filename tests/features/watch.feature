@@ -0,0 +1,58 @@
+Feature: Watch Mode
+    As a developer running the ingest script next to my editor
+    I want the roadmap to follow my feature files as I save them
+    So that I see the effect of a change without a CI run
+
+    Background:
+        Given a watched catalog "watched" with the components "auth" of "Login,Logout" and "billing" of "Pay"
+
+    @component:vordu-api @phase:1
+    Scenario: Push only the cells that changed
+        When I push the catalog
+        Then 8 items should have been pushed to "/config/ingest,/ingest"
+        When I push the catalog
+        Then nothing should have been pushed
+        When the feature of "auth" gains the scenario "Reset password"
+        And I push the catalog
+        Then 1 items should have been pushed to "/ingest"
+        And the cell of "watched-auth" in phase 0 should have been pushed with 3 scenarios
+        When "Pay" of "billing" passes
+        And I push the catalog
+        Then 1 items should have been pushed to "/ingest"
+        And the cell of "watched-billing" in phase 0 should have been pushed as "pass"
+
+    @component:vordu-api @phase:1
+    Scenario: Retry a failed push with the next change
+        Given the API refuses every push
+        When I push the catalog
+        Then the push should have failed
+        Given the API accepts every push
+        When I push the catalog
+        Then 8 items should have been pushed to "/config/ingest,/ingest"
+
+    @component:vordu-api @phase:1
+    Scenario: Push scenario results with server-side rollups
+        Given server-side rollups
+        When I push the catalog
+        Then 3 items should have been pushed to "/ingest/scenarios"
+        When "Login" of "auth" passes
+        And I push the catalog
+        Then 1 items should have been pushed to "/ingest/scenarios"
+        And the scenarios "Login" should have been pushed as an incomplete run
+        When the feature of "auth" only keeps the scenario "Login"
+        And I push the catalog
+        Then 2 items should have been pushed to "/ingest/scenarios"
+        And the scenarios "Login,Pay" should have been pushed as a complete run
+
+    @component:vordu-api @phase:1
+    Scenario Outline: Report changed files with the <kind> watcher
+        Given a <kind> watcher on the catalog
+        When the feature of "auth" is appended to
+        Then the watcher should report the feature of "auth"
+        When the component "search" is added with its feature
+        Then the watcher should report the feature of "search"
+
+        Examples:
+            | kind    |
+            | polling |
+            | inotify |
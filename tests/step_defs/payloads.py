@@ -0,0 +1,46 @@
+"""Payload builders shared by the step definitions of the in-process scenarios."""
+
+HEADERS = {"X-API-Key": "dev-key"}
+
+def status_item(project, row, phase=0, status="pass", details=(), **fields):
+    """One /ingest item, fully passing unless fields say otherwise."""
+    passed = status == "pass"
+    return {
+        "project_name": project, "row_id": row, "phase_id": phase, "status": status, "completion": 100 if passed else 0,
+        "scenarios_total": 1, "scenarios_passed": int(passed), "steps_total": 1, "steps_passed": int(passed),
+        "details": list(details), **fields,
+    }
+
+def system_config(name, rows, domain="test", parents=None):
+    """/config/ingest payload of a system with one component per row, parents is {row: parent row}."""
+    return {
+        "system": {"name": name, "label": name.capitalize(), "domain": domain},
+        "components": [
+            {"name": row, "label": row.capitalize(), "system": name, "parent": (parents or {}).get(row)} for row in rows
+        ],
+    }
+
+def matrix(client, project):
+    """{(row, phase): cell} of project's cells in /matrix."""
+    return {(c["row"], c["phase"]): c for c in client.get("/matrix").json() if c["project"] == project}
+
+def count_rows(model, *criteria):
+    from sqlalchemy import func, select
+    from api.models import SessionLocal
+    with SessionLocal() as db:
+        return db.execute(select(func.count()).select_from(model).where(*criteria)).scalar()
+
+def system_entity(name, domain="test", annotations=None):
+    """A Backstage System of catalog-info.yaml."""
+    return {"apiVersion": "backstage.io/v1alpha1", "kind": "System",
+            "metadata": {"name": name, **({"annotations": annotations} if annotations else {})}, "spec": {"domain": domain}}
+
+def component_entity(name, system, annotations=None):
+    """A Backstage Component of catalog-info.yaml, part of system."""
+    return {"apiVersion": "backstage.io/v1alpha1", "kind": "Component",
+            "metadata": {"name": name, **({"annotations": annotations} if annotations else {})}, "spec": {"partOf": system}}
+
+def catalog_yaml(*entities):
+    """catalog-info.yaml of entities, one document each."""
+    import yaml
+    return yaml.safe_dump_all(entities, sort_keys=False)
@@ -0,0 +1,173 @@
+import gzip
+import json
+
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+
+from payloads import HEADERS, status_item, system_config
+
+scenarios('../features/admission.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+GZIP_HEADERS = {**HEADERS, "Content-Encoding": "gzip"}
+
+def status_payload(items):
+    return [status_item("admission", f"r{i}") for i in range(items)]
+
+def rejections():
+    """{(reason, key): requests rejected} over every route."""
+    from api import metrics
+    counts = {}
+    for metric in metrics.ADMISSION_REJECTED.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_total"):
+                key = (sample.labels["reason"], sample.labels["key"])
+                counts[key] = counts.get(key, 0) + sample.value
+    return counts
+
+def rejected(counts, reason, key=None):
+    return sum(value for (r, k), value in counts.items() if r == reason and key in (None, k))
+
+@pytest.fixture
+def upload():
+    """The gzip body of the import scenario, shared between its steps."""
+    return {}
+
+@given('no key has used its rate limit yet', target_fixture="rejected_before")
+def fresh_buckets(monkeypatch):
+    from api import admission
+    monkeypatch.setattr(admission, "buckets", {})
+    return rejections()
+
+@given(parsers.parse('writes accept at most {count:d} items'))
+def item_cap(monkeypatch, count):
+    from api import admission
+    monkeypatch.setattr(admission, "MAX_ITEMS", count)
+
+@given(parsers.parse('writes accept bodies of at most {size:d} bytes'))
+def body_cap(monkeypatch, size):
+    from api import admission
+    monkeypatch.setattr(admission, "MAX_BODY_BYTES", size)
+
+@given(parsers.parse('the API keys "{keys}" with {burst:d} writes of burst and {rate:g} per second'))
+def api_keys(monkeypatch, keys, burst, rate):
+    from api import admission
+    monkeypatch.setenv("VORDU_API_KEYS", keys)
+    monkeypatch.setattr(admission, "RATE", rate)
+    monkeypatch.setattr(admission, "BURST", burst)
+
+@given('a write gate with 1 slot and 1 waiting place, both taken', target_fixture="gate")
+def full_gate(monkeypatch):
+    from api import admission
+    gate = admission.WriteGate(1, 1, 0.05)
+    gate.admitted = gate.capacity # One write running, one waiting
+    monkeypatch.setattr(admission, "gate", gate)
+    return gate
+
+@given('a write gate without free slots')
+def closed_gate(monkeypatch):
+    from api import admission
+    # No slot at all, a request waits out the queue timeout
+    monkeypatch.setattr(admission, "gate", admission.WriteGate(0, 1, 0.05))
+
+@when(parsers.parse('I ingest {count:d} status items'), target_fixture="response")
+def ingest_items(client, count):
+    return client.post("/ingest", json=status_payload(count), headers=HEADERS)
+
+@when(parsers.parse('I ingest {count:d} status items as plain JSON'), target_fixture="response")
+def ingest_plain(client, count):
+    return client.post("/ingest", content=json.dumps(status_payload(count)).encode(), headers=HEADERS)
+
+@when(parsers.parse('I ingest {count:d} status items gzip-compressed below the limit'), target_fixture="response")
+def ingest_gzip_below_limit(client, count):
+    from api import admission
+    body = json.dumps(status_payload(count)).encode()
+    # Only the inflated body is over the limit
+    assert len(gzip.compress(body)) < admission.MAX_BODY_BYTES < len(body)
+    return client.post("/ingest", content=gzip.compress(body), headers=GZIP_HEADERS)
+
+@when(parsers.parse('I ingest {count:d} status items gzip-compressed'), target_fixture="response")
+def ingest_gzip(client, count):
+    return client.post("/ingest", content=gzip.compress(json.dumps(status_payload(count)).encode()), headers=GZIP_HEADERS)
+
+@when(parsers.parse('the key "{key}" ingests {count:d} status items as plain JSON'), target_fixture="response")
+def ingest_plain_with_key(client, key, count):
+    return client.post("/ingest", content=json.dumps(status_payload(count)).encode(), headers={"X-API-Key": key})
+
+@when(parsers.parse('the key "{key}" purges the cells not written since {since}'), target_fixture="response")
+def purge_cells_with_key(client, key, since):
+    return client.delete("/admin/cells", params={"older_than": since}, headers={"X-API-Key": key})
+
+@when(parsers.parse('the key "{key}" purges the system "{name}"'), target_fixture="response")
+def purge_system_with_key(client, key, name):
+    return client.delete(f"/admin/systems/{name}", headers={"X-API-Key": key})
+
+@when(parsers.parse('the key "{key}" purges the domain "{domain}"'), target_fixture="response")
+def purge_domain_with_key(client, key, domain):
+    return client.delete(f"/admin/domains/{domain}", headers={"X-API-Key": key})
+
+@when(parsers.parse('the key "{key}" ingests {times:d} times'), target_fixture="response")
+def ingest_with_key(client, key, times):
+    for _ in range(times):
+        response = client.post("/ingest", json=status_payload(1), headers={"X-API-Key": key})
+    return response
+
+@when('the write gate frees up')
+def free_gate(gate):
+    gate.admitted = 0
+
+@when(parsers.parse('I import {count:d} configs gzip-compressed one member each'), target_fixture="response")
+def import_members(client, upload, count):
+    # Replay sends several spool files in one body, each its own gzip member
+    names = ("first", "second", "third", "fourth")[:count]
+    upload["records"] = [
+        json.dumps({"endpoint": "/config/ingest", "payload": system_config(name, ("core",))}) + "\n" for name in names
+    ]
+    upload["body"] = b"".join(gzip.compress(record.encode()) for record in upload["records"])
+    return client.post("/admin/import", content=upload["body"], headers=GZIP_HEADERS)
+
+@when('I import them truncated', target_fixture="response")
+def import_truncated(client, upload):
+    return client.post("/admin/import", content=upload["body"][:-5], headers=GZIP_HEADERS)
+
+@when('I import them followed by garbage', target_fixture="response")
+def import_with_garbage(client, upload):
+    return client.post("/admin/import", content=upload["body"] + b"garbage", headers=GZIP_HEADERS)
+
+@when('the body limit is one byte less than the inflated members')
+def limit_below_members(monkeypatch, upload):
+    from api import admission
+    monkeypatch.setattr(admission, "MAX_BODY_BYTES", len("".join(upload["records"])) - 1)
+    # Each member, and the compressed body, is well within it
+    assert len(upload["body"]) < admission.MAX_BODY_BYTES
+
+@when(parsers.parse('I import the {count:d} configs again'), target_fixture="response")
+def import_again(client, upload, count):
+    assert len(upload["records"]) == count
+    return client.post("/admin/import", content=upload["body"], headers=GZIP_HEADERS)
+
+@then(parsers.parse('{count:d} request should have been rejected for "{reason}"'))
+def rejected_for(rejected_before, count, reason):
+    assert rejected(rejections(), reason) == rejected(rejected_before, reason) + count
+
+@then(parsers.parse('{count:d} requests of the key "{key}" should have been rejected for "{reason}"'))
+def rejected_for_key(rejected_before, count, key, reason):
+    assert rejected(rejections(), reason, key) == rejected(rejected_before, reason, key) + count
+
+@then(parsers.parse('the response should ask to retry within {seconds:d} seconds'))
+def retry_after(response, seconds):
+    assert 1 <= int(response.headers["Retry-After"]) <= seconds
+
+@then('no write should hold the gate')
+def gate_released():
+    from api import admission
+    assert admission.gate.admitted == 0
+
+@then(parsers.parse('the import should count {count:d} records'))
+def import_counts(response, count):
+    assert response.json()["records"] == count
+
+@then(parsers.parse('the config should list the systems "{names}"'))
+def config_lists(client, names):
+    assert {p["id"] for p in client.get("/config").json()} == set(names.split(","))
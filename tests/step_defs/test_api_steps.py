@@ -1,18 +1,28 @@
+import gzip
+import json
 import pytest
 import requests
-from pytest_bdd import scenario, given, when, then
+from pytest_bdd import scenario, when, then, parsers
 
 @scenario('../features/api.feature', 'Ingest Cucumber JSON')
 def test_ingest_cucumber_json():
     pass
 
-@given('the API is running')
-def api_running(api_base_url):
-    try:
-        response = requests.get(f"{api_base_url}/docs")
-        assert response.status_code == 200
-    except requests.exceptions.ConnectionError:
-        pytest.fail("API is not running")
+@scenario('../features/api.feature', 'Ingest a gzip-compressed payload')
+def test_ingest_gzip_payload():
+    pass
+
+@scenario('../features/api.feature', 'Expose Prometheus metrics')
+def test_expose_metrics():
+    pass
+
+@scenario('../features/api.feature', 'Summarize portfolio progress')
+def test_summarize_progress():
+    pass
+
+@scenario('../features/api.feature', 'Search scenarios and steps')
+def test_search_scenarios():
+    pass
 
 @when('I POST a Cucumber JSON report to "/ingest"')
 def post_cucumber_report(api_base_url):
@@ -36,6 +46,51 @@ def post_cucumber_report(api_base_url):
     except requests.exceptions.ConnectionError:
         pytest.fail("Failed to connect to API")
 
+@when(parsers.parse('I GET "{path}"'))
+def get_path(api_base_url, path):
+    try:
+        pytest.response = requests.get(f"{api_base_url}{path}")
+    except requests.exceptions.ConnectionError:
+        pytest.fail("Failed to connect to API")
+
+@then(parsers.parse('the metrics should include "{name}"'))
+def metrics_include(name):
+    assert name in pytest.response.text
+
+@then(parsers.parse('the summary for "{system}" should count {passed:d} of {total:d} scenarios in phase {phase:d}'))
+def summary_counts(system, passed, total, phase):
+    # Re-ingesting the same cell must not count it twice
+    summary = pytest.response.json()
+    project = next(s for s in summary["systems"] if s["name"] == system)
+    totals = next(p for p in project["phases"] if p["phase"] == phase)
+    assert (totals["scenarios_passed"], totals["scenarios_total"], totals["cells"]) == (passed, total, 1)
+
+@when('I POST a gzip-compressed status payload to "/ingest"')
+def post_gzip_payload(api_base_url):
+    payload = [
+        {
+            "project_name": "vordu-test",
+            "row_id": "api-test",
+            "phase_id": 1,
+            "status": "pass",
+            "completion": 100,
+            "scenarios_total": 1,
+            "scenarios_passed": 1,
+            "steps_total": 4,
+            "steps_passed": 4
+        }
+    ]
+    headers = {
+        "X-API-Key": "dev-key",
+        "Content-Type": "application/json",
+        "Content-Encoding": "gzip"
+    }
+    try:
+        response = requests.post(f"{api_base_url}/ingest", data=gzip.compress(json.dumps(payload).encode("utf-8")), headers=headers)
+        pytest.response = response
+    except requests.exceptions.ConnectionError:
+        pytest.fail("Failed to connect to API")
+
 @then('the response status should be 200')
 def response_status_200():
     assert hasattr(pytest, 'response'), "No response captured"
@@ -56,3 +111,39 @@ def database_contains_results(api_base_url):
         for item in data
     )
     assert found, "Ingested item not found in matrix"
+
+@when('I POST a status payload with scenario details to "/ingest"')
+def post_detailed_payload(api_base_url):
+    payload = [
+        {
+            "project_name": "vordu-test",
+            "row_id": "api-search",
+            "phase_id": 1,
+            "status": "pass",
+            "completion": 100,
+            "scenarios_total": 1,
+            "scenarios_passed": 1,
+            "steps_total": 2,
+            "steps_passed": 2,
+            "details": [
+                {
+                    "feature": "Search",
+                    "scenario": "Find a scenario by its steps",
+                    "status": "passed",
+                    "tag": "@vordu:phase=1",
+                    "steps": [
+                        {"keyword": "Given", "name": "a lighthouse", "status": "passed"},
+                        {"keyword": "Then", "name": "the beacon is lit", "status": "passed"},
+                    ],
+                }
+            ],
+        }
+    ]
+    pytest.response = requests.post(f"{api_base_url}/ingest", json=payload, headers={"X-API-Key": "dev-key"})
+    assert pytest.response.status_code == 200
+
+@then(parsers.parse('the first search hit should be row "{row}" in phase {phase:d}'))
+def first_search_hit(row, phase):
+    hits = pytest.response.json()["hits"]
+    assert hits, "no search hits"
+    assert (hits[0]["row"], hits[0]["phase"]) == (row, phase)
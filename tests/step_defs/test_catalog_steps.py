@@ -0,0 +1,174 @@
+import json
+import sys
+
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+
+import vordu_ingest
+
+from payloads import HEADERS, catalog_yaml, component_entity, system_entity
+
+scenarios('../features/catalog.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+def write_repo(tmp_path, name, entities, features):
+    """A repository with catalog-info.yaml and a feature file per {component: phase}."""
+    (tmp_path / name / "features").mkdir(parents=True)
+    (tmp_path / name / "catalog-info.yaml").write_text(catalog_yaml(*entities))
+    for component, phase in features.items():
+        (tmp_path / name / "features" / f"{component}.feature").write_text(
+            f"Feature: {component}\n  @component:{component} @phase:{phase}\n  Scenario: Works\n    Given it works\n")
+    return str(tmp_path / name / "catalog-info.yaml")
+
+@pytest.fixture
+def repos():
+    """Catalog paths of the scenario's repositories, in order."""
+    return []
+
+@pytest.fixture
+def indexed():
+    """The latest index, with the systems of the first one."""
+    return {}
+
+@given('a "platform" repository declaring the systems "storage" and "network" with a component each')
+def platform_repo(tmp_path, repos):
+    repos.append(write_repo(tmp_path, "platform", [
+        system_entity("storage", "platform", {"vordu.io/granularity": "subcomponent"}),
+        system_entity("network", "platform"),
+        component_entity("storage-blobs", "storage"),
+        component_entity("network-dns", "network"),
+    ], {"network-dns": 0}))
+
+@given('a "service" repository adding "storage-cache" to "storage" and "billing-api" to an unknown "billing"')
+def service_repo(tmp_path, repos):
+    repos.append(write_repo(tmp_path, "service", [
+        component_entity("storage-cache", "storage", {"vordu.io/row-label": "Cache"}),
+        component_entity("billing-api", "billing"),
+    ], {"storage-cache": 1}))
+
+@given(parsers.parse('a catalog with the system "{system}" and the component "{component}" without a system'),
+       target_fixture="entities")
+def catalog_without_partof(system, component):
+    return [{"kind": "System", "metadata": {"name": system}, "spec": {}},
+            {"kind": "Component", "metadata": {"name": component}, "spec": {}}]
+
+@when('I index both catalogs')
+def index(repos, indexed, capsys):
+    indexed["index"] = vordu_ingest.index_catalogs(repos)
+    # Components of no System of the run are reported when the systems are built
+    indexed["systems"] = indexed["index"].systems()
+    indexed["output"] = capsys.readouterr().out
+
+@when('I index both catalogs with a cache')
+@when('I index both catalogs with the cache')
+def index_cached(tmp_path, repos, indexed):
+    indexed["index"] = vordu_ingest.index_catalogs(repos, cache_path=str(tmp_path / "cache" / "catalogs.json"))
+    indexed.setdefault("systems", indexed["index"].systems())
+
+@when('I index both catalogs with the cache, without parsing YAML')
+def index_cached_without_yaml(tmp_path, repos, indexed, monkeypatch):
+    # A hit neither parses YAML nor imports yaml
+    monkeypatch.setattr(vordu_ingest, "parse_catalog_content", lambda *args: pytest.fail("parsed again"))
+    monkeypatch.delitem(sys.modules, "yaml", raising=False)
+    index_cached(tmp_path, repos, indexed)
+    indexed["yaml_imported"] = "yaml" in sys.modules
+    monkeypatch.undo()
+
+@when(parsers.parse('the "{repo}" catalog gains "{component}"'))
+def catalog_gains(tmp_path, repo, component):
+    with open(tmp_path / repo / "catalog-info.yaml", "a") as f:
+        f.write("---\n" + catalog_yaml(component_entity(component, "storage")))
+
+@when('I extract its metadata', target_fixture="vordu_data")
+def extract(entities):
+    return vordu_ingest.extract_vordu_metadata(entities)
+
+@when('I run the ingest script on both catalogs', target_fixture="output")
+def run_cli(repos, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["vordu_ingest.py", *repos])
+    vordu_ingest.main()
+    return capsys.readouterr().out
+
+@when('I ingest the documents of both catalogs as config', target_fixture="response")
+def ingest_documents(client, repos):
+    import yaml
+    documents = []
+    for path in repos:
+        with open(path) as f:
+            documents += yaml.safe_load_all(f)
+    return client.post("/config/ingest", json={"documents": documents}, headers=HEADERS)
+
+@when('I ingest a system document without a name as config', target_fixture="response")
+def ingest_nameless(client):
+    return client.post("/config/ingest", json={"documents": [{"kind": "System", "metadata": {}}]}, headers=HEADERS)
+
+@then(parsers.parse('the index should list the systems "{systems}"'))
+def lists_systems(indexed, systems):
+    assert list(indexed["index"].systems()) == systems.split(",")
+
+@then(parsers.parse('"{system}" should have the components "{components}"'))
+def has_components(indexed, system, components):
+    assert [c["name"] for c in indexed["index"].systems()[system]["components"]] == components.split(",")
+
+@then(parsers.parse('the index should have reported "{component}" as part of no system'))
+def reported_orphan(indexed, component):
+    assert component in indexed["output"]
+
+@then(parsers.parse('"{system}" should scan the features of both repositories'))
+def scans_both(indexed, system):
+    # Features are scanned below every catalog contributing to a System
+    assert len(indexed["index"].roots(system)) == 2
+
+@then(parsers.parse('"{system}" should scan the features of the "{repo}" repository'))
+def scans_one(indexed, tmp_path, system, repo):
+    assert indexed["index"].roots(system) == [str(tmp_path / repo)]
+
+@then(parsers.parse('"{system}" should have scenarios in "{component}" phase {phase:d} only'))
+def scenarios_in(indexed, system, component, phase):
+    _, items = vordu_ingest.process_system(indexed["index"], system, [])
+    assert {(i["row_id"], i["phase_id"]) for i in items if i["scenarios_total"]} == {(component, phase)}
+
+@then(parsers.parse('the system should be "{system}"'))
+def system_is(vordu_data, system):
+    assert vordu_data["system"]["name"] == system
+
+@then(parsers.parse('"{component}" should be part of "{system}"'))
+def part_of(vordu_data, component, system):
+    [found] = [c for c in vordu_data["components"] if c["name"] == component]
+    assert found["system"] == system
+
+@then(parsers.parse('{count:d} catalogs should have come from the cache'))
+def cache_hits(indexed, count):
+    assert indexed["index"].hits == count
+
+@then(parsers.parse('the cache should hold {count:d} catalogs'))
+def cache_holds(tmp_path, count):
+    # Changed content is a miss, the cache keeps the old entry behind the new one
+    with open(tmp_path / "cache" / "catalogs.json") as f:
+        assert len(json.load(f)) == count
+
+@then('the index should list the same systems as before')
+def same_systems(indexed):
+    assert indexed["index"].systems() == indexed["systems"]
+
+@then('YAML should not have been imported')
+def yaml_not_imported(indexed):
+    assert not indexed["yaml_imported"]
+
+@then(parsers.parse('the last component of "{system}" should be "{component}"'))
+def last_component(indexed, system, component):
+    assert indexed["index"].systems()[system]["components"][-1]["name"] == component
+
+@then(parsers.parse('the ingest script should generate the config of "{system}"'))
+def generated_config(output, system):
+    assert f"[Generated Config Payload: {system}]" in output
+
+@then(parsers.parse('the response should list the systems "{systems}" and skip "{skipped}"'))
+def config_response(response, systems, skipped):
+    assert response.json() == {"status": "config_updated", "systems": systems.split(","), "skipped": skipped.split(",")}
+
+@then(parsers.parse('the config of "{system}" should have the rows "{rows}"'))
+def config_rows(client, system, rows):
+    config = {p["id"]: p for p in client.get("/config").json()}
+    assert {r["id"] for r in config[system]["rows"]} == set(rows.split(","))
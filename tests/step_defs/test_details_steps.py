@@ -0,0 +1,178 @@
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+
+from payloads import HEADERS, status_item
+
+scenarios('../features/details.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+def cell(row, phase, scenarios=("Login",)):
+    return status_item("wall", row, phase, scenarios_total=len(scenarios), scenarios_passed=len(scenarios),
+                       details=[{"feature": "Access", "scenario": s, "status": "passed", "steps": []} for s in scenarios])
+
+def cache_requests(result):
+    from api import metrics
+    return metrics.CACHE_REQUESTS.labels("details", result)._value.get()
+
+def details(client, row, phase):
+    return client.get(f"/matrix/wall/{row}/{phase}/details")
+
+@pytest.fixture
+def cached():
+    """The cells of the scenario, the details cache and its request counts before the checked reads."""
+    return {}
+
+def count_from_here(cached):
+    cached.setdefault("before", {result: cache_requests(result) for result in ("miss", "hit")})
+
+@given(parsers.parse('the cells of "{project}":'))
+def cells_of(client, cached, project, datatable):
+    header, *rows = datatable
+    cached["cells"] = [cell(row["row"], int(row["phase"]), row["scenarios"].split(","))
+                       for row in (dict(zip(header, values)) for values in rows)]
+    assert client.post("/ingest", json=cached["cells"], headers=HEADERS).status_code == 200
+
+@given(parsers.parse('"{row}" phase {phase:d} was opened'))
+def opened(client, cached, row, phase):
+    details(client, row, phase)
+    count_from_here(cached)
+
+@given(parsers.parse('"{row}" phase {phase:d} and "{other}" phase {other_phase:d} were opened'))
+def both_opened(client, cached, row, phase, other, other_phase):
+    details(client, row, phase)
+    opened(client, cached, other, other_phase)
+
+@given(parsers.parse('the matrix holds {count:d} cells of "{project}"'))
+def matrix_cached(client, count, project):
+    # Cached until the next write
+    assert len([c for c in client.get("/matrix").json() if c["project"] == project]) == count
+
+@given(parsers.parse('a details cache of {size:d} bytes'), target_fixture="cache")
+def details_cache(size):
+    from api import details
+    return details.DetailsCache("test_details", size)
+
+@when(parsers.parse('I open "{row}" phase {phase:d} {times:d} times'))
+def open_times(client, cached, row, phase, times):
+    count_from_here(cached)
+    for _ in range(times):
+        assert details(client, row, phase).json()[0]["scenario"] == "Login"
+
+@when(parsers.parse('I open "{row}" phase {phase:d}'))
+def open_once(client, row, phase):
+    details(client, row, phase)
+
+@when('the same cells are ingested again')
+def ingest_again(client, cached):
+    # An unchanged write keeps the revision
+    assert client.post("/ingest", json=cached["cells"], headers=HEADERS).status_code == 200
+
+@when(parsers.parse('"{row}" phase {phase:d} is ingested with "{scenarios}"'))
+def ingest_with(client, row, phase, scenarios):
+    assert client.post("/ingest", json=[cell(row, phase, scenarios.split(","))], headers=HEADERS).status_code == 200
+
+@when(parsers.parse('"{row}" phase {phase:d} is ingested atomically with "{scenarios}"'))
+def ingest_atomically_with(client, row, phase, scenarios):
+    response = client.post("/ingest", params={"atomic": True}, json=[cell(row, phase, scenarios.split(","))],
+                           headers=HEADERS)
+    assert response.status_code == 200
+
+@when(parsers.parse('another worker changes the details of "{row}" phase {phase:d} to "{scenario}"'))
+def changed_elsewhere(row, phase, scenario):
+    # Written behind this worker's back, only the revision tells
+    from api.models import MatrixCell, SessionLocal
+    with SessionLocal() as db:
+        db.query(MatrixCell).filter_by(project_name="wall", row_id=row, phase_id=phase).update(
+            {"details": [{"feature": "F", "scenario": scenario, "status": "passed"}]})
+        db.commit()
+
+@when(parsers.parse('another worker adds a cell of "{project}"'))
+def added_elsewhere(project):
+    # A write committed by another worker process only shows up through data_version
+    from api.models import MatrixCell, SessionLocal
+    with SessionLocal() as db:
+        db.add(MatrixCell(project_name=project, row_id="r", phase_id=0, status="pass", completion=100))
+        db.commit()
+
+@when(parsers.parse('{count:d} cells of {size:d} bytes are cached'))
+def fill_cache(cache, cached, count, size):
+    cached["sizes"] = []
+    for cell_id in range(count):
+        cache.put(cell_id, "r", b"x" * size)
+        cached["sizes"].append(cache.size)
+
+@when(parsers.parse('the {read:d}th cell is read and an {put:d}th cached'))
+def read_and_put(cache, read, put):
+    # Least recently used go first, reads count as use
+    assert cache.get(read - 1, "r") is not None
+    cache.put(put - 1, "r", b"x" * 600)
+
+@when(parsers.parse('a cell of {size:d} bytes is cached'))
+def put_large(cache, cached, size):
+    # A cell id after the ones cached so far
+    cached["large"] = len(cached["sizes"]) + 1
+    cache.put(cached["large"], "r", b"x" * size)
+
+@then('the matrix should not ship details')
+def matrix_without_details(client):
+    assert all("details" not in c for c in client.get("/matrix").json())
+
+@then(parsers.parse('the matrix with details should list "{scenario}" in "{row}" phase {phase:d}'))
+def matrix_with_details(client, scenario, row, phase):
+    full = {(c["row"], c["phase"]): c["details"] for c in client.get("/matrix", params={"details": True}).json()}
+    assert full[(row, phase)][0]["scenario"] == scenario
+
+@then(parsers.parse('the details of "{row}" phase {phase:d} should be those of the matrix'))
+def details_match_matrix(client, row, phase):
+    full = {(c["row"], c["phase"]): c["details"] for c in client.get("/matrix", params={"details": True}).json()}
+    assert details(client, row, phase).json() == full[(row, phase)]
+
+@then(parsers.parse('the details of "{row}" phase {phase:d} should not be found'))
+def details_not_found(client, row, phase):
+    assert details(client, row, phase).status_code == 404
+
+@then(parsers.parse('the details of "{row}" phase {phase:d} should list "{scenarios}"'))
+def details_list(client, row, phase, scenarios):
+    assert [d["scenario"] for d in details(client, row, phase).json()] == scenarios.split(",")
+
+@then(parsers.parse('the details cache should have missed {misses:d} times and hit {hits:d} times'))
+def missed_and_hit(cached, misses, hits):
+    assert (cache_requests("miss") - cached["before"]["miss"], cache_requests("hit") - cached["before"]["hit"]) == (
+        misses, hits)
+
+@then(parsers.parse('the details cache should have missed {misses:d} times'))
+def missed(cached, misses):
+    assert cache_requests("miss") - cached["before"]["miss"] == misses
+
+@then(parsers.parse('the matrix should hold {count:d} cells'))
+def matrix_holds(client, count):
+    assert len(client.get("/matrix").json()) == count
+
+@then('the cache should never have grown over its budget')
+def within_budget(cache, cached):
+    assert max(cached["sizes"]) <= cache.max_bytes
+
+@then(parsers.parse('the {kept:d}th cell should still be cached and the {evicted:d}th not'))
+def kept_and_evicted(cache, kept, evicted):
+    assert cache.get(kept - 1, "r") is not None and cache.get(evicted - 1, "r") is None
+
+@then(parsers.parse('{count:d} cells should have been evicted for size'))
+def evicted(count):
+    from api import metrics
+    assert metrics.CACHE_EVICTIONS.labels("test_details", "size")._value.get() == count
+
+@then(parsers.parse('the {nth:d}th cell should not be found under another revision, nor after it'))
+def new_revision_drops(cache, nth):
+    # A new revision drops the entry
+    assert cache.get(nth - 1, "other") is None and cache.get(nth - 1, "r") is None
+
+@then('it should not be cached')
+def not_cached(cache, cached):
+    # Bodies over a quarter of the budget are never kept
+    assert cache.get(cached["large"], "r") is None
+
+@then('the size metric should match the cache')
+def size_metric(cache):
+    from api import metrics
+    assert metrics.CACHE_BYTES.labels("test_details")._value.get() == cache.size
@@ -0,0 +1,235 @@
+import json
+from datetime import timedelta
+
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+
+from payloads import HEADERS, status_item
+
+scenarios('../features/durations.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+def scenario_detail(feature, scenario, step_ms):
+    return {
+        "feature": feature, "scenario": scenario, "status": "passed",
+        "duration_ms": sum(step_ms),
+        "steps": [{"keyword": "Given ", "name": f"step {n}", "status": "passed", "duration_ms": ms}
+                  for n, ms in enumerate(step_ms)],
+    }
+
+def cell(project, row, phase, details):
+    return status_item(project, row, phase, details=details, scenarios_total=len(details),
+                       scenarios_passed=len(details), steps_total=2, steps_passed=2)
+
+def run(client, project, scale=1.0, run_id=None):
+    """One CI run: a slow login scenario, a fast logout and a phase 1 export."""
+    items = [
+        cell(project, "auth", 0, [scenario_detail("Login", "Login with SSO", [200 * scale, 800 * scale]),
+                                  scenario_detail("Login", "Logout", [5 * scale, 5 * scale])]),
+        cell(project, "export", 1, [scenario_detail("Export", "Export a report", [100 * scale, 50 * scale])]),
+    ]
+    params = {"run_id": run_id} if run_id else {}
+    assert client.post("/ingest", json=items, params=params, headers=HEADERS).status_code == 200
+
+def durations(client, project, view, **params):
+    return client.get(f"/systems/{project}/durations/{view}", params=params)
+
+def step(text):
+    """A report step from "keyword|name", without a keyword when it is empty."""
+    keyword, name = text.split("|")
+    return {**({"keyword": keyword} if keyword else {}), "name": name}
+
+@pytest.fixture
+def timed():
+    """What the scenario parsed, took and compacted."""
+    return {}
+
+@given(parsers.parse('a Cucumber report of "{scenario}" with steps of {first:g} ms and {second:g} ms'),
+       target_fixture="report")
+def cucumber_report(tmp_path, scenario, first, second):
+    report = [{
+        "name": "Login", "elements": [{
+            "type": "scenario", "name": scenario, "tags": [{"name": "@component:auth"}, {"name": "@phase:0"}],
+            "steps": [
+                {"keyword": "Given ", "name": "a user", "result": {"status": "passed", "duration": int(first * 1e6)}},
+                {"keyword": "Then ", "name": "they log in", "result": {"status": "passed", "duration": int(second * 1e6)}},
+            ],
+        }],
+    }]
+    path = tmp_path / "cucumber.json"
+    path.write_text(json.dumps(report))
+    return str(path)
+
+@given(parsers.parse('the steps "{first}", "{second}" and "{third}"'), target_fixture="steps")
+def report_steps(first, second, third):
+    # Cucumber JSON keywords end in a space, pytest-bdd's do not
+    return [{**step(text), "duration_ms": ms} for text, ms in ((first, 5.0), (second, 7.0), (third, 1.0))]
+
+@when('I parse the report')
+def parse_report(timed, report):
+    from vordu_ingest import parse_cucumber_json
+    [timed["result"]] = parse_cucumber_json(report)
+    timed["duration"], timed["steps"] = timed["result"]["duration_ms"], timed["result"]["steps"]
+
+@when(parsers.parse('the run of "{project}" is ingested'))
+def ingest_run(client, project):
+    run(client, project)
+
+@when(parsers.parse('the run of "{project}" is ingested again {scale:d} times slower'))
+def ingest_slower(client, project, scale):
+    run(client, project, scale=scale)
+
+@when(parsers.parse('the run of "{project}" is ingested at 1, 2 and 4 times its duration'))
+def ingest_three_runs(client, project):
+    for scale in (1, 2, 4):
+        run(client, project, scale=scale)
+
+@when(parsers.parse('the run of "{project}" is ingested as "{run_id}"'))
+def ingest_as(client, project, run_id):
+    run(client, project, run_id=run_id)
+
+@when(parsers.parse('the run of "{project}" is ingested again {scale:d} times slower as "{run_id}"'))
+def ingest_slower_as(client, project, scale, run_id):
+    run(client, project, scale=scale, run_id=run_id)
+
+@when(parsers.parse('the scenario "{scenario}" of "{component}" under "{parent}" is ingested taking {ms:g} ms'))
+def ingest_scenario(client, scenario, component, parent, ms):
+    payload = {
+        "system": {"name": "timed", "label": "Timed", "domain": "d", "granularity": "component"},
+        "components": [{"name": parent, "label": parent.capitalize(), "system": "timed"},
+                       {"name": component, "label": component.upper(), "system": "timed", "parent": parent}],
+        "scenarios": [{
+            "component": component, "phase": 0, "feature": "Login", "scenario": scenario, "status": "passed",
+            "passed_steps": 1, "total_steps": 1, "duration_ms": ms,
+            "steps": [{"keyword": "Given ", "name": "a user", "status": "passed", "duration_ms": ms}],
+        }],
+    }
+    assert client.post("/ingest/scenarios", json=payload, headers=HEADERS).status_code == 200
+
+@when('I take their durations')
+def take(timed, steps):
+    from api import durations
+    _, [(_, timed["duration"], timings)] = durations.take([{"feature": "F", "scenario": "S", "steps": steps}])
+    timed["steps"] = timings
+
+@when(parsers.parse('a cell with the step "{text}" is ingested'))
+def ingest_step(client, text):
+    details = [{"feature": "F", "scenario": "S", "steps": [{**step(text), "duration_ms": 7.0}]}]
+    assert client.post("/ingest", json=[cell("timed", "auth", 0, details)], headers=HEADERS).status_code == 200
+
+@when('the history is compacted a month later')
+def compact_later(timed):
+    from api import history
+    from api.models import engine
+    timed["stats"] = history.compact(engine, budget=60, now=history.utcnow() + timedelta(days=31))
+
+@then(parsers.parse('the scenario should take {ms:g} ms'))
+def scenario_takes(timed, ms):
+    assert timed["duration"] == ms
+
+@then(parsers.parse('its steps should take "{values}" ms'))
+def steps_take(timed, values):
+    assert [s["duration_ms"] for s in timed["steps"]] == [float(v) for v in values.split(",")]
+
+@then('the details of the matrix should carry no duration')
+def matrix_without_durations(client):
+    details = [c["details"] for c in client.get("/matrix", params={"details": True}).json()]
+    assert "duration_ms" not in json.dumps(details)
+
+@then("only the first run's history samples should carry details")
+def history_details():
+    # Other timings leave the details, and so search and history, untouched
+    from api.models import SessionLocal, CellHistory
+    with SessionLocal() as db:
+        assert db.query(CellHistory).filter(CellHistory.details.isnot(None)).count() == 2
+
+@then(parsers.parse('the slowest scenarios of "{project}" should be "{names}"'))
+def slowest(client, timed, project, names):
+    timed["slowest"] = durations(client, project, "slowest").json()
+    assert [s["scenario"] for s in timed["slowest"]] == names.split(",")
+    assert [(s["row"], s["phase"]) for s in timed["slowest"]] == [("auth", 0), ("export", 1), ("auth", 0)]
+
+@then(parsers.parse('the slowest scenario should take {mean:d} ms on average, at most {most:d} ms, over {runs:d} runs'))
+def slowest_first(timed, mean, most, runs):
+    first = timed["slowest"][0]
+    assert (first["mean_ms"], first["max_ms"], first["runs"]) == (mean, most, runs)
+
+@then(parsers.parse('the slowest feature of "{project}" should be "{feature}" with {mean:g} ms on average'))
+def slowest_feature(client, project, feature, mean):
+    assert durations(client, project, "slowest", by="feature", limit=1).json() == [
+        {"feature": feature, "mean_ms": mean, "max_scenario_ms": 3000.0, "scenarios": 2, "runs": 2}]
+
+@then(parsers.parse('the slowest scenarios in phase {phase:d} of "{project}" should be "{names}"'))
+def slowest_of_phase(client, project, phase, names):
+    assert [s["scenario"] for s in durations(client, project, "slowest", phase=phase).json()] == names.split(",")
+
+@then(parsers.parse('ranking the durations of "{project}" by step should be rejected'))
+def by_step_rejected(client, project):
+    assert durations(client, project, "slowest", by="step").status_code == 422
+
+@then(parsers.parse('phase {phase:d} of "{project}" should count {runs:d} runs, {count:d} scenarios and take at most {most:d} ms'))
+def percentiles_counts(client, timed, phase, project, runs, count, most):
+    timed["percentiles"] = {p["phase"]: p for p in durations(client, project, "percentiles").json()}[phase]
+    found = timed["percentiles"]
+    assert (found["runs"], found["scenarios"], found["max_ms"]) == (runs, count, most)
+
+@then(parsers.parse('the percentiles of phase {phase:d} should be within a histogram bucket'))
+def percentiles_within_bucket(timed, phase):
+    # Histogram buckets are within 2 ** (1 / 8) of the exact value
+    assert 4000 <= timed["percentiles"]["p99_ms"] <= 4000 * 2 ** (1 / 8)
+    assert 10 <= timed["percentiles"]["p50_ms"] <= 1000 * 2 ** (1 / 8)
+
+@then(parsers.parse('the trend of "{project}" should total "{totals}" ms'))
+def trend_totals(client, timed, project, totals):
+    timed["project"] = project
+    assert [t["total_ms"] for t in durations(client, project, "trend").json()] == [int(t) for t in totals.split(",")]
+
+@then(parsers.parse('the trend of the last {limit:d} runs should total "{totals}" ms'))
+def trend_limited(client, timed, limit, totals):
+    trend = durations(client, timed["project"], "trend", limit=limit).json()
+    assert [t["total_ms"] for t in trend] == [int(t) for t in totals.split(",")]
+
+@then(parsers.parse('the trend of phase {phase:d} should peak at "{peaks}" ms'))
+def trend_of_phase(client, timed, phase, peaks):
+    trend = durations(client, timed["project"], "trend", phase=phase).json()
+    assert [t["max_ms"] for t in trend] == [int(p) for p in peaks.split(",")]
+
+@then(parsers.parse('the trend of "{project}" should hold "{run_id}" with {count:d} scenarios and {total:d} ms'))
+def trend_of_run(client, project, run_id, count, total):
+    [build] = durations(client, project, "trend").json()
+    assert (build["run_id"], build["scenarios"], build["total_ms"]) == (run_id, count, total)
+
+@then(parsers.parse('the slowest scenario of "{project}" should be in "{row}", taking {ms:g} ms'))
+def slowest_in_row(client, project, row, ms):
+    # Attributed to the row the component rolls up into
+    [found] = durations(client, project, "slowest").json()
+    assert (found["row"], found["mean_ms"]) == (row, ms)
+
+@then(parsers.parse('the details of "{row}" should carry no duration'))
+def details_without_durations(client, row):
+    details = client.get(f"/matrix/timed/{row}/0/details").json()
+    assert details and "duration_ms" not in json.dumps(details)
+
+@then(parsers.parse('the steps should be labelled "{labels}"'))
+def steps_labelled(timed, labels):
+    assert [t["step"] for t in timed["steps"]] == labels.split(",")
+
+@then(parsers.parse('its timing should be stored as "{label}"'))
+def timing_stored(label):
+    from api.models import SessionLocal, ScenarioTiming
+    with SessionLocal() as db:
+        assert db.query(ScenarioTiming.steps).scalar() == [{"step": label, "duration_ms": 7.0}]
+
+@then(parsers.parse('{count:d} timings should have been deleted'))
+def timings_deleted(timed, count):
+    # The timings go, the run aggregates are kept for a year
+    assert timed["stats"]["durations_deleted"] == count
+
+@then(parsers.parse('"{project}" should have no slowest scenarios'))
+def no_slowest(client, project):
+    assert durations(client, project, "slowest", since="2000-01-01T00:00:00Z").json() == []
+
+@then(parsers.parse('the trend of "{project}" should hold {count:d} runs'))
+def trend_runs(client, project, count):
+    assert len(durations(client, project, "trend").json()) == count
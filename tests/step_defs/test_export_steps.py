@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+
+from payloads import HEADERS, status_item
+
+scenarios('../features/export.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+@given(parsers.parse('exports of {rows:d} rows a chunk'))
+def export_chunks(monkeypatch, rows):
+    from api import export
+    # Several chunks even for small exports
+    monkeypatch.setattr(export, "CHUNK_ROWS", rows)
+
+@given(parsers.parse('{count:d} cells of "{first}" and "{second}" with details'))
+def cells_with_details(client, count, first, second):
+    response = client.post("/ingest", headers=HEADERS, json=[
+        status_item(project, f"r{i}", i % 4, steps_total=2, steps_passed=2,
+                    details=[{"feature": "F", "scenario": f"S{i}", "status": "passed"}])
+        for project in (first, second) for i in range(count)
+    ])
+    assert response.status_code == 200
+
+@given(parsers.parse('{count:d} hourly history samples of "{project}" from {start:ti}'))
+def hourly_history(count, project, start):
+    from api.models import SessionLocal, CellHistory
+    with SessionLocal() as db:
+        db.execute(CellHistory.__table__.insert(), [
+            {
+                "project_name": project, "row_id": f"r{i % 10}", "phase_id": i % 4, "resolution": "run",
+                "recorded_at": start + timedelta(hours=i), "status": "pass", "completion": 50,
+                "scenarios_total": 2, "scenarios_passed": 1, "steps_total": 10, "steps_passed": 5,
+            }
+            for i in range(count)
+        ])
+        db.commit()
+
+@when(parsers.parse('I export the matrix of "{project}" with details'), target_fixture="response")
+def export_matrix(client, project):
+    return client.get("/export/matrix", params={"system": project, "details": True})
+
+@when(parsers.parse('I export the history of "{project}" as CSV from {since} until {until}'), target_fixture="response")
+def export_history_csv(client, project, since, until):
+    return client.get("/export/history", params={"format": "csv", "system": project, "since": since, "until": until})
+
+@when(parsers.parse('I export the dataset "{dataset}"'), target_fixture="response")
+def export_dataset(client, dataset):
+    return client.get(f"/export/{dataset}")
+
+@when(parsers.parse('I export the matrix as "{file_format}"'), target_fixture="response")
+def export_format(client, file_format):
+    return client.get("/export/matrix", params={"format": file_format})
+
+@when(parsers.parse('I export the matrix since "{since}"'), target_fixture="response")
+def export_since(client, since):
+    return client.get("/export/matrix", params={"since": since})
+
+@when(parsers.parse('I export the history of "{project}" in the {file_format} format'), target_fixture="table")
+def export_history_table(client, project, file_format):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    body = io.BytesIO(client.get("/export/history", params={"format": file_format, "system": project}).content)
+    return pq.read_table(body) if file_format == "parquet" else pa.ipc.open_stream(body).read_all()
+
+@then('the export should be NDJSON')
+def is_ndjson(response):
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+@then(parsers.parse('it should hold the cells "r0" to "r9" of "{project}" in order'))
+def ndjson_cells(response, project):
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["row"] for r in rows] == sorted(f"r{i}" for i in range(10))
+    assert {r["project"] for r in rows} == {project}
+
+@then('its cells should carry their details')
+def ndjson_details(response):
+    assert json.loads(response.text.splitlines()[0])["details"][0]["feature"] == "F"
+
+@then(parsers.parse('the export should hold {count:d} samples from {first} without details'))
+def csv_samples(response, count, first):
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    # Samples of the seeded history only, the ingest above was recorded today
+    assert len(rows) == count
+    assert rows[0]["recorded_at"] == first
+    assert "details" not in rows[0]
+
+@then(parsers.parse('the table should hold {count:d} samples with UTC timestamps'))
+def table_samples(table, count):
+    import pyarrow as pa
+    # The seeded samples and the ingested cells' own
+    assert table.num_rows == count
+    assert table.schema.field("recorded_at").type == pa.timestamp("us", tz="UTC")
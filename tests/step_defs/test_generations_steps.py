@@ -0,0 +1,153 @@
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+
+from payloads import HEADERS, count_rows, status_item
+
+scenarios('../features/generations.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+def cells(project, rows, status="pass"):
+    return [
+        status_item(project, f"r{i}", status=status, completion=100, steps_total=2,
+                    steps_passed=2 if status == "pass" else 0,
+                    details=[{"feature": "Atomic", "scenario": f"S {i}", "status": status}])
+        for i in rows
+    ]
+
+def matrix(client, project):
+    return {(c["row"], c["status"]) for c in client.get("/matrix").json() if c["project"] == project}
+
+def system_totals(client, project):
+    return next(s for s in client.get("/summary").json()["systems"] if s["name"] == project)
+
+@pytest.fixture
+def staging():
+    """The generation of the scenario and what collecting it returned."""
+    return {}
+
+@given(parsers.parse('"{project}" has {count:d} passing cells'))
+def passing_cells(client, project, count):
+    assert client.post("/ingest", json=cells(project, range(count)), headers=HEADERS).status_code == 200
+
+@given(parsers.parse('"{project}" has {count:d} passing cells ingested atomically'))
+def passing_cells_atomically(client, project, count):
+    response = client.post("/ingest", params={"atomic": "true"}, json=cells(project, range(count)), headers=HEADERS)
+    assert response.status_code == 200
+
+@given(parsers.parse('a new generation of "{project}"'))
+def new_generation(client, staging, project):
+    staging["project"] = project
+    staging["generation"] = client.post(f"/systems/{project}/generations", headers=HEADERS).json()["generation"]
+
+@given(parsers.parse('{count:d} cells staged in a new generation of "{project}"'))
+def staged_cells(client, staging, count, project):
+    new_generation(client, staging, project)
+    response = client.post(f"/systems/{project}/generations/{staging['generation']}/cells",
+                           json=cells(project, range(count)), headers=HEADERS)
+    assert response.status_code == 200
+
+@when(parsers.parse('I stage failing cells r{first:d} to r{last:d} in a new generation of "{project}"'))
+def stage_new(client, staging, first, last, project):
+    new_generation(client, staging, project)
+    stage_same(client, staging, first, last)
+
+@when(parsers.parse('I stage failing cells r{first:d} to r{last:d} in the same generation'), target_fixture="response")
+def stage_same(client, staging, first, last):
+    project = staging["project"]
+    return client.post(f"/systems/{project}/generations/{staging['generation']}/cells",
+                       json=cells(project, range(first, last + 1), status="fail"), headers=HEADERS)
+
+@when(parsers.parse('I stage cells of "{project}" in it'), target_fixture="response")
+def stage_other_system(client, staging, project):
+    return client.post(f"/systems/{staging['project']}/generations/{staging['generation']}/cells",
+                       json=cells(project, range(1)), headers=HEADERS)
+
+@when(parsers.parse('I stage cells of "{project}" in generation {generation:d}'), target_fixture="response")
+def stage_unknown_generation(client, project, generation):
+    return client.post(f"/systems/{project}/generations/{generation}/cells", json=cells(project, range(1)),
+                       headers=HEADERS)
+
+@when('I publish the generation', target_fixture="response")
+def publish(client, staging):
+    return client.post(f"/systems/{staging['project']}/generations/{staging['generation']}/publish", headers=HEADERS)
+
+@when(parsers.parse('I publish it as a generation of "{project}"'), target_fixture="response")
+def publish_as(client, staging, project):
+    return client.post(f"/systems/{project}/generations/{staging['generation']}/publish", headers=HEADERS)
+
+@when(parsers.parse('I ingest failing cells r{first:d} to r{last:d} of "{project}" in place'))
+def ingest_in_place(client, first, last, project):
+    response = client.post("/ingest", json=cells(project, range(first, last + 1), status="fail"), headers=HEADERS)
+    assert response.status_code == 200
+
+@when(parsers.parse('I ingest atomically {failing:d} failing cell of "{first}" and {passing:d} passing cells of "{second}"'),
+      target_fixture="response")
+def ingest_atomically(client, failing, first, passing, second):
+    return client.post("/ingest", params={"atomic": "true"}, headers=HEADERS,
+                       json=cells(first, range(failing), status="fail") + cells(second, range(passing)))
+
+@when('I collect abandoned generations')
+def collect(staging):
+    from api import generations
+    from api.models import engine
+    staging["collected"] = generations.collect(engine)
+
+@when(parsers.parse('I collect abandoned generations past their time to live, {batch:d} cells at a time'))
+def collect_expired(monkeypatch, staging, batch):
+    from api import generations
+    monkeypatch.setattr(generations, "STAGING_TTL_S", -1)
+    monkeypatch.setattr(generations, "GC_BATCH", batch)
+    collect(staging)
+
+@then(parsers.parse('the matrix of "{project}" should still hold {count:d} passing cells'))
+def matrix_unchanged(client, project, count):
+    # Staged cells are invisible to every reader
+    assert matrix(client, project) == {(f"r{i}", "pass") for i in range(count)}
+    assert system_totals(client, project)["cells"] == count
+
+@then(parsers.parse('the matrix of "{project}" should hold {count:d} {status} cells'))
+def matrix_holds(client, project, count, status):
+    status = {"passing": "pass", "failing": "fail"}[status]
+    assert matrix(client, project) == {(f"r{i}", status) for i in range(count)}
+
+@then(parsers.parse('the matrix of "{project}" should hold "{cells}"'))
+def matrix_holds_cells(client, project, cells):
+    assert matrix(client, project) == {tuple(cell.split(":")) for cell in cells.split(",")}
+
+@then(parsers.parse('the publish should report {count:d} cells'))
+def publish_reports(response, staging, count):
+    assert response.json() == {"status": "published", "system": staging["project"],
+                               "generation": staging["generation"], "count": count}
+
+@then(parsers.parse('the summary of "{project}" should count {count:d} cells, {passed:d} passed and {steps:d} steps'))
+def summary_counts(client, project, count, passed, steps):
+    totals = system_totals(client, project)
+    assert (totals["cells"], totals["cells_passed"], totals["steps_total"]) == (count, passed, steps)
+
+@then(parsers.parse('the summary of "{project}" should count {count:d} cells'))
+def summary_counts_cells(client, project, count):
+    assert system_totals(client, project)["cells"] == count
+
+@then(parsers.parse('the summary should count {count:d} cells'))
+def summary_total(client, count):
+    assert client.get("/summary").json()["totals"]["cells"] == count
+
+@then(parsers.parse('{count:d} cells should be stored'))
+def cells_stored(count):
+    from api.models import MatrixCell
+    # The old generation is collected after the response
+    assert count_rows(MatrixCell) == count
+
+@then(parsers.parse('searching "{query}" should find the rows "{rows}"'))
+def search_finds(client, query, rows):
+    hits = client.get("/search", params={"q": query}).json()["hits"]
+    assert {hit["row"] for hit in hits} == set(rows.split(","))
+
+@then(parsers.parse('the response should list the generations of "{projects}"'))
+def generations_listed(response, projects):
+    assert set(response.json()["generations"]) == set(projects.split(","))
+
+@then(parsers.parse('{count:d} staged cells should have been collected'))
+def collected(staging, count):
+    assert staging["collected"] == count
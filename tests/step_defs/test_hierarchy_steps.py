@@ -0,0 +1,135 @@
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+from sqlalchemy import select
+
+from payloads import HEADERS, status_item, system_config
+
+scenarios('../features/hierarchy.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+# platform
+# ├── auth
+# │   └── tokens
+# └── storage
+TREE = {"platform": None, "auth": "platform", "tokens": "auth", "storage": "platform"}
+
+def configure(client, tree, system="tree"):
+    response = client.post("/config/ingest", json=system_config(system, list(tree), domain="hierarchy", parents=tree),
+                           headers=HEADERS)
+    assert response.status_code == 200
+
+def closure(system="tree"):
+    from api.models import SessionLocal, RowClosure
+    with SessionLocal() as db:
+        return set(db.execute(
+            select(RowClosure.ancestor, RowClosure.descendant, RowClosure.depth).where(RowClosure.system_name == system)
+        ).all())
+
+def rollup(client, row):
+    return client.get(f"/systems/tree/rows/{row}/rollup")
+
+@pytest.fixture
+def hierarchy_before():
+    return set()
+
+@given('the system "tree" with the rows "platform", "auth" and "storage" under "platform", and "tokens" under "auth"')
+def tree(client):
+    configure(client, TREE)
+
+@given(parsers.parse('the cells of "{project}":'))
+def cells_of(client, project, datatable):
+    header, *rows = datatable
+    items = [dict(zip(header, row)) for row in rows]
+    response = client.post("/ingest", headers=HEADERS, json=[
+        status_item(project, item["row"], int(item["phase"]), item["status"], completion=int(item["completion"]),
+                    steps_total=4, steps_passed=int(item["steps_passed"]))
+        for item in items
+    ])
+    assert response.status_code == 200
+
+@given('the hierarchy table is emptied')
+def emptied(hierarchy_before):
+    from api import hierarchy
+    from api.models import SessionLocal
+    hierarchy_before.update(closure())
+    with SessionLocal() as db:
+        hierarchy.clear(db)
+        db.commit()
+
+@when(parsers.parse('"{row}" is added under "{parent}"'))
+@when(parsers.parse('"{row}" moves under "{parent}"'))
+def place_row(client, row, parent):
+    configure(client, {**TREE, row: parent})
+
+@when('the hierarchy is backfilled')
+def backfill():
+    from api import hierarchy
+    from api.models import SessionLocal
+    hierarchy.backfill(SessionLocal)
+
+@when('the system "cycle" is configured with "a" under "b", "b" under "a" and "c" under "elsewhere"')
+def cyclic_tree(client):
+    configure(client, {"a": "b", "b": "a", "c": "elsewhere"}, system="cycle")
+
+@then('the rollups of "tree" should list every row')
+def rollups_list_rows(client):
+    assert {r["row"] for r in client.get("/systems/tree/rollups").json()} == set(TREE)
+
+@then(parsers.parse('the rollup of "{row}" should count {cells:d} cells, {passed:d} passed, {steps:d} steps and {steps_passed:d} passed steps'))
+def rollup_counts(client, row, cells, passed, steps, steps_passed):
+    [found] = [r for r in client.get("/systems/tree/rollups").json() if r["row"] == row]
+    assert (found["cells"], found["cells_passed"], found["steps_total"], found["steps_passed"]) == (
+        cells, passed, steps, steps_passed)
+
+@then(parsers.parse('the rollup of "{row}" should be {completion:d}% complete with {first:d} cells in phase 0 and {second:d} in phase 1'))
+def rollup_phases(client, row, completion, first, second):
+    [found] = [r for r in client.get("/systems/tree/rollups").json() if r["row"] == row]
+    # (100 + 50 + 100 + 0) / 4 for the whole tree
+    assert found["completion"] == completion
+    assert [(p["phase"], p["cells"]) for p in found["phases"]] == [(0, first), (1, second)]
+
+@then(parsers.parse('the rollup of "{row}" should count {cells:d} cells, {passed:d} passed and be {completion:d}% complete'))
+def row_rollup(client, row, cells, passed, completion):
+    found = rollup(client, row).json()
+    assert (found["cells"], found["cells_passed"], found["completion"]) == (cells, passed, completion)
+
+@then(parsers.parse('the rollup of "{row}" should be {first:d}% complete in phase 0 and {second:d}% in phase 1'))
+def row_rollup_phases(client, row, first, second):
+    assert [(p["phase"], p["completion"]) for p in rollup(client, row).json()["phases"]] == [(0, first), (1, second)]
+
+@then(parsers.parse('the rollup of "{row}" should count {cells:d} cells'))
+def row_rollup_cells(client, row, cells):
+    assert rollup(client, row).json()["cells"] == cells
+
+@then(parsers.parse('the rollup of "{row}" should be empty'))
+def empty_rollup(client, row):
+    assert rollup(client, row).json() == {
+        "row": row, "cells": 0, "cells_passed": 0, "scenarios_total": 0, "scenarios_passed": 0,
+        "steps_total": 0, "steps_passed": 0, "completion": 0, "phases": [],
+    }
+
+@then(parsers.parse('the rollup of "{row}" should not be found'))
+def missing_rollup(client, row):
+    assert rollup(client, row).status_code == 404
+
+@then(parsers.parse('"{row}" should be {depth:d} levels below "{ancestor}"'))
+@then(parsers.parse('"{row}" should be {depth:d} level below "{ancestor}"'))
+def below(row, depth, ancestor):
+    assert (ancestor, row, depth) in closure()
+
+@then(parsers.parse('"{row}" should no longer be below "{ancestor}"'))
+def not_below(row, ancestor):
+    assert not any(pair[:2] == (ancestor, row) for pair in closure())
+
+@then('the hierarchy should be as before')
+def hierarchy_restored(hierarchy_before):
+    assert closure() == hierarchy_before
+
+@then(parsers.parse('"{row}" should have {count:d} rows in its subtree'))
+def subtree_size(row, count):
+    assert len([pair for pair in closure() if pair[0] == row]) == count
+
+@then('the hierarchy of "cycle" should only hold each row, "b" over "a" and "a" over "b"')
+def cycle_closure():
+    assert closure("cycle") == {("a", "a", 0), ("b", "b", 0), ("c", "c", 0), ("b", "a", 1), ("a", "b", 1)}
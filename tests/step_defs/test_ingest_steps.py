@@ -0,0 +1,108 @@
+import sys
+import requests
+from pytest_bdd import scenarios, given, when, then, parsers
+
+import vordu_ingest
+
+scenarios('../features/ingest.feature')
+
+# "Given the API is running" is shared in conftest.py
+
+CATALOG_TEMPLATE = """apiVersion: backstage.io/v1alpha1
+kind: System
+metadata:
+  name: {name}
+spec:
+  domain: yggdrasil
+---
+apiVersion: backstage.io/v1alpha1
+kind: Component
+metadata:
+  name: {name}-core
+  system: {name}
+"""
+
+@given(parsers.parse('a monorepo with catalogs for "{first}" and "{second}"'), target_fixture="monorepo")
+def monorepo(tmp_path, first, second):
+    for name in (first, second):
+        project_dir = tmp_path / name
+        (project_dir / "features").mkdir(parents=True)
+        (project_dir / "catalog-info.yaml").write_text(CATALOG_TEMPLATE.format(name=name), encoding="utf-8")
+        (project_dir / "features" / "core.feature").write_text(
+            "Feature: Core\n\n    @phase:1\n    Scenario: Works\n        Given it works\n",
+            encoding="utf-8",
+        )
+    return tmp_path
+
+@when(parsers.parse('I run the ingest script with "{flag}" on the monorepo'), target_fixture="exit_code")
+def run_ingest_script(monkeypatch, api_base_url, monorepo, flag):
+    return run_main(monkeypatch, [flag, str(monorepo), "--api-url", api_base_url])
+
+@when('I run the ingest script with server-side rollups on the monorepo', target_fixture="exit_code")
+def run_ingest_script_server_rollup(monkeypatch, api_base_url, monorepo):
+    return run_main(monkeypatch, ["--discover", str(monorepo), "--server-rollup", "--api-url", api_base_url])
+
+@when('I run the ingest script against an unreachable API with a spool directory', target_fixture="exit_code")
+def run_ingest_script_offline(monkeypatch, monorepo, tmp_path):
+    # Port 9 (discard) is not served, so every post fails straight away
+    return run_main(monkeypatch, [
+        "--discover", str(monorepo), "--api-url", "http://127.0.0.1:9",
+        "--retries", "0", "--spool-dir", str(tmp_path / "spool")
+    ])
+
+@when('I run the ingest script against an unreachable API once per catalog')
+def run_ingest_script_offline_per_catalog(monkeypatch, monorepo, tmp_path):
+    # One spool file per run, replayed together as concatenated gzip members
+    for project_dir in sorted(p for p in monorepo.iterdir() if (p / "catalog-info.yaml").exists()):
+        assert run_main(monkeypatch, [
+            str(project_dir / "catalog-info.yaml"), "--api-url", "http://127.0.0.1:9",
+            "--retries", "0", "--spool-dir", str(tmp_path / "spool")
+        ]) in (0, None)
+
+@when('I replay the spool', target_fixture="exit_code")
+def replay_spool(monkeypatch, api_base_url, tmp_path):
+    return run_main(monkeypatch, ["replay", "--spool-dir", str(tmp_path / "spool"), "--api-url", api_base_url])
+
+@when(parsers.parse('I switch "{system}" to "{granularity}" granularity'))
+def switch_granularity(api_base_url, system, granularity):
+    response = requests.put(
+        f"{api_base_url}/systems/{system}/granularity",
+        json={"granularity": granularity},
+        headers={"X-API-Key": "dev-key"},
+    )
+    assert response.status_code == 200
+
+def run_main(monkeypatch, args):
+    monkeypatch.setattr(sys, "argv", ["vordu_ingest.py", *args])
+    try:
+        vordu_ingest.main()
+    except SystemExit as e:
+        return e.code
+    return 0
+
+@then('the ingest script should succeed')
+def ingest_script_succeeds(exit_code):
+    assert exit_code in (0, None)
+
+@then('the spool should be empty')
+def spool_is_empty(tmp_path):
+    assert not list((tmp_path / "spool").iterdir())
+
+@then(parsers.parse('the spool should hold {count:d} files'))
+def spool_holds_files(tmp_path, count):
+    assert len(list((tmp_path / "spool").glob("*.ndjson.gz"))) == count
+
+@then(parsers.parse('the config should contain the systems "{first}" and "{second}"'))
+def config_contains_systems(api_base_url, first, second):
+    response = requests.get(f"{api_base_url}/config")
+    assert response.status_code == 200
+    systems = {project['id'] for project in response.json()}
+    assert {first, second} <= systems
+
+@then(parsers.parse('the matrix for "{system}" should only have the row "{row}"'))
+def matrix_has_only_row(api_base_url, system, row):
+    response = requests.get(f"{api_base_url}/matrix")
+    assert response.status_code == 200
+    cells = [cell for cell in response.json() if cell['project'] == system]
+    assert len(cells) == 4 # One per phase
+    assert {cell['row'] for cell in cells} == {row}
@@ -0,0 +1,68 @@
+import json
+
+from pytest_bdd import scenarios, given, when, then, parsers
+
+from payloads import HEADERS, status_item
+
+scenarios('../features/matrix_format.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+COLUMNAR = "application/vnd.vordu.matrix.columnar+json"
+STATUSES = ("pass", "fail", "pending")
+
+def decode(payload):
+    """Cells of a columnar payload as the objects of the default format."""
+    dictionaries, columns = payload["dictionaries"], payload["columns"]
+    return [
+        {name: dictionaries[name][values[i]] if name in dictionaries else values[i] for name, values in columns.items()}
+        for i in range(payload["count"])
+    ]
+
+@given(parsers.parse('{systems:d} systems of {rows:d} rows in {phases:d} phases with every status'))
+def matrix_of_systems(client, systems, rows, phases):
+    for system in range(systems):
+        items = [
+            status_item(f"system-{system}", f"component-{row}", phase, STATUSES[(system + row + phase) % 3],
+                        completion=(row * 7 + phase) % 101, scenarios_total=row % 13, scenarios_passed=row % 7,
+                        steps_total=row * 3, steps_passed=row * 2)
+            for row in range(rows) for phase in range(phases)
+        ]
+        assert client.post("/ingest", json=items, headers=HEADERS).status_code == 200
+
+@when('I request the matrix as columnar JSON', target_fixture="response")
+def request_columnar(client):
+    return client.get("/matrix", headers={"Accept": COLUMNAR})
+
+@when(parsers.parse('I request the matrix in the format "{file_format}"'), target_fixture="response")
+def request_format(client, file_format):
+    return client.get("/matrix", params={"format": file_format})
+
+@when(parsers.parse('I request the matrix in the format "{file_format}" with details'), target_fixture="response")
+def request_format_with_details(client, file_format):
+    return client.get("/matrix", params={"format": file_format, "details": True})
+
+@when('I request the matrix', target_fixture="response")
+def request_matrix(client):
+    return client.get("/matrix")
+
+@then(parsers.parse('the response should be columnar JSON of {count:d} cells'))
+def columnar_of(response, count):
+    assert response.headers["content-type"] == COLUMNAR
+    assert response.json()["count"] == count
+
+@then(parsers.parse('its status dictionary should hold "{statuses}"'))
+def status_dictionary(response, statuses):
+    assert sorted(response.json()["dictionaries"]["status"]) == sorted(statuses.split(","))
+
+@then('it should decode to the cells of the default format')
+def decodes_to_rows(client, response):
+    assert decode(response.json()) == json.loads(client.get("/matrix").content)
+
+@then('the format parameter should return the same body')
+def format_parameter(client, response):
+    assert client.get("/matrix", params={"format": "columnar"}).content == response.content
+
+@then('the response should vary by Accept')
+def varies_by_accept(response):
+    assert response.headers["vary"] == "Accept"
@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+import zipfile
+
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+
+import vordu_pack
+
+scenarios('../features/packaging.feature')
+
+SCRIPT = os.path.join(os.path.dirname(vordu_pack.__file__), "vordu_ingest.py")
+CATALOG = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "catalog-info.yaml"))
+
+def run(*args):
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True)
+
+@pytest.fixture(scope="module")
+def packed(tmp_path_factory):
+    return vordu_pack.pack(SCRIPT, str(tmp_path_factory.mktemp("pack") / "vordu_ingest.pyz"))
+
+@given('the ingest script packed into an archive', target_fixture="pyz")
+def pyz(packed):
+    return packed
+
+@given('a copy of the archive whose source fails when run', target_fixture="broken")
+def broken_copy(pyz, tmp_path):
+    broken = str(tmp_path / "broken.pyz")
+    with zipfile.ZipFile(pyz) as source, open(broken, "wb") as f:
+        f.write(b"#!/usr/bin/env python3\n")
+        with zipfile.ZipFile(f, "w") as target:
+            for info in source.infolist():
+                data = b"raise SystemExit('compiled from source')" if info.filename == "vordu_ingest.py" else source.read(info)
+                target.writestr(info, data)
+    return broken
+
+@given('the catalog parsed with the C YAML loader', target_fixture="entities")
+def parsed_with_c_loader():
+    from vordu_ingest import parse_catalog
+    return parse_catalog(CATALOG)
+
+@when('I pack the ingest script again', target_fixture="again")
+def pack_again(tmp_path):
+    return vordu_pack.pack(SCRIPT, str(tmp_path / "again.pyz"))
+
+@when(parsers.parse('I run the copy with "{flag}"'), target_fixture="result")
+def run_copy(broken, flag):
+    return run(broken, flag)
+
+@when('I import the ingest script from the archive', target_fixture="result")
+def import_from_archive(pyz):
+    return run("-c", f"import sys; sys.path.insert(0, {pyz!r}); import vordu_ingest; print(' '.join(sys.modules))")
+
+@when('I parse it without the C YAML loader', target_fixture="fallback")
+def parse_without_c_loader(monkeypatch):
+    import yaml
+    from vordu_ingest import parse_catalog
+    monkeypatch.delattr(yaml, "CSafeLoader", raising=False)
+    return parse_catalog(CATALOG)
+
+@when("I run the archive on the repository's catalog without site-packages", target_fixture="result")
+def run_isolated(pyz):
+    # -I -S drops site-packages, and with it an installed PyYAML
+    return run("-I", "-S", pyz, CATALOG)
+
+@then('both archives should be identical')
+def identical(pyz, again):
+    with open(pyz, "rb") as a, open(again, "rb") as b:
+        assert a.read() == b.read()
+
+@then('it should print the help of the ingest script')
+def prints_help(result):
+    # The precompiled module ran, not the source
+    assert "Vörðu Ingestion Script" in result.stdout
+
+@then(parsers.parse('none of "{modules}" should have been loaded'))
+def not_loaded(result, modules):
+    # Loaded by the stages that need them only
+    assert set(modules.split(",")).isdisjoint(result.stdout.split())
+
+@then('both should parse to the same entities')
+def same_entities(entities, fallback):
+    assert entities and fallback == entities
+
+@then('it should print the generated config payload')
+def prints_config(result):
+    assert "[Generated Config Payload" in result.stdout
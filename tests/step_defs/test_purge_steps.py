@@ -0,0 +1,238 @@
+from datetime import timedelta
+
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+from sqlalchemy import func, select
+
+from payloads import HEADERS, status_item, system_config
+
+scenarios('../features/purge.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+def cell(project, row, phase):
+    return status_item(project, row, phase, details=[
+        {"feature": "Access", "scenario": f"{project} {row} {phase}", "status": "passed", "steps": [], "duration_ms": 5}
+    ])
+
+def ingest(client, project, domain, rows=("auth", "billing")):
+    config = system_config(project, ("auth", "billing"), domain=domain)
+    assert client.post("/config/ingest", json=config, headers=HEADERS).status_code == 200
+    items = [cell(project, row, phase) for row in rows for phase in (0, 1)]
+    assert client.post("/ingest", json=items, headers=HEADERS).status_code == 200
+
+def rows_of(project):
+    """Rows left for project in every table with a system column."""
+    from api import purge
+    from api.models import SessionLocal
+    with SessionLocal() as db:
+        return {
+            model.__tablename__: db.execute(select(func.count()).select_from(model).where(column == project)).scalar()
+            for model, column in purge.SMALL_TABLES + purge.BULK_TABLES
+        }
+
+def matrix_systems(client):
+    return {c["project"] for c in client.get("/matrix").json()}
+
+@pytest.fixture
+def purging():
+    """The cutoff, commits and cache version the purge scenarios compare against."""
+    return {}
+
+@given(parsers.parse('the systems "{first}" and "{second}" of domain "{domain}" with 4 cells each'))
+def two_systems(client, first, second, domain):
+    ingest(client, first, domain)
+    ingest(client, second, domain)
+
+@given(parsers.parse('the system "{project}" of domain "{domain}" with 4 cells'))
+def one_system(client, project, domain):
+    ingest(client, project, domain)
+
+@given('the time is noted')
+def note_time(purging):
+    from api.models import utcnow
+    purging["cutoff"] = utcnow().isoformat() + "Z"
+
+@given(parsers.parse('the history of "{project}" is deleted'))
+@given(parsers.parse('the history of the row "{row}" of "{project}" is deleted'))
+def history_deleted(project, row=None):
+    from api.models import SessionLocal, CellHistory
+    criteria = [CellHistory.project_name == project] + ([CellHistory.row_id == row] if row else [])
+    with SessionLocal() as db:
+        db.query(CellHistory).filter(*criteria).delete()
+        db.commit()
+
+@given('a database from before cells carried a date')
+def cells_undated():
+    from sqlalchemy import text
+    from api.models import engine
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE matrix_cells DROP COLUMN updated_at"))
+
+@given(parsers.parse('the history of the row "{row}" of "{project}" was recorded {days:d} days ago'))
+def history_dated(project, row, days):
+    from api.models import SessionLocal, CellHistory, utcnow
+    with SessionLocal() as db:
+        db.query(CellHistory).filter(CellHistory.project_name == project, CellHistory.row_id == row).update(
+            {"recorded_at": utcnow() - timedelta(days=days)})
+        db.commit()
+
+@given(parsers.parse('purges of {batch:d} rows a batch'))
+def purge_batches(monkeypatch, batch):
+    from api import purge
+    monkeypatch.setattr(purge, "PURGE_BATCH", batch)
+    monkeypatch.setattr(purge, "PURGE_PAUSE_S", 0)
+
+@given('the matrix is cached')
+def matrix_cached(client, purging):
+    from api import cache
+    from api.models import SessionLocal
+    with SessionLocal() as db:
+        purging["version"] = cache.current_version(db)
+    client.get("/matrix") # Cached under the current version
+
+@when(parsers.parse('I purge the system "{project}"'), target_fixture="response")
+def purge_system(client, project):
+    return client.delete(f"/admin/systems/{project}", headers=HEADERS)
+
+@when(parsers.parse('I purge the system "{project}", counting commits'))
+def purge_system_counting(client, purging, project):
+    from sqlalchemy import event
+    from api.models import SessionLocal
+    commits = purging["commits"] = []
+    listener = lambda session: commits.append(session) # noqa: E731
+    event.listen(SessionLocal, "after_commit", listener)
+    try:
+        assert purge_system(client, project).status_code == 200
+    finally:
+        event.remove(SessionLocal, "after_commit", listener)
+
+@when(parsers.parse('I purge the domain "{domain}"'), target_fixture="response")
+def purge_domain(client, domain):
+    return client.delete(f"/admin/domains/{domain}", headers=HEADERS)
+
+@when(parsers.parse('I ingest the system "{project}" of domain "{domain}" again'))
+def ingest_again(client, project, domain):
+    ingest(client, project, domain)
+
+@when(parsers.parse('I ingest the row "{row}" of "{project}" again'))
+def ingest_row(client, row, project):
+    ingest(client, project, "platform", rows=(row,))
+
+@when(parsers.parse('I purge the cells of "{project}" not written since then'), target_fixture="response")
+def purge_cells_of(client, purging, project):
+    return client.delete("/admin/cells", params={"older_than": purging["cutoff"], "system": project}, headers=HEADERS)
+
+@when('I purge every cell not written since then', target_fixture="response")
+def purge_cells(client, purging):
+    return client.delete("/admin/cells", params={"older_than": purging["cutoff"]}, headers=HEADERS)
+
+@when(parsers.parse('I purge every cell not written since {days:d} days ago'), target_fixture="response")
+def purge_cells_days_ago(client, days):
+    from api.models import utcnow
+    older_than = (utcnow() - timedelta(days=days)).isoformat() + "Z"
+    return client.delete("/admin/cells", params={"older_than": older_than}, headers=HEADERS)
+
+@when('the API starts')
+def api_starts():
+    from api import purge
+    from api.models import SessionLocal, add_missing_columns, engine
+    add_missing_columns(engine)
+    purge.backfill(SessionLocal)
+
+@when('I reset the database', target_fixture="response")
+def reset(client):
+    return client.delete("/admin/db", headers=HEADERS)
+
+@then(parsers.parse('the purge should have deleted {cells:d} cells, {systems:d} systems, {rows:d} rows and {timings:d} timings'))
+def deleted_counts(response, cells, systems, rows, timings):
+    deleted = response.json()["deleted"]
+    assert (deleted["matrix_cells"], deleted["systems"], deleted["rows"], deleted["scenario_timings"]) == (
+        cells, systems, rows, timings)
+
+@then(parsers.parse('the purge should have deleted {cells:d} cells'))
+def deleted_cells(response, cells):
+    assert response.json()["deleted"]["matrix_cells"] == cells
+
+@then(parsers.parse('the purge should have deleted {cells:d} cells and {docs:d} search documents'))
+def deleted_cells_and_docs(response, cells, docs):
+    assert response.json()["deleted"] == {"matrix_cells": cells, "search_docs": docs}
+
+@then('the purge should have deleted nothing')
+def deleted_nothing(response):
+    assert response.status_code == 200
+    assert response.json()["deleted"] == {}
+
+@then(parsers.parse('the cells of "{project}" row "{row}" should be dated {days:d} days ago'))
+@then(parsers.parse('the cells of "{project}" row "{row}" should be dated today'))
+def cells_dated_at(project, row, days=0):
+    from api.models import SessionLocal, MatrixCell, utcnow
+    with SessionLocal() as db:
+        dates = db.execute(select(MatrixCell.updated_at).where(
+            MatrixCell.project_name == project, MatrixCell.row_id == row)).scalars().all()
+    assert len(dates) == 2
+    expected = utcnow() - timedelta(days=days)
+    assert all(abs(date - expected) < timedelta(minutes=1) for date in dates)
+
+@then(parsers.parse('the purge should list the systems "{projects}"'))
+def purged_systems(response, projects):
+    assert response.json()["systems"] == projects.split(",")
+
+@then(parsers.parse('no table should hold rows of "{project}"'))
+def no_rows_left(project):
+    assert set(rows_of(project).values()) == {0}
+
+@then(parsers.parse('the matrix should only hold the systems "{projects}"'))
+def matrix_only(client, projects):
+    assert matrix_systems(client) == set(projects.split(","))
+
+@then('the matrix should be empty')
+def matrix_empty(client):
+    assert client.get("/matrix").json() == []
+
+@then(parsers.parse('the matrix should hold {count:d} cells of "{project}"'))
+def matrix_cells_of(client, count, project):
+    assert len([c for c in client.get("/matrix").json() if c["project"] == project]) == count
+
+@then(parsers.parse('the matrix should hold the rows "{rows}" of "{project}"'))
+def matrix_rows_of(client, rows, project):
+    assert {c["row"] for c in client.get("/matrix").json() if c["project"] == project} == set(rows.split(","))
+
+@then(parsers.parse('the config should only list the systems "{projects}"'))
+def config_only(client, projects):
+    assert {p["id"] for p in client.get("/config").json()} == set(projects.split(","))
+
+@then(parsers.parse('the summary should not list "{project}"'))
+def summary_without(client, project):
+    assert project not in {s["name"] for s in client.get("/summary").json()["systems"]}
+
+@then(parsers.parse('the summary should count {count:d} cells of "{project}"'))
+def summary_cells_of(client, count, project):
+    [system] = [s for s in client.get("/summary").json()["systems"] if s["name"] == project]
+    assert system["cells"] == count
+
+@then(parsers.parse('searching "{query}" should find nothing'))
+def search_finds_nothing(client, query):
+    assert client.get("/search", params={"q": query}).json()["hits"] == []
+
+@then(parsers.parse('searching "{query}" should find something'))
+def search_finds(client, query):
+    # Search still indexes new writes
+    assert client.get("/search", params={"q": query}).json()["hits"]
+
+@then(parsers.parse('the history of "{project}" should keep {count:d} samples'))
+def history_kept(project, count):
+    assert rows_of(project)["cell_history"] == count
+
+@then(parsers.parse('at least {count:d} commits should have been made'))
+def commits_made(purging, count):
+    # The first transaction hides the system and drops its small tables, then the
+    # 4 cells, 4 documents, 4 history samples and 4 timings take two batches each
+    assert len(purging["commits"]) >= count
+
+@then('the cache version should have moved on')
+def cache_moved_on(purging):
+    from api import cache
+    from api.models import SessionLocal
+    with SessionLocal() as db:
+        assert cache.current_version(db) > purging["version"]
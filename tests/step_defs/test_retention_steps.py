@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+from sqlalchemy import func, select, text
+
+from payloads import HEADERS, status_item
+
+scenarios('../features/retention.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+NOW = datetime(2026, 6, 15, 12, 0)
+
+def counts(*criteria):
+    """{resolution: samples} of cell_history."""
+    from api.models import SessionLocal, CellHistory
+    with SessionLocal() as db:
+        return dict(db.execute(
+            select(CellHistory.resolution, func.count(CellHistory.id)).where(*criteria).group_by(CellHistory.resolution)
+        ).all())
+
+def pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+@pytest.fixture
+def compaction():
+    """The seeded history and the stats of the last compaction."""
+    return {}
+
+@given(parsers.parse('{days:d} days of history with {per_day:d} samples a day for {cells:d} cells'))
+def seeded_history(compaction, days, per_day, cells):
+    from api.models import SessionLocal, CellHistory
+    compaction.update(days=days, per_day=per_day, cells=cells)
+    samples = [
+        {
+            "project_name": "hist", "row_id": f"c{cell}", "phase_id": cell, "resolution": "run",
+            "recorded_at": NOW - timedelta(days=day, hours=8 * n), "status": "pass", "completion": 100,
+            "scenarios_total": 1, "scenarios_passed": 1, "steps_total": 5, "steps_passed": 5,
+            "details": [{"feature": "F", "scenario": "S", "status": "passed"}],
+        }
+        for cell in range(cells) for day in range(days) for n in range(per_day)
+    ]
+    with SessionLocal() as db:
+        db.execute(CellHistory.__table__.insert(), samples)
+        db.commit()
+
+@given('a SQLite file created before incremental vacuum with free pages', target_fixture="old_engine")
+def old_sqlite_file(tmp_path):
+    from sqlalchemy import create_engine
+    from api.models import Base, CellHistory
+    # Created without the app's connect hook, like a file predating incremental auto_vacuum
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(old)
+    with old.begin() as conn:
+        conn.execute(CellHistory.__table__.insert(), [{"project_name": "hist", "details": ["x" * 1000]}] * 500)
+        conn.execute(CellHistory.__table__.delete())
+    return old
+
+@when('I compact the history')
+@when('I compact the history again')
+def compact(compaction):
+    from api import history
+    from api.models import engine
+    compaction["found"] = counts()
+    compaction["stats"] = history.compact(engine, budget=60, now=NOW)
+
+@when('I compact the history without a time budget')
+def compact_without_budget(compaction):
+    from api import history
+    from api.models import engine
+    compaction["stats"] = history.compact(engine, budget=0, now=NOW)
+
+@when('I compact its history')
+def compact_old(compaction, old_engine):
+    from api import history
+    compaction["stats"] = history.compact(old_engine, budget=60, now=NOW)
+
+@when('I compact its history with vacuum')
+def compact_old_with_vacuum(compaction, old_engine):
+    from api import history
+    compaction["stats"] = history.compact(old_engine, budget=60, now=NOW, vacuum=True)
+
+@when(parsers.parse('I ingest a passing cell "{row}" of "{project}"'))
+def ingest_cell(client, row, project):
+    response = client.post("/ingest", headers=HEADERS, json=[status_item(project, row, steps_total=5, steps_passed=5)])
+    assert response.status_code == 200
+
+@when(parsers.parse('"{worker}" takes the lease for {seconds:d} seconds'))
+def take_lease(worker, seconds):
+    should_get_lease(worker, seconds)
+
+@when(parsers.parse('"{worker}" renews the lease, expiring it'))
+def renew_expired(worker):
+    from api.models import acquire_lease, engine
+    # The holder renews, another worker only takes over an expired lease
+    assert acquire_lease(engine, "test_lease", worker, -1)
+
+@then('the compaction should be complete')
+def complete(compaction):
+    assert compaction["stats"]["complete"]
+
+@then('the compaction should not be complete')
+def not_complete(compaction):
+    assert not compaction["stats"]["complete"]
+
+@then('every sample of the last 14 days should be kept')
+def recent_kept(compaction):
+    per_day, cells = compaction["per_day"], compaction["cells"]
+    # Cutoffs round down to a day and week boundary
+    assert 14 * per_day * cells <= counts()["run"] <= 15 * per_day * cells
+
+@then('one sample a day should be kept for a year')
+def daily_kept(compaction):
+    cells = compaction["cells"]
+    assert 0 <= counts()["day"] - (365 - 14) * cells <= 7 * cells
+
+@then('one sample a week should be kept before that')
+def weekly_kept(compaction):
+    cells = compaction["cells"]
+    assert abs(counts()["week"] - (compaction["days"] - 365) / 7 * cells) <= 2 * cells
+
+@then('nothing should have been downsampled or deleted')
+def nothing_revisited(compaction):
+    # Downsampled buckets are never revisited
+    assert (compaction["stats"]["downsampled"], compaction["stats"]["deleted"]) == (0, 0)
+    assert counts() == compaction["found"]
+
+@then('every sample should be kept')
+def all_kept(compaction):
+    assert counts() == {"run": compaction["days"] * compaction["per_day"] * compaction["cells"]}
+
+@then('only samples of single runs should keep their details')
+def details_of_runs_only():
+    from api.models import CellHistory
+    assert set(counts(CellHistory.details.isnot(None))) == {"run"}
+
+@then('a SQLite database should have no free pages left')
+def no_free_pages():
+    from api.models import engine
+    if engine.dialect.name == "sqlite":
+        assert pragma(engine, "auto_vacuum") == 2
+        assert pragma(engine, "freelist_count") == 0
+
+@then(parsers.parse('the history of "{project}" row "{row}" should hold one sample of a run in phase {phase:d}'))
+def history_of_cell(client, project, row, phase):
+    samples = client.get("/history", params={"project": project, "row": row}).json()
+    assert [(s["row"], s["phase"], s["resolution"]) for s in samples] == [(row, phase, "run")]
+
+@then('the compaction should ask for a vacuum')
+def asks_for_vacuum(compaction):
+    assert compaction["stats"]["needs_vacuum"] and compaction["stats"]["seconds"] < 5
+
+@then('the compaction should not ask for a vacuum')
+def no_vacuum_asked(compaction):
+    assert "needs_vacuum" not in compaction["stats"]
+
+@then('the file should keep its free pages')
+def free_pages_kept(old_engine):
+    assert pragma(old_engine, "auto_vacuum") == 0 and pragma(old_engine, "freelist_count") > 0
+
+@then('the file should have no free pages left')
+def free_pages_reclaimed(old_engine):
+    assert pragma(old_engine, "auto_vacuum") == 2 and pragma(old_engine, "freelist_count") == 0
+
+@then(parsers.parse('"{worker}" should get the lease for {seconds:d} seconds'))
+def should_get_lease(worker, seconds):
+    from api.models import acquire_lease, engine
+    assert acquire_lease(engine, "test_lease", worker, seconds)
+
+@then(parsers.parse('"{worker}" should not get the lease for {seconds:d} seconds'))
+def should_not_get_lease(worker, seconds):
+    from api.models import acquire_lease, engine
+    assert not acquire_lease(engine, "test_lease", worker, seconds)
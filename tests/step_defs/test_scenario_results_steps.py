@@ -0,0 +1,63 @@
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+
+import vordu_ingest
+
+from payloads import HEADERS, count_rows, matrix
+
+scenarios('../features/scenario_results.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+COUNTS = ("status", "completion", "scenarios_total", "scenarios_passed", "steps_total", "steps_passed")
+
+@pytest.fixture
+def rolled():
+    """What the ingest script rolled up."""
+    return {}
+
+@given(parsers.parse('the system "{system}" of the components "{first}" and "{second}" in one row'),
+       target_fixture="vordu_data")
+def shared_system(system, first, second):
+    return {
+        "system": {"name": system, "label": system.capitalize(), "domain": "test", "granularity": "system"},
+        "components": [{"name": name, "label": name.upper(), "system": system} for name in (first, second)],
+    }
+
+@given(parsers.parse('the scenario "{scenario}" passing in "{passing}" and failing in "{failing}"'),
+       target_fixture="results")
+def same_name(scenario, passing, failing):
+    return [
+        {"feature": "Auth", "name": scenario, "tag": f"@component:{component} @phase:0", "status": status}
+        for component, status in ((passing, "passed"), (failing, "failed"))
+    ]
+
+@when('the scenarios are rolled up by the API')
+@when('the scenarios are rolled up by the API again')
+def api_rollup(client, vordu_data, results):
+    payload = vordu_ingest.build_scenario_payload(vordu_data, results)
+    assert client.post("/ingest/scenarios", json=payload, headers=HEADERS).status_code == 200
+
+@when('the scenarios are rolled up by the ingest script')
+def script_rollup(rolled, vordu_data, results):
+    rolled.update({(i["row_id"], i["phase_id"]): i for i in vordu_ingest.build_status_payload(vordu_data, results)})
+
+@then(parsers.parse('the API should hold {count:d} results of "{scenario}"'))
+def results_held(count, scenario):
+    from api.models import ScenarioResult
+    assert count_rows(ScenarioResult, ScenarioResult.scenario == scenario) == count
+
+@then(parsers.parse('the cell of "{system}" should count {total:d} scenarios, {passed:d} passed'))
+def api_cell_counts(client, system, total, passed):
+    cell = matrix(client, system)[(system, 0)]
+    assert (cell["scenarios_total"], cell["scenarios_passed"]) == (total, passed)
+
+@then(parsers.parse('its cell of "{system}" should count {total:d} scenarios, {passed:d} passed'))
+def script_cell_counts(rolled, system, total, passed):
+    cell = rolled[(system, 0)]
+    assert (cell["scenarios_total"], cell["scenarios_passed"]) == (total, passed)
+
+@then(parsers.parse('the cell of "{system}" should be the one of the ingest script'))
+def same_cell(client, rolled, system):
+    cell = matrix(client, system)[(system, 0)]
+    assert {k: cell[k] for k in COUNTS} == {k: rolled[(system, 0)][k] for k in COUNTS}
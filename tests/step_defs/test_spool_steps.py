@@ -0,0 +1,176 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+
+from payloads import HEADERS, status_item, system_config
+
+scenarios('../features/spool.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+class ClientSession:
+    """The ApiSession.post_body of vordu_ingest.py against the in-process app."""
+
+    def __init__(self, client, fail_at=None):
+        self.client = client
+        self.fail_at = fail_at
+        self.inflated = []
+        self.responses = []
+
+    def post_body(self, path, data, content_type="application/json", gzipped=False):
+        if len(self.inflated) == self.fail_at:
+            return None
+        headers = {**HEADERS, "Content-Type": content_type, **({"Content-Encoding": "gzip"} if gzipped else {})}
+        self.inflated.append(len(gzip.decompress(data)))
+        response = self.client.post(path, content=data, headers=headers)
+        if response.status_code != 200:
+            return None
+        self.responses.append(response.json())
+        return response.content
+
+@pytest.fixture
+def spool_dir(tmp_path):
+    return tmp_path / "spool"
+
+@pytest.fixture
+def replays():
+    """Sessions of every replay of the scenario, in order."""
+    return []
+
+def spooled_records(spool_dir, batch_bytes):
+    from vordu_ingest import read_spool, split_spool_record
+    return sum(len(split_spool_record(record, batch_bytes)) for name in os.listdir(spool_dir)
+               for record in read_spool(str(spool_dir / name)))
+
+@given(parsers.parse('a replay batch of {size:d} bytes'), target_fixture="batch_bytes")
+def replay_batch(size):
+    return size
+
+@given('the API accepts bodies of one replay batch')
+def body_limit_of_a_batch(monkeypatch, batch_bytes):
+    from api import admission
+    monkeypatch.setattr(admission, "MAX_BODY_BYTES", batch_bytes)
+
+@given(parsers.parse('spooled runs of {components:d} components for "{systems}"'))
+def spooled_runs(spool_dir, components, systems):
+    from vordu_ingest import Spool
+    rows = [f"component-{i}" for i in range(components)]
+    for system in systems.split(","):
+        # One spool file per run
+        spool = Spool(str(spool_dir))
+        spool.write("/config/ingest", system_config(system, rows))
+        spool.write("/ingest", [status_item(system, row, phase) for row in rows for phase in range(4)])
+        spool.close()
+
+@given(parsers.parse('a spooled scenario run of "{system}"'))
+def spooled_scenario_run(spool_dir, system):
+    from vordu_ingest import Spool
+    spool = Spool(str(spool_dir))
+    spool.write("/ingest/scenarios", {**system_config(system, ["billing"]), "scenarios": [
+        {"component": "billing", "phase": 0, "feature": "Billing", "scenario": "Pay", "status": "passed",
+         "passed_steps": 1, "total_steps": 1},
+    ]})
+    spool.close()
+
+@given(parsers.parse('a spooled scenario record of {count:d} scenarios'), target_fixture="record")
+def scenario_record(count):
+    scenarios = [{"feature": "Access", "scenario": f"Scenario {i}", "component": "auth", "phase": 0,
+                  "status": "passed", "steps": []} for i in range(count)]
+    return {"endpoint": "/ingest/scenarios", "spooled_at": "2026-01-01T00:00:00Z",
+            "payload": {"system": "wall", "scenarios": scenarios}}
+
+@when('I replay the spool in-process', target_fixture="replayed")
+def replay_in_process(client, spool_dir, batch_bytes, replays):
+    from vordu_ingest import replay_spool
+    replays.append(ClientSession(client))
+    return replay_spool(str(spool_dir), replays[-1], batch_bytes)
+
+@when('I replay the spool in-process, failing the third request', target_fixture="replayed")
+def replay_failing(client, spool_dir, batch_bytes, replays, request):
+    from vordu_ingest import replay_spool
+    # Counted before anything is imported, for the exactly-once check
+    request.node.spooled = spooled_records(spool_dir, batch_bytes)
+    replays.append(ClientSession(client, fail_at=2))
+    return replay_spool(str(spool_dir), replays[-1], batch_bytes)
+
+@when('I split it into replay batches', target_fixture="lines")
+def split_record(record, batch_bytes):
+    from vordu_ingest import split_spool_record
+    return split_spool_record(record, batch_bytes)
+
+@when('I import the spool with the importer CLI', target_fixture="importer")
+def run_importer(client, spool_dir):
+    # The CLI writes to DATABASE_URL, the in-process API's database
+    return subprocess.run([sys.executable, "-m", "api.importer", *sorted(map(str, spool_dir.iterdir()))],
+                          cwd=ROOT, capture_output=True, text=True)
+
+@then('the replay should succeed')
+def replay_succeeded(replayed):
+    assert replayed
+
+@then('the replay should fail')
+def replay_failed(replayed):
+    assert not replayed
+
+@then('the spool directory should be empty')
+def spool_dir_empty(spool_dir):
+    assert os.listdir(spool_dir) == []
+
+@then(parsers.parse('the spool directory should hold {count:d} files'))
+def spool_dir_holds(spool_dir, count):
+    # The first file was partly committed and now only holds the rest
+    assert len(os.listdir(spool_dir)) == count
+
+@then('every replay request should inflate to one batch at most')
+def requests_within_batch(replays, batch_bytes):
+    inflated = replays[-1].inflated
+    # Each status record is larger than a batch and was split
+    assert len(inflated) > 6 and max(inflated) <= batch_bytes
+
+@then('every spooled record should have been imported once')
+def imported_once(replays, request):
+    assert sum(r["records"] for session in replays for r in session.responses) == request.node.spooled
+
+@then(parsers.parse('the matrix should hold {count:d} cells'))
+def matrix_holds(client, count):
+    assert len(client.get("/matrix").json()) == count
+
+@then('every part should fit one batch')
+def parts_fit(lines, batch_bytes):
+    assert len(lines) > 1 and all(len(line) <= batch_bytes for line in lines)
+
+@then('the parts should share one run, only the last complete')
+def parts_share_run(lines):
+    payloads = [json.loads(line)["payload"] for line in lines]
+    assert len({p["run_id"] for p in payloads}) == 1
+    assert [p["complete"] for p in payloads] == [False] * (len(lines) - 1) + [True]
+
+@then('the parts should hold every scenario in order')
+def parts_hold_scenarios(lines, record):
+    payloads = [json.loads(line)["payload"] for line in lines]
+    assert [s for p in payloads for s in p["scenarios"]] == record["payload"]["scenarios"]
+
+@then(parsers.parse('a record of {count:d} scenario should be left as it is'))
+def small_record_unchanged(record, batch_bytes, count):
+    from vordu_ingest import split_spool_record
+    small = {**record, "payload": {"system": "wall", "scenarios": record["payload"]["scenarios"][:count]}}
+    assert split_spool_record(small, batch_bytes) == [json.dumps(small).encode() + b"\n"]
+
+@then(parsers.parse('the importer should report {records:d} records, {configs:d} configs and {scenarios:d} scenarios'))
+def importer_reports(importer, records, configs, scenarios):
+    assert importer.returncode == 0, importer.stderr
+    summary = importer.stdout.splitlines()[-1]
+    # Cell counts depend on the rollups
+    assert summary.startswith(f"Imported {records} records ({configs} configs,")
+    assert summary.endswith(f" {scenarios} scenarios)")
+
+@then(parsers.parse('the matrix should have cells of "{first}" and "{second}"'))
+def matrix_has_cells_of(client, first, second):
+    assert {first, second} <= {c["project"] for c in client.get("/matrix").json()}
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+
+from payloads import HEADERS, count_rows, status_item, system_config
+
+scenarios('../features/startup.feature')
+
+# "Given the API is running in-process" is shared in conftest.py
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+def backfilled_tables():
+    from api.models import PhaseSummary, RowClosure, SearchDoc
+    return (PhaseSummary, SearchDoc, RowClosure)
+
+@pytest.fixture
+def rows_before():
+    """Rows of every backfilled table before they were emptied."""
+    return []
+
+@given(parsers.parse('the system "{project}" with "{row}" under "{parent}" and {count:d} cells of "{row}" with details'))
+def system_with_cells(client, project, row, parent, count):
+    config = system_config(project, (parent, row), parents={row: parent})
+    assert client.post("/config/ingest", json=config, headers=HEADERS).status_code == 200
+    details = [{"feature": "Access", "scenario": "Login", "status": "passed", "steps": []}]
+    response = client.post("/ingest", json=[status_item(project, row, phase, details=details) for phase in range(count)],
+                           headers=HEADERS)
+    assert response.status_code == 200
+
+@given('the summaries, search documents and row hierarchy are emptied')
+def emptied(rows_before):
+    from api.models import SessionLocal
+    rows_before.extend(count_rows(table) for table in backfilled_tables())
+    with SessionLocal() as db:
+        for table in backfilled_tables():
+            db.query(table).delete()
+        db.commit()
+
+@when(parsers.parse('{count:d} workers import the API at the same time'), target_fixture="workers")
+def start_workers(count):
+    # Every worker imports the app, and with it runs the backfills
+    workers = [subprocess.Popen([sys.executable, "-c", "import api.main"], cwd=ROOT, stderr=subprocess.PIPE)
+               for _ in range(count)]
+    for worker in workers:
+        worker.wait()
+    return workers
+
+@then('every worker should have started')
+def workers_started(workers):
+    for worker in workers:
+        assert worker.returncode == 0, worker.stderr.read().decode()
+
+@then('the summaries, search documents and row hierarchy should be as before')
+def backfilled_once(rows_before):
+    assert [count_rows(table) for table in backfilled_tables()] == rows_before
@@ -0,0 +1,181 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+import pytest
+from pytest_bdd import scenarios, given, when, then, parsers
+
+import vordu_ingest
+
+from payloads import catalog_yaml, component_entity, system_entity
+
+scenarios('../features/watch.feature')
+
+def feature(name, scenarios):
+    return f"Feature: {name}\n" + "".join(f"  @phase:0\n  Scenario: {s}\n    Given a step\n" for s in scenarios)
+
+class RecordingSession:
+    """Stands in for ApiSession, records (path, items) of every post."""
+
+    def __init__(self, accept=True):
+        self.accept = accept
+        self.posts = []
+
+    def post(self, path, payload):
+        self.posts.append((path, payload))
+        return self.accept
+
+    def post_items(self, path, items, max_bytes):
+        self.posts.append((path.split("?")[0], items))
+        return self.accept
+
+    def post_scenarios(self, payload, max_bytes):
+        self.posts.append(("/ingest/scenarios", payload))
+        return self.accept
+
+    def take(self):
+        posts, self.posts = self.posts, []
+        return posts
+
+@pytest.fixture
+def watch():
+    """The session, options, test results and outcome of the pushes of a scenario."""
+    return {"session": RecordingSession(), "server_rollup": False, "results": [], "changed": True}
+
+@pytest.fixture
+def features():
+    """{component: scenario names} of the watched feature files."""
+    return {}
+
+def feature_path(tree, component):
+    return str(tree / "features" / component / f"{component}.feature")
+
+@given(parsers.parse('a watched catalog "{name}" with the components "{first}" of "{first_scenarios}" '
+                     'and "{second}" of "{second_scenarios}"'), target_fixture="catalog")
+def watched_catalog(tmp_path, features, name, first, first_scenarios, second, second_scenarios):
+    features.update({first: first_scenarios.split(","), second: second_scenarios.split(",")})
+    (tmp_path / "catalog-info.yaml").write_text(catalog_yaml(
+        system_entity(name, "demo"), *(component_entity(f"{name}-{component}", name) for component in features)))
+    for component, scenario_names in features.items():
+        (tmp_path / "features" / component).mkdir(parents=True)
+        (tmp_path / "features" / component / f"{component}.feature").write_text(feature(component, scenario_names))
+    catalog = vordu_ingest.WatchedCatalog(str(tmp_path / "catalog-info.yaml"))
+    assert catalog.load()
+    return catalog
+
+@given('the API refuses every push')
+def refusing(watch):
+    watch["session"] = RecordingSession(accept=False)
+
+@given('the API accepts every push')
+def accepting(watch):
+    watch["session"] = RecordingSession()
+
+@given('server-side rollups')
+def server_rollups(watch):
+    watch["server_rollup"] = True
+
+@given(parsers.parse('a {kind} watcher on the catalog'), target_fixture="watcher")
+def watcher(tmp_path, kind):
+    if kind == "inotify":
+        if not sys.platform.startswith("linux"):
+            pytest.skip("inotify is Linux only")
+        watcher = vordu_ingest.InotifyWatcher([str(tmp_path)], [str(tmp_path)])
+    else:
+        watcher = vordu_ingest.PollingWatcher([str(tmp_path)], [str(tmp_path / "catalog-info.yaml")], 0.05)
+    yield watcher
+    watcher.close()
+
+@when('I push the catalog')
+def push(watch, catalog):
+    args = argparse.Namespace(server_rollup=watch["server_rollup"], atomic=False, chunk_size=512 * 1024)
+    watch["pushed"] = vordu_ingest.push_changes(watch["session"], catalog, watch["results"], args,
+                                                catalog_changed=watch["changed"])
+    # Only the first push sees the catalog as changed
+    watch["changed"] = False
+
+def rewrite_feature(tmp_path, catalog, component, scenario_names):
+    path = feature_path(tmp_path, component)
+    with open(path, "w") as f:
+        f.write(feature(component, scenario_names))
+    catalog.update_feature(path)
+
+@when(parsers.parse('the feature of "{component}" gains the scenario "{scenario}"'))
+def gain_scenario(tmp_path, catalog, features, component, scenario):
+    rewrite_feature(tmp_path, catalog, component, features[component] + [scenario])
+
+@when(parsers.parse('the feature of "{component}" only keeps the scenario "{scenario}"'))
+def keep_scenario(tmp_path, catalog, component, scenario):
+    rewrite_feature(tmp_path, catalog, component, [scenario])
+
+@when(parsers.parse('"{scenario}" of "{component}" passes'))
+def scenario_passes(watch, scenario, component):
+    watch["results"] = [{"feature": component, "name": scenario, "tag": "@phase:0", "status": "passed",
+                         "total_steps": 1, "passed_steps": 1, "steps": []}]
+
+@when(parsers.parse('the feature of "{component}" is appended to'), target_fixture="found")
+def append_feature(tmp_path, watcher, component):
+    return changes(watcher, lambda: open(feature_path(tmp_path, component), "a").write("  @phase:1\n  Scenario: More\n"))
+
+@when(parsers.parse('the component "{component}" is added with its feature'), target_fixture="found")
+def add_component(tmp_path, watcher, component):
+    def add():
+        os.makedirs(tmp_path / "features" / component)
+        (tmp_path / "features" / component / f"{component}.feature").write_text(feature(component, ["Find"]))
+    found = changes(watcher, add)
+    if not found: # inotify reports the directory first, its file in the next batch
+        found = watcher.wait(timeout=1)
+    return found | watcher.wait(timeout=0.2)
+
+def changes(watcher, action):
+    """Paths the watcher reports after action."""
+    found = set()
+    waiting = threading.Thread(target=lambda: found.update(watcher.wait(timeout=5)))
+    waiting.start()
+    time.sleep(0.1)
+    action()
+    waiting.join()
+    return found
+
+@then(parsers.parse('{count:d} items should have been pushed to "{paths}"'))
+def pushed_to(watch, count, paths):
+    assert watch["pushed"] == count
+    watch["posts"] = watch["session"].take()
+    assert [path for path, _ in watch["posts"]] == paths.split(",")
+
+@then('nothing should have been pushed')
+def nothing_pushed(watch):
+    assert watch["pushed"] == 0
+    assert watch["session"].take() == []
+
+@then('the push should have failed')
+def push_failed(watch):
+    assert watch["pushed"] is None
+
+@then(parsers.parse('the cell of "{row}" in phase {phase:d} should have been pushed with {count:d} scenarios'))
+def pushed_with_scenarios(watch, row, phase, count):
+    [(_, items)] = watch["posts"]
+    assert [(i["row_id"], i["phase_id"], i["scenarios_total"]) for i in items] == [(row, phase, count)]
+
+@then(parsers.parse('the cell of "{row}" in phase {phase:d} should have been pushed as "{status}"'))
+def pushed_as(watch, row, phase, status):
+    [(_, [item])] = watch["posts"]
+    assert (item["row_id"], item["phase_id"], item["status"]) == (row, phase, status)
+
+@then(parsers.parse('the scenarios "{names}" should have been pushed as an incomplete run'))
+def pushed_incomplete(watch, names):
+    [(_, payload)] = watch["posts"]
+    assert payload["complete"] is False
+    assert [s["scenario"] for s in payload["scenarios"]] == names.split(",")
+
+@then(parsers.parse('the scenarios "{names}" should have been pushed as a complete run'))
+def pushed_complete(watch, names):
+    [(_, payload)] = watch["posts"]
+    assert "complete" not in payload # post_scenarios marks the last chunk complete
+    assert {s["scenario"] for s in payload["scenarios"]} == set(names.split(","))
+
+@then(parsers.parse('the watcher should report the feature of "{component}"'))
+def reported(tmp_path, found, component):
+    assert feature_path(tmp_path, component) in found
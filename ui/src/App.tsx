@@ -3,8 +3,9 @@ import { MatrixCell } from './components/MatrixCell';
 import { TopBar } from './components/TopBar';
 import { Overlay } from './components/Overlay';
 import { generateNeonColor } from './utils/colors';
+import { COLUMNAR_MEDIA_TYPE, ColumnarMatrix } from './utils/columnar';
 import './App.css';
-import type { MatrixCellData, OverlayData } from './types';
+import type { MatrixCellData, OverlayData, ScenarioDetail } from './types';
 
 // Hardcoded Phases for MVP (Configurable later via Domain entity)
 const PHASES = [
@@ -26,7 +27,7 @@ interface ProjectConfig {
 }
 
 function App() {
-  const [matrixState, setMatrixState] = useState<MatrixCellData[]>([]);
+  const [matrix, setMatrix] = useState<ColumnarMatrix>(() => ColumnarMatrix.empty());
   const [projectConfig, setProjectConfig] = useState<ProjectConfig[]>([]);
   const [selectedCell, setSelectedCell] = useState<OverlayData | null>(null);
 
@@ -42,11 +43,11 @@ function App() {
           console.error("Failed to fetch config");
         }
 
-        // 2. Fetch Matrix Data (Status)
-        const dataResp = await fetch('/matrix');
+        // 2. Fetch Matrix Data (Status), one array per field
+        const dataResp = await fetch('/matrix', { headers: { Accept: COLUMNAR_MEDIA_TYPE } });
         if (dataResp.ok) {
           const apiData = await dataResp.json();
-          setMatrixState(apiData);
+          setMatrix(new ColumnarMatrix(apiData));
         }
       } catch (error) {
         console.error("Error connecting to API:", error);
@@ -56,14 +57,28 @@ function App() {
     fetchConfigAndData();
   }, []);
 
-  const getCellData = (project: string, row: string, phase: number) => {
-    return matrixState.find(c => c.project === project && c.row === row && c.phase === phase);
-  };
-
-  const handleCellClick = (cellData: MatrixCellData | undefined, color: string) => {
-    if (cellData) {
-      setSelectedCell({ ...cellData, color });
+  const handleCellClick = async (cellData: MatrixCellData | undefined, color: string) => {
+    if (!cellData) return;
+    // /matrix ships no details, the overlay opens at once and they follow
+    const { project, row, phase } = cellData;
+    setSelectedCell({ ...cellData, details: undefined, color });
+    let details: ScenarioDetail[] = [];
+    try {
+      const resp = await fetch(`/matrix/${encodeURIComponent(project)}/${encodeURIComponent(row)}/${phase}/details`);
+      if (resp.ok) {
+        details = await resp.json();
+      } else {
+        console.error("Failed to fetch cell details");
+      }
+    } catch (error) {
+      console.error("Error connecting to API:", error);
     }
+    // Unless another cell was opened meanwhile
+    setSelectedCell(current =>
+      current && current.project === project && current.row === row && current.phase === phase
+        ? { ...current, details }
+        : current
+    );
   };
 
   return (
@@ -138,7 +153,7 @@ function App() {
                       {row.label}
                     </a>
                     {PHASES.map(phase => {
-                      const cellData = getCellData(project.id, row.id, phase.id);
+                      const i = matrix.find(project.id, row.id, phase.id);
                       const cellColor = projectColor;
 
                       return (
@@ -147,14 +162,14 @@ function App() {
                           project={project.id}
                           row={row.id}
                           phase={phase.id}
-                          status={cellData ? cellData.status : 'empty'}
-                          completion={cellData ? cellData.completion : 0}
-                          scenariosTotal={cellData ? cellData.scenarios_total : 0}
-                          scenariosPassed={cellData ? cellData.scenarios_passed : 0}
-                          stepsTotal={cellData ? cellData.steps_total : 0}
-                          stepsPassed={cellData ? cellData.steps_passed : 0}
+                          status={i >= 0 ? matrix.statusOf(i) : 'empty'}
+                          completion={i >= 0 ? matrix.completion[i] : 0}
+                          scenariosTotal={i >= 0 ? matrix.scenariosTotal[i] : 0}
+                          scenariosPassed={i >= 0 ? matrix.scenariosPassed[i] : 0}
+                          stepsTotal={i >= 0 ? matrix.stepsTotal[i] : 0}
+                          stepsPassed={i >= 0 ? matrix.stepsPassed[i] : 0}
                           color={cellColor}
-                          onClick={() => handleCellClick(cellData, cellColor)}
+                          onClick={() => handleCellClick(i >= 0 ? matrix.cell(i) : undefined, cellColor)}
                         />
                       );
                     })}
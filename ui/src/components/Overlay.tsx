@@ -68,7 +68,13 @@ export const Overlay = ({ isOpen, onClose, data, color }: OverlayProps) => {
                             <div className="flex-grow overflow-y-auto p-8">
                                 <div className="max-w-4xl mx-auto space-y-8">
 
-                                    {(!data.details || data.details.length === 0) && (
+                                    {!data.details && (
+                                        <div className="text-gray-500 text-center italic">
+                                            Loading scenarios...
+                                        </div>
+                                    )}
+
+                                    {data.details && data.details.length === 0 && (
                                         <div className="text-gray-500 text-center italic">
                                             No detailed scenarios recorded for this capability.
                                         </div>
@@ -24,7 +24,7 @@ export interface MatrixCellData {
     scenarios_passed?: number;
     steps_total?: number;
     steps_passed?: number;
-    details?: ScenarioDetail[];
+    details?: ScenarioDetail[]; // Not in /matrix, fetched per cell when opened
     updateText?: string;
     link?: string;
 }
@@ -0,0 +1,104 @@
+import type { MatrixCellData } from '../types';
+
+// Accept header selecting the columnar /matrix response
+export const COLUMNAR_MEDIA_TYPE = 'application/vnd.vordu.matrix.columnar+json';
+
+type ColumnName =
+    | 'project' | 'row' | 'phase' | 'status' | 'completion'
+    | 'scenarios_total' | 'scenarios_passed' | 'steps_total' | 'steps_passed';
+
+export interface ColumnarMatrixPayload {
+    count: number;
+    dictionaries: { project: string[]; row: string[]; status: string[] };
+    columns: Record<ColumnName, number[]>;
+}
+
+// The matrix as typed arrays, one per field. Cells are looked up by index,
+// objects are only built for the cell opened in the overlay.
+export class ColumnarMatrix {
+    readonly count: number;
+    readonly projects: string[];
+    readonly rows: string[];
+    readonly statuses: string[];
+    readonly project: Int32Array;
+    readonly row: Int32Array;
+    readonly phase: Int32Array;
+    readonly status: Int32Array;
+    readonly completion: Int32Array;
+    readonly scenariosTotal: Int32Array;
+    readonly scenariosPassed: Int32Array;
+    readonly stepsTotal: Int32Array;
+    readonly stepsPassed: Int32Array;
+    private readonly projectCodes: Map<string, number>;
+    private readonly rowCodes: Map<string, number>;
+    private readonly phases: number;
+    // Numeric key of (project, row, phase) to cell index, no string per cell
+    private readonly cells: Map<number, number>;
+
+    constructor(payload: ColumnarMatrixPayload) {
+        const { columns, dictionaries } = payload;
+        this.count = payload.count;
+        this.projects = dictionaries.project;
+        this.rows = dictionaries.row;
+        this.statuses = dictionaries.status;
+        this.project = Int32Array.from(columns.project);
+        this.row = Int32Array.from(columns.row);
+        this.phase = Int32Array.from(columns.phase);
+        this.status = Int32Array.from(columns.status);
+        this.completion = Int32Array.from(columns.completion);
+        this.scenariosTotal = Int32Array.from(columns.scenarios_total);
+        this.scenariosPassed = Int32Array.from(columns.scenarios_passed);
+        this.stepsTotal = Int32Array.from(columns.steps_total);
+        this.stepsPassed = Int32Array.from(columns.steps_passed);
+        this.projectCodes = new Map(this.projects.map((name, i) => [name, i]));
+        this.rowCodes = new Map(this.rows.map((name, i) => [name, i]));
+
+        let maxPhase = 0;
+        for (let i = 0; i < this.count; i++) {
+            if (this.phase[i] > maxPhase) maxPhase = this.phase[i];
+        }
+        this.phases = maxPhase + 1;
+        this.cells = new Map();
+        for (let i = 0; i < this.count; i++) {
+            this.cells.set(this.key(this.project[i], this.row[i], this.phase[i]), i);
+        }
+    }
+
+    static empty(): ColumnarMatrix {
+        const columns = {
+            project: [], row: [], phase: [], status: [], completion: [],
+            scenarios_total: [], scenarios_passed: [], steps_total: [], steps_passed: [],
+        };
+        return new ColumnarMatrix({ count: 0, dictionaries: { project: [], row: [], status: [] }, columns });
+    }
+
+    private key(project: number, row: number, phase: number): number {
+        return (project * this.rows.length + row) * this.phases + phase;
+    }
+
+    // Index of the cell, -1 if the matrix has none
+    find(project: string, row: string, phase: number): number {
+        const projectCode = this.projectCodes.get(project);
+        const rowCode = this.rowCodes.get(row);
+        if (projectCode === undefined || rowCode === undefined || phase < 0 || phase >= this.phases) return -1;
+        return this.cells.get(this.key(projectCode, rowCode, phase)) ?? -1;
+    }
+
+    statusOf(i: number): MatrixCellData['status'] {
+        return this.statuses[this.status[i]] as MatrixCellData['status'];
+    }
+
+    cell(i: number): MatrixCellData {
+        return {
+            project: this.projects[this.project[i]],
+            row: this.rows[this.row[i]],
+            phase: this.phase[i],
+            status: this.statusOf(i),
+            completion: this.completion[i],
+            scenarios_total: this.scenariosTotal[i],
+            scenarios_passed: this.scenariosPassed[i],
+            steps_total: this.stepsTotal[i],
+            steps_passed: this.stepsPassed[i],
+        };
+    }
+}
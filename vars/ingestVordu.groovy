@@ -7,15 +7,48 @@ def call(Map config = [:]) {
     def apiKeyEnv = config.apiKey ? null : 'VORDU_API_KEY'
     def apiKeyVal = config.apiKey
 
-    writeFile file: 'vordu_ingest.py', text: libraryResource('scripts/vordu_ingest.py')
+    // The client runs as a zipapp with precompiled bytecode, packed once per agent and
+    // library version and reused from the cache by every later build
+    def script = libraryResource('scripts/vordu_ingest.py')
+    def packer = libraryResource('scripts/vordu_pack.py')
+    def digest = java.security.MessageDigest.getInstance('SHA-256')
+        .digest((script + packer).getBytes('UTF-8')).encodeHex().toString().take(16)
+    def cacheDir = config.cacheDir ?: "${env.HOME ?: env.WORKSPACE}/.cache/vordu"
+    def client = "${cacheDir}/vordu_ingest-${digest}.pyz"
+    if (sh(script: "test -f '${client}'", returnStatus: true) != 0) {
+        writeFile file: 'vordu_ingest.py', text: script
+        writeFile file: 'vordu_pack.py', text: packer
+        sh "python3 vordu_pack.py vordu_ingest.py '${client}'"
+    }
 
     // Construct command using environment variable for key if possible to avoid leaking in logs
-    def cmd = "python3 vordu_ingest.py ${catalog} --api-url ${apiUrl}"
+    // Parsed catalogs are cached alongside by content hash, unchanged ones skip YAML parsing
+    def cmd = "python3 '${client}' ${catalog} --api-url ${apiUrl} --catalog-cache '${cacheDir}/catalogs.json'"
     
     if (report) {
         cmd += " --report ${report}"
     }
 
+    // Optional offline spool, payloads the API cannot take are kept on the agent for a later replay
+    if (config.spoolDir) {
+        cmd += " --spool-dir ${config.spoolDir}"
+    }
+
+    // Optional server-side rollups, the API aggregates scenarios so granularity can change without a rebuild
+    if (config.serverRollup) {
+        cmd += " --server-rollup"
+    }
+
+    // Optional atomic publish, dashboards switch from the previous run's status to this one in one step
+    if (config.atomic) {
+        cmd += " --atomic"
+    }
+
+    // Optional per-stage timing report, archive it to track ingest cost across builds
+    if (config.profilePath) {
+        cmd += " --profile ${config.profilePath}"
+    }
+
     if (apiKeyVal) {
         // If passed explicitly as string, use it (less secure if not masked)
         cmd += " --api-key ${apiKeyVal}"